@@ -4,9 +4,15 @@ from logging_assist.logging import logger
 from model_cache.model_conformity_checker import ModelConformityChecker
 from .dataiku_api import dataiku_api
 import pandas as pd
-from dku_visual_ml.dku_model_retrival import VisualMLModelRetriver
+from dku_visual_ml.dku_model_retrival import get_model_retriever
 from glm_handler.dku_relativites_calculator import RelativitiesCalculator
+from glm_handler.one_way_cube import OneWayCube
+from glm_handler.analysis_frame import as_model_input
+from chart_formatters.lift_chart import LiftChartFormatter
 from chart_formatters.variable_level_stats import VariableLevelStatsFormatter
+from generalized_linear_models.screening import encode_candidates, score_test_candidates
+from generalized_linear_models.interaction_detection import detect_interactions
+from generalized_linear_models.factor_tests import FACTOR_TEST_COLUMNS, drop_one_factor
 
 def format_models(global_dku_mltask):
     logger.info("Formatting Models")
@@ -20,7 +26,7 @@ def format_models(global_dku_mltask):
     models = []
     for ml_id in list_ml_id:
         model_details = global_dku_mltask.get_trained_model_details(ml_id)
-        is_conform = mcc.check_model_conformity(ml_id)
+        is_conform = mcc.check_model_conformity(ml_id, model_details)
         if is_conform:
             model_name = model_details.get_user_meta()['name']
             matches = re.findall(model_id_pattern, model_name)
@@ -84,13 +90,13 @@ def calculate_base_levels(df, exposure_column=None):
     return cols_json
 
 def get_model_train_set(full_model_id, model_cache, data_handler):
-    model_retriever = VisualMLModelRetriver(full_model_id)
+    model_retriever = get_model_retriever(full_model_id)
     relativities_calculator = RelativitiesCalculator(data_handler, model_retriever)
     train_set = relativities_calculator.train_set
     return train_set
 
 def get_model_test_set(full_model_id, model_cache, data_handler):
-    model_retriever = VisualMLModelRetriver(full_model_id)
+    model_retriever = get_model_retriever(full_model_id)
     relativities_calculator = RelativitiesCalculator(data_handler, model_retriever)
     test_set = relativities_calculator.test_set
     return test_set
@@ -101,7 +107,7 @@ def get_model_base_values_modalities_types(full_model_id, model_cache, data_hand
                     "full_model_id": full_model_id}
     train_set = model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
     test_set = model_cache.get_or_create_cached_item(full_model_id, 'test_set', get_model_test_set, **creation_args)
-    model_retriever = VisualMLModelRetriver(full_model_id)
+    model_retriever = get_model_retriever(full_model_id)
     relativities_calculator = RelativitiesCalculator(data_handler, model_retriever, train_set, test_set)
     base_values = relativities_calculator.get_base_values()
     return {'base_values': base_values, 
@@ -118,7 +124,7 @@ def get_model_relativities(full_model_id, model_cache, data_handler):
     base_values = base_values_modalities_types['base_values']
     modalities = base_values_modalities_types['modalities']
     variable_types = base_values_modalities_types['types']
-    model_retriever = VisualMLModelRetriver(full_model_id)
+    model_retriever = get_model_retriever(full_model_id)
     relativities_calculator = RelativitiesCalculator(data_handler, model_retriever, train_set, test_set, base_values=base_values, modalities=modalities, variable_types=variable_types)
     relativities = relativities_calculator.get_relativities_df()
     relativities_dict = relativities_calculator.relativities
@@ -134,7 +140,7 @@ def get_model_relativities_interaction(full_model_id, model_cache, data_handler)
     base_values = base_values_modalities_types['base_values']
     modalities = base_values_modalities_types['modalities']
     variable_types = base_values_modalities_types['types']
-    model_retriever = VisualMLModelRetriver(full_model_id)
+    model_retriever = get_model_retriever(full_model_id)
     relativities_calculator = RelativitiesCalculator(data_handler, model_retriever, train_set, test_set, base_values=base_values, modalities=modalities, variable_types=variable_types)
     relativities_interaction = relativities_calculator.get_relativities_interactions_df()
     return relativities_interaction
@@ -149,11 +155,20 @@ def get_model_variable_level_stats(full_model_id, model_cache, data_handler):
     relativities_interaction = model_cache.get_or_create_cached_item(full_model_id, 'relativities_interaction', get_model_relativities_interaction, **creation_args)
     base_values_modalities_types = model_cache.get_or_create_cached_item(full_model_id, 'base_values_modalities_types', get_model_base_values_modalities_types, **creation_args)
     base_values = base_values_modalities_types['base_values']
-    model_retriever = VisualMLModelRetriver(full_model_id)
+    model_retriever = get_model_retriever(full_model_id)
     variable_level_stats = VariableLevelStatsFormatter(model_retriever, data_handler, relativities, relativities_interaction, base_values, train_set, test_set)
     variable_stats = variable_level_stats.get_variable_level_stats()
     return variable_stats
 
+def get_model_one_way_cube(full_model_id, model_cache, data_handler):
+    creation_args = {"data_handler": data_handler,
+                     "model_cache": model_cache,
+                    "full_model_id": full_model_id}
+    train_set = model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
+    test_set = model_cache.get_or_create_cached_item(full_model_id, 'test_set', get_model_test_set, **creation_args)
+    base_values_modalities_types = model_cache.get_or_create_cached_item(full_model_id, 'base_values_modalities_types', get_model_base_values_modalities_types, **creation_args)
+    return OneWayCube(train_set, test_set, base_values_modalities_types['types'], base_values_modalities_types['base_values'])
+
 def get_model_predicted_base(full_model_id, model_cache, data_handler, variable):
     creation_args = {"data_handler": data_handler,
                      "model_cache": model_cache,
@@ -164,7 +179,134 @@ def get_model_predicted_base(full_model_id, model_cache, data_handler, variable)
     base_values = base_values_modalities_types['base_values']
     modalities = base_values_modalities_types['modalities']
     variable_types = base_values_modalities_types['types']
-    model_retriever = VisualMLModelRetriver(full_model_id)
+    one_way_cube = model_cache.get_or_create_cached_item(full_model_id, 'one_way_cube', get_model_one_way_cube, **creation_args)
+    model_retriever = get_model_retriever(full_model_id)
     relativities_calculator = RelativitiesCalculator(data_handler, model_retriever, train_set, test_set, base_values, modalities, variable_types)
-    predicted_base_variable = relativities_calculator.get_formated_predicted_base_variable(variable)
-    return predicted_base_variable
\ No newline at end of file
+    predicted_base_variable = relativities_calculator.get_formated_predicted_base_variable(variable, one_way_cube)
+    return predicted_base_variable
+
+def get_model_lift_chart(full_model_id, model_cache, data_handler, nb_bins):
+    creation_args = {"data_handler": data_handler,
+                     "model_cache": model_cache,
+                    "full_model_id": full_model_id}
+    train_set = model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
+    test_set = model_cache.get_or_create_cached_item(full_model_id, 'test_set', get_model_test_set, **creation_args)
+    lift_chart = LiftChartFormatter(get_model_retriever(full_model_id), data_handler)
+    return lift_chart.get_lift_chart(nb_bins, train_set, test_set)
+
+def get_model_fit_statistics(full_model_id, model_cache, data_handler):
+    """
+    fit statistics of a model trained with deferred metrics, from the target
+    and the predictions of the train set in float64, as the predictions of the
+    analysis frame may be stored in float32
+    """
+    logger.info(f"Computing deferred fit metrics for model {full_model_id}")
+    model_retriever = get_model_retriever(full_model_id)
+    creation_args = {"data_handler": data_handler,
+                     "model_cache": model_cache,
+                    "full_model_id": full_model_id}
+    train_set = model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
+    glm = model_retriever.predictor._clf
+    preprocessed_data = model_retriever.predictor.preprocess(as_model_input(train_set))
+    predictions = glm.predict(preprocessed_data[0])
+    # the statistics are returned rather than set on the model, shared by the requests
+    return glm.get_fit_statistics(train_set[model_retriever.target_column], predictions, glm.fitted_model.coef_)
+
+def get_model_fit_metrics(full_model_id, model_cache, data_handler):
+    model_retriever = get_model_retriever(full_model_id)
+    glm = model_retriever.predictor._clf
+    if glm.has_fit_statistics():
+        statistics = {'aic': glm.aic_value,
+                      'bic': glm.bic_value,
+                      'deviance': glm.deviance_value,
+                      'pearson_chi2': getattr(glm, 'pearson_chi2_value', None)}
+    else:
+        # model trained with deferred metrics, computed once and kept in the cache
+        creation_args = {"data_handler": data_handler,
+                         "model_cache": model_cache,
+                        "full_model_id": full_model_id}
+        statistics = model_cache.get_or_create_cached_item(full_model_id, 'fit_statistics', get_model_fit_statistics, **creation_args)
+    metrics = {
+        "AIC": statistics['aic'],
+        "BIC": statistics['bic'],
+        "Deviance": statistics['deviance']
+    }
+    if statistics['pearson_chi2'] is not None:
+        metrics["Pearson Chi2"] = statistics['pearson_chi2']
+    return metrics
+
+def get_model_coefficient_path(full_model_id):
+    model_retriever = get_model_retriever(full_model_id)
+    glm = model_retriever.predictor._clf
+    path_statistics = getattr(glm, 'path_statistics', None)
+    if path_statistics is None:
+        # model fitted on a single penalty
+        return {"penalty": [], "selectedPenalty": None, "aic": [], "deviance": [], "coefficients": []}
+    coefficients = [{"variable": variable, "values": values}
+                    for variable, values in path_statistics['coefficients'].items()]
+    return {
+        "penalty": path_statistics['penalty'],
+        "selectedPenalty": glm.selected_penalty,
+        "aic": path_statistics['aic'],
+        "deviance": path_statistics['deviance'],
+        "coefficients": coefficients
+    }
+
+def get_model_aliasing(full_model_id):
+    model_retriever = get_model_retriever(full_model_id)
+    glm = model_retriever.predictor._clf
+    # the aliased columns were dropped from the fit, their coefficients are set to 0
+    return glm.get_aliasing()
+
+def get_model_start_params(full_model_id):
+    model_retriever = get_model_retriever(full_model_id)
+    glm = model_retriever.predictor._clf
+    return glm.get_coefficients_by_label()
+
+def get_model_candidate_screening(full_model_id, model_cache, data_handler):
+    creation_args = {"data_handler": data_handler,
+                     "model_cache": model_cache,
+                    "full_model_id": full_model_id}
+    train_set = model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
+    model_retriever = get_model_retriever(full_model_id)
+    glm = model_retriever.predictor._clf
+    candidates = [feature for feature in model_retriever.candidate_features if feature in train_set.columns]
+    if len(candidates) == 0 or getattr(glm, 'design_plan', None) is None:
+        # nothing to screen, or model trained before the design plan was introduced
+        return pd.DataFrame(columns=['variable', 'df', 'score_statistic', 'p_value', 'deviance_reduction'])
+    categorical_candidates = [feature for feature in candidates if model_retriever.get_feature_type(feature) == 'CATEGORY']
+    numerical_candidates = [feature for feature in candidates if feature not in categorical_candidates]
+    logger.info(f"Screening candidate variables {candidates} for model {full_model_id}")
+    X = model_retriever.predictor.preprocess(as_model_input(train_set))[0]
+    Z, candidate_labels = encode_candidates(train_set, numerical_candidates, categorical_candidates)
+    return score_test_candidates(glm, X, train_set[model_retriever.target_column].to_numpy(), Z, candidate_labels)
+
+def get_model_interaction_detection(full_model_id, model_cache, data_handler):
+    creation_args = {"data_handler": data_handler,
+                     "model_cache": model_cache,
+                    "full_model_id": full_model_id}
+    train_set = model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
+    model_retriever = get_model_retriever(full_model_id)
+    glm = model_retriever.predictor._clf
+    if getattr(glm, 'design_plan', None) is None:
+        # model trained before the design plan was introduced
+        return []
+    logger.info(f"Scoring the variable pairs of model {full_model_id} for interactions")
+    X = model_retriever.predictor.preprocess(as_model_input(train_set))[0]
+    # only the table of the pairs is served, the exposure of their cells being left out of the payload
+    pairs = detect_interactions(glm, X, train_set[model_retriever.target_column].to_numpy())
+    return pairs.to_dict('records')
+
+def get_model_factor_tests(full_model_id, model_cache, data_handler):
+    creation_args = {"data_handler": data_handler,
+                     "model_cache": model_cache,
+                    "full_model_id": full_model_id}
+    train_set = model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
+    model_retriever = get_model_retriever(full_model_id)
+    glm = model_retriever.predictor._clf
+    if getattr(glm, 'design_plan', None) is None:
+        # model trained before the design plan was introduced
+        return pd.DataFrame(columns=FACTOR_TEST_COLUMNS)
+    logger.info(f"Refitting model {full_model_id} without each of its factors")
+    X = model_retriever.predictor.preprocess(as_model_input(train_set))[0]
+    return drop_one_factor(glm, X, train_set[model_retriever.target_column].to_numpy())
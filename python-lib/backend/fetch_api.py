@@ -88,6 +88,48 @@ def get_model_metrics():
     result = data_service.get_model_metrics(request.get_json())
     return jsonify(result)
 
+@fetch_api.route("/get_coefficient_path", methods=["POST"])
+def get_coefficient_path():
+    data_service = current_app.data_service
+    result = data_service.get_coefficient_path(request.get_json())
+    return jsonify(result)
+
+@fetch_api.route("/get_aliasing", methods=["POST"])
+def get_aliasing():
+    data_service = current_app.data_service
+    result = data_service.get_aliasing(request.get_json())
+    return jsonify(result)
+
+@fetch_api.route("/get_candidate_screening", methods=["POST"])
+def get_candidate_screening():
+    data_service = current_app.data_service
+    result = data_service.get_candidate_screening(request.get_json())
+    return jsonify(result)
+
+@fetch_api.route("/get_interaction_detection", methods=["POST"])
+def get_interaction_detection():
+    data_service = current_app.data_service
+    result = data_service.get_interaction_detection(request.get_json())
+    return jsonify(result)
+
+@fetch_api.route("/get_factor_tests", methods=["POST"])
+def get_factor_tests():
+    data_service = current_app.data_service
+    result = data_service.get_factor_tests(request.get_json())
+    return jsonify(result)
+
+@fetch_api.route("/get_warm_up_status", methods=["GET"])
+def get_warm_up_status():
+    data_service = current_app.data_service
+    result = data_service.get_warm_up_status()
+    return jsonify(result)
+
+@fetch_api.route("/get_cache_stats", methods=["GET"])
+def get_cache_stats():
+    data_service = current_app.data_service
+    result = data_service.get_cache_stats()
+    return jsonify(result)
+
 @fetch_api.route('/export_model', methods=['POST'])
 def export_model():
     data_service = current_app.data_service
@@ -114,6 +156,19 @@ def export_variable_level_stats():
         download_name='variable_level_stats.csv'
     )
 
+@fetch_api.route('/export_factor_tests', methods=['POST'])
+def export_factor_tests():
+    data_service = current_app.data_service
+    csv_data = data_service.export_factor_tests(request.get_json())
+    csv_io = BytesIO(csv_data)
+    # Serve the CSV file for download
+    return send_file(
+        csv_io,
+        mimetype='text/csv',
+        as_attachment=True,
+        download_name='factor_tests.csv'
+    )
+
 @fetch_api.route('/export_lift_chart', methods=['POST'])
 def export_lift_chart():
     data_service = current_app.data_service
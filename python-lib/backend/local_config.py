@@ -116,9 +116,47 @@ dummy_model_metrics_old ={
 dummy_model_metrics ={
             "AIC": 100,
             "BIC": 120,
-            "Deviance": 5.5
+            "Deviance": 5.5,
+            "Pearson Chi2": 6.1
+        }
+
+dummy_coefficient_path = {
+            "penalty": [0.1, 0.01, 0.001],
+            "selectedPenalty": 0.01,
+            "aic": [1210.4, 1187.2, 1188.9],
+            "deviance": [402.1, 371.5, 370.8],
+            "coefficients": [
+                {"variable": "dummy:VehBrand:B1", "values": [0.0, 0.12, 0.15]},
+                {"variable": "VehPower", "values": [0.01, 0.05, 0.06]}
+            ]
         }
 
+dummy_aliasing = [
+            {"column": "dummy:VehGas:Regular", "equation": "dummy:VehGas:Regular = intercept - dummy:VehGas:Diesel"}
+        ]
+
+dummy_candidate_screening = [
+            {"variable": "VehGas", "df": 1, "score_statistic": 48.3, "p_value": 3.6e-12, "deviance_reduction": 48.3},
+            {"variable": "VehPower", "df": 1, "score_statistic": 6.2, "p_value": 0.0128, "deviance_reduction": 6.2},
+            {"variable": "Region", "df": 21, "score_statistic": 18.4, "p_value": 0.625, "deviance_reduction": 18.4}
+        ]
+
+dummy_interaction_detection = [
+            {"first": "VehBrand", "second": "VehPower", "df": 4, "score_statistic": 31.7, "p_value": 2.2e-06,
+             "deviance_reduction": 31.7, "min_cell_exposure": 12.5, "empty_cells": 0},
+            {"first": "Area", "second": "DrivAge", "df": 9, "score_statistic": 7.1, "p_value": 0.626,
+             "deviance_reduction": 7.1, "min_cell_exposure": 3.4, "empty_cells": 0}
+        ]
+
+dummy_factor_tests = pd.DataFrame({
+            "variable": ["VehBrand", "DrivAge", "Area"],
+            "df": [10, 1, 5],
+            "deviance_change": [85.2, 41.7, 6.3],
+            "lr_statistic": [85.2, 41.7, 6.3],
+            "p_value": [5.1e-14, 1.1e-10, 0.278],
+            "aic_change": [65.2, 39.7, -3.7]
+        })
+
 dummy_model_metrics2 ={
             "AIC": 323,
             "BIC": 992,
@@ -2,15 +2,16 @@ import pandas as pd
 from flask import current_app
 import time
 import random
+import functools
 import dataiku
 
 from .local_config import *
 from .dataiku_api import dataiku_api
-from .api_utils import calculate_base_levels, get_model_train_set, get_model_test_set, get_model_predicted_base, get_model_base_values_modalities_types, get_model_relativities, get_model_relativities_interaction, get_model_variable_level_stats, format_models
-from chart_formatters.lift_chart import LiftChartFormatter
+from .api_utils import calculate_base_levels, get_model_train_set, get_model_test_set, get_model_predicted_base, get_model_base_values_modalities_types, get_model_relativities, get_model_relativities_interaction, get_model_variable_level_stats, get_model_fit_metrics, get_model_coefficient_path, get_model_aliasing, get_model_start_params, get_model_candidate_screening, get_model_interaction_detection, get_model_factor_tests, get_model_lift_chart, format_models
 from model_cache.model_cache import ModelCache
+from model_cache.warm_up_scheduler import WarmUpScheduler, USER_PRIORITY, SPECULATIVE_PRIORITY
 from dku_visual_ml.dku_model_trainer import VisualMLModelTrainer
-from dku_visual_ml.dku_model_retrival import VisualMLModelRetriver
+from dku_visual_ml.dku_model_retrival import get_model_retriever, model_retriever_pool
 from glm_handler.glm_data_handler import GlmDataHandler
 from dku_visual_ml.dku_train_model_config import DKUVisualMLConfig
 from dku_visual_ml.dku_model_deployer import VisualMLModelDeployer
@@ -77,6 +78,28 @@ class MockDataService:
     def get_model_metrics(self, request_json: dict):
         return dummy_model_metrics
 
+    def get_coefficient_path(self, request_json: dict):
+        return dummy_coefficient_path
+
+    def get_aliasing(self, request_json: dict):
+        return dummy_aliasing
+
+    def get_candidate_screening(self, request_json: dict):
+        return dummy_candidate_screening
+
+    def get_interaction_detection(self, request_json: dict):
+        return dummy_interaction_detection
+
+    def get_factor_tests(self, request_json: dict):
+        return dummy_factor_tests.to_dict('records')
+
+    def get_warm_up_status(self):
+        return {}
+
+    def get_cache_stats(self):
+        return {'hits': 0, 'misses': 0, 'evictions': 0, 'coalesced': 0, 'items': 0, 'models': 0,
+                'used_bytes': 0, 'max_bytes': None, 'disk': None}
+
     def export_model(self, request_json: dict):
         data = {'Name': ['John', 'Alice', 'Bob'], 'Age': [30, 25, 35]}
         df = pd.DataFrame(data)
@@ -97,6 +120,10 @@ class MockDataService:
         csv_data = dummy_variable_level_stats.to_csv(index=False).encode('utf-8')
 
         return csv_data
+
+    def export_factor_tests(self, request_json: dict):
+        csv_data = dummy_factor_tests.to_csv(index=False).encode('utf-8')
+        return csv_data
     
     def export_one_way(self, request_json: dict):
         current_app.logger.info("Exporting one way graphs")
@@ -146,12 +173,36 @@ class DataikuDataService:
         self.dku_handler = DataikuClientProject()
         self.data_handler = GlmDataHandler()
         self.visual_ml_deployer = VisualMLModelDeployer()
+        # tasks are done while their object is in the cache, the status following evictions
+        self.warm_up_scheduler = WarmUpScheduler(is_present=self.model_cache.cache.contains)
+        # (analysis_id, ml_task_id) -> ids of the models listed so far
+        self.listed_model_ids = {}
+
+    def warm_up_model(self, full_model_id, priority):
+        """
+        schedules the building of the cached objects the analysis view of a model starts with
+        """
+        creation_args = {"data_handler": self.data_handler,
+                            "model_cache": self.model_cache,
+                            "full_model_id": full_model_id}
+        builders = [('train_set', get_model_train_set),
+                    ('test_set', get_model_test_set),
+                    ('base_values_modalities_types', get_model_base_values_modalities_types),
+                    ('relativities', get_model_relativities),
+                    ('relativities_interaction', get_model_relativities_interaction),
+                    ('variable_level_stats', get_model_variable_level_stats)]
+        tasks = [(key, functools.partial(self.model_cache.get_or_create_cached_item, full_model_id, key, builder, **creation_args))
+                 for key, builder in builders]
+        self.warm_up_scheduler.schedule(full_model_id, tasks, priority)
     
     def train_model(self, request_json: dict):
         current_app.logger.info(f"Initalising Model Training with request {request_json}")
         
         self.visual_ml_config = DKUVisualMLConfig()
         self.visual_ml_config.update_model_parameters(request_json)
+        if self.visual_ml_config.warm_start_model_id:
+            current_app.logger.info(f"Warm starting from model {self.visual_ml_config.warm_start_model_id}")
+            self.visual_ml_config.start_params = get_model_start_params(self.visual_ml_config.warm_start_model_id)
 
         current_app.logger.debug("Creating Visual ML Trainer")
         self.visual_ml_trainer = VisualMLModelTrainer(mltask_id=request_json["ml_task_id"], analysis_id=request_json["analysis_id"])
@@ -188,8 +239,11 @@ class DataikuDataService:
         input_dataset = request_json['input_dataset']
         experiment_name = request_json['experiment_name']
         self.visual_ml_deployer.delete_model(model_id, input_dataset, experiment_name)
-        model_retriver = VisualMLModelRetriver(model_id)
+        model_retriver = get_model_retriever(model_id)
         model_retriver.delete_model(model_id)
+        model_retriever_pool.remove(model_id)
+        self.warm_up_scheduler.forget_model(model_id)
+        self.model_cache.remove_model(model_id)
 
         return {'message': 'Model deleted successfully.'}
     
@@ -199,7 +253,7 @@ class DataikuDataService:
         
         current_app.logger.info(f"Recieved request for latest params for: {full_model_id}")
         
-        model_retriver = VisualMLModelRetriver(full_model_id)
+        model_retriver = get_model_retriever(full_model_id)
         setup_params = model_retriver.get_setup_params()
     
         current_app.logger.info(f"Returning setup params {setup_params}")
@@ -208,7 +262,7 @@ class DataikuDataService:
     def get_variables(self, request_json: dict):
         full_model_id = request_json["id"]
         try:
-            model_retriever = VisualMLModelRetriver(full_model_id)
+            model_retriever = get_model_retriever(full_model_id)
             variables = model_retriever.get_features_used_in_modelling()
         except ValueError as e:
             current_app.logger.error(f"Validation Error: {e}")
@@ -217,6 +271,8 @@ class DataikuDataService:
         if variables is None:
             raise ValueError("No variables returned.")
         else: 
+            if self.model_cache.check_model_conformity(full_model_id):
+                self.warm_up_model(full_model_id, USER_PRIORITY)
             return variables
 
     def get_models(self, request_json: dict):
@@ -229,6 +285,16 @@ class DataikuDataService:
         
         models = format_models(ml_task)
         current_app.logger.info(f"models from global ML task is {models}")
+
+        # models trained since the previous listing are likely to be opened next
+        model_ids = [model['id'] for model in models]
+        previous_model_ids = self.listed_model_ids.get((analysis_id, ml_task_id))
+        if previous_model_ids is not None:
+            for model_id in model_ids:
+                if model_id not in previous_model_ids:
+                    current_app.logger.info(f"Warming up the cache of the new model {model_id}")
+                    self.warm_up_model(model_id, SPECULATIVE_PRIORITY)
+        self.listed_model_ids[(analysis_id, ml_task_id)] = set(model_ids)
         return models
     
     def get_predicted_base(self, request_json: dict):
@@ -279,19 +345,11 @@ class DataikuDataService:
         
         current_app.logger.info(f"Model ID received: {full_model_id}")
         
-        model_retriever = VisualMLModelRetriver(full_model_id)
-        
-        lift_chart = LiftChartFormatter(
-                    model_retriever,
-                    self.data_handler
-        )
         creation_args = {"data_handler": self.data_handler,
                             "model_cache": self.model_cache,
-                            "full_model_id": full_model_id}
-        train_set = self.model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
-        test_set = self.model_cache.get_or_create_cached_item(full_model_id, 'test_set', get_model_test_set, **creation_args)
-
-        lift_chart_data = lift_chart.get_lift_chart(nb_bins, train_set, test_set)
+                            "full_model_id": full_model_id,
+                            "nb_bins": nb_bins}
+        lift_chart_data = self.model_cache.get_or_create_cached_item(full_model_id, f'lift_chart_{nb_bins}', get_model_lift_chart, **creation_args)
         
         lift_chart_data = lift_chart_data[lift_chart_data['dataset'] == dataset]
         current_app.logger.info(f"Successfully generated Lift chart data")
@@ -327,18 +385,59 @@ class DataikuDataService:
         return variable_stats.to_dict('records')
     
     def get_model_metrics(self, request_json: dict):
-        
-        model_retriever = VisualMLModelRetriver(request_json['id'])
-        model_aic = model_retriever.predictor._clf.aic_value
-        model_bic  = model_retriever.predictor._clf.bic_value
-        model_deviance = model_retriever.predictor._clf.deviance_value
-
-        metrics = {
-            "AIC": model_aic,
-            "BIC": model_bic,
-            "Deviance": model_deviance
-        }
+        full_model_id = request_json['id']
+        creation_args = {"data_handler": self.data_handler,
+                            "model_cache": self.model_cache,
+                            "full_model_id": full_model_id}
+        metrics = self.model_cache.get_or_create_cached_item(full_model_id, 'model_metrics', get_model_fit_metrics, **creation_args)
         return metrics
+
+    def get_coefficient_path(self, request_json: dict):
+        full_model_id = request_json['id']
+        current_app.logger.info(f"Getting coefficient path for Model ID: {full_model_id}")
+        coefficient_path = self.model_cache.get_or_create_cached_item(full_model_id, 'coefficient_path', get_model_coefficient_path, full_model_id=full_model_id)
+        return coefficient_path
+
+    def get_aliasing(self, request_json: dict):
+        full_model_id = request_json['id']
+        current_app.logger.info(f"Getting aliased columns for Model ID: {full_model_id}")
+        aliasing = self.model_cache.get_or_create_cached_item(full_model_id, 'aliasing', get_model_aliasing, full_model_id=full_model_id)
+        return aliasing
+
+    def get_candidate_screening(self, request_json: dict):
+        full_model_id = request_json['id']
+        current_app.logger.info(f"Screening candidate variables for Model ID: {full_model_id}")
+        creation_args = {"data_handler": self.data_handler,
+                            "model_cache": self.model_cache,
+                            "full_model_id": full_model_id}
+        screening = self.model_cache.get_or_create_cached_item(full_model_id, 'candidate_screening', get_model_candidate_screening, **creation_args)
+        return screening.to_dict('records')
+
+    def get_interaction_detection(self, request_json: dict):
+        full_model_id = request_json['id']
+        current_app.logger.info(f"Detecting interactions for Model ID: {full_model_id}")
+        creation_args = {"data_handler": self.data_handler,
+                            "model_cache": self.model_cache,
+                            "full_model_id": full_model_id}
+        interactions = self.model_cache.get_or_create_cached_item(full_model_id, 'interaction_detection', get_model_interaction_detection, **creation_args)
+        return interactions
+
+    def get_factor_tests(self, request_json: dict):
+        full_model_id = request_json['id']
+        current_app.logger.info(f"Testing the factors of Model ID: {full_model_id}")
+        creation_args = {"data_handler": self.data_handler,
+                            "model_cache": self.model_cache,
+                            "full_model_id": full_model_id}
+        factor_tests = self.model_cache.get_or_create_cached_item(full_model_id, 'factor_tests', get_model_factor_tests, **creation_args)
+        return factor_tests.to_dict('records')
+
+    def get_warm_up_status(self):
+        return self.warm_up_scheduler.get_status()
+
+    def get_cache_stats(self):
+        cache_stats = self.model_cache.get_cache_stats()
+        current_app.logger.info(f"Model cache stats: {cache_stats}")
+        return cache_stats
     
     def export_model(self, request_json: dict):
         try:
@@ -418,6 +517,15 @@ class DataikuDataService:
             raise KeyError(f"An error occurred: {str(e)}")
 
         return csv_data
+
+    def export_factor_tests(self, request_json: dict):
+        full_model_id = request_json["id"]
+        current_app.logger.info(f"Exporting factor tests for Model ID: {full_model_id}")
+        creation_args = {"data_handler": self.data_handler,
+                            "model_cache": self.model_cache,
+                            "full_model_id": full_model_id}
+        df = self.model_cache.get_or_create_cached_item(full_model_id, 'factor_tests', get_model_factor_tests, **creation_args)
+        return df.to_csv(index=False).encode('utf-8')
     
     def export_lift_chart(self, request_json: dict):
         try:
@@ -429,21 +537,9 @@ class DataikuDataService:
             current_app.logger.info(f"Model ID received: {full_model_id}")
             creation_args = {"data_handler": self.data_handler,
                             "model_cache": self.model_cache,
-                            "full_model_id": full_model_id}
-            
-            model_retriever = VisualMLModelRetriver(full_model_id)
-        
-            lift_chart = LiftChartFormatter(
-                        model_retriever,
-                        self.data_handler
-            )
-            creation_args = {"data_handler": self.data_handler,
-                                "model_cache": self.model_cache,
-                                "full_model_id": full_model_id}
-            train_set = self.model_cache.get_or_create_cached_item(full_model_id, 'train_set', get_model_train_set, **creation_args)
-            test_set = self.model_cache.get_or_create_cached_item(full_model_id, 'test_set', get_model_test_set, **creation_args)
-
-            lift_chart_data = lift_chart.get_lift_chart(nb_bins, train_set, test_set)
+                            "full_model_id": full_model_id,
+                            "nb_bins": nb_bins}
+            lift_chart_data = self.model_cache.get_or_create_cached_item(full_model_id, f'lift_chart_{nb_bins}', get_model_lift_chart, **creation_args)
             
             lift_chart_data = lift_chart_data[lift_chart_data['dataset'] == dataset]
             csv_data = lift_chart_data.to_csv(index=False).encode('utf-8')
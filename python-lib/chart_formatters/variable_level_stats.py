@@ -1,12 +1,15 @@
 import logging
 import pandas as pd
 from glm_handler.dku_relativites_calculator import RelativitiesCalculator
+from glm_handler.columnar_accumulator import ColumnarAccumulator
 from logging_assist.logging import logger
 
 import logging
 import numpy as np
 import pandas as pd
 
+VARIABLE_STATS_COLUMNS = ['feature', 'value', 'relativity', 'coef', 'p_value', 'se', 'se_pct', 'exposure', 'exposure_pct']
+
 class VariableLevelStatsFormatter:
 
     def __init__(self, model_retriever, data_handler, relativities, relativities_interaction, base_values, train_set=None, test_set=None):
@@ -23,22 +26,28 @@ class VariableLevelStatsFormatter:
             coef_table = self._prepare_coef_table()
             features = self.model_retriever.get_features_used_in_modelling()
             
-            variable_stats = self._process_intercept(coef_table, self.relativities)
+            main_effects = ColumnarAccumulator(VARIABLE_STATS_COLUMNS)
+            main_effects.add_frame(self._process_intercept(coef_table, self.relativities))
             
             if categorical_features := self._get_categorical_features(features):
-                variable_stats = self._process_categorical_features(
-                    variable_stats, self.relativities, coef_table, categorical_features
-                )
+                main_effects.add_frame(self._process_categorical_features(
+                    self.relativities, coef_table, categorical_features
+                ))
 
             if numeric_features := self._get_numeric_features(features):
-                variable_stats = self._process_numeric_features(
-                    variable_stats, coef_table, numeric_features
-                )
+                main_effects.add_frame(self._process_numeric_features(
+                    coef_table, numeric_features
+                ))
             
+            variable_stats = main_effects.to_frame()
             if interaction_features := self._get_interaction_features():
-                variable_stats = self._process_interaction_features(
+                all_effects = ColumnarAccumulator(VARIABLE_STATS_COLUMNS)
+                all_effects.add_frame(variable_stats)
+                for variable_stats_interaction in self._process_interaction_features(
                     variable_stats, self.relativities_interaction, coef_table, interaction_features, categorical_features, numeric_features
-                )
+                ):
+                    all_effects.add_frame(variable_stats_interaction)
+                variable_stats = all_effects.to_frame()
             
             variable_stats = self._finalize_stats(variable_stats)
             logger.info("Finished getting variable level stats.")
@@ -81,7 +90,7 @@ class VariableLevelStatsFormatter:
         # Process each categorical column
         for column in category_columns:
             # Group by the current column and sum weights
-            groups = df.groupby(column)['weight'].sum()
+            groups = df.groupby(column, observed=True)['weight'].sum()
 
             # Add the results to our lists
             for value, weight in groups.items():
@@ -101,9 +110,9 @@ class VariableLevelStatsFormatter:
 
         return new_df
 
-    def _process_categorical_features(self, variable_stats, relativities, coef_table, categorical_features):
+    def _process_categorical_features(self, relativities, coef_table, categorical_features):
         logger.debug("Processing categorical features.")
-        predicted_cat = self.relativities_calculator.train_set.groupby(categorical_features)['weight'].sum().reset_index()
+        predicted_cat = self.relativities_calculator.train_set.groupby(categorical_features, observed=True)['weight'].sum().reset_index()
         predicted_cat = self._transform_dataset(predicted_cat)
         predicted_cat.rename(columns={"weight": "exposure"}, inplace=True)
         relativities_cat = relativities[relativities['feature'].isin(categorical_features)]
@@ -128,13 +137,13 @@ class VariableLevelStatsFormatter:
             on=['feature', 'value']
         )
         variable_stats_cat.drop(['exposure_sum'], axis=1, inplace=True)
-        return variable_stats.append(variable_stats_cat)
+        return variable_stats_cat
 
     def _get_numeric_features(self, features):
         logger.debug("Retrieving numeric features.")
         return [feature['variable'] for feature in features if feature['variableType'] == 'numeric' and feature['isInModel']]
 
-    def _process_numeric_features(self, variable_stats, coef_table, numeric_features):
+    def _process_numeric_features(self, coef_table, numeric_features):
         logger.debug("Processing numeric features.")
         coef_table_num = coef_table[(coef_table['index'].str.endswith(':_')) & (~coef_table['index'].str.startswith('interaction:'))].copy()
         coef_table_num['feature'] = [var.split(':')[1] for var in coef_table_num['index']]
@@ -144,7 +153,7 @@ class VariableLevelStatsFormatter:
         coef_table_num['relativity'] = 1
         
         variable_stats_num = coef_table_num[['feature', 'value', 'relativity', 'coef', 'p_value', 'se', 'se_pct', 'exposure', 'exposure_pct']]
-        return variable_stats.append(variable_stats_num)
+        return variable_stats_num
 
     def _get_interaction_features(self):
         return self.model_retriever.get_interactions()
@@ -154,16 +163,17 @@ class VariableLevelStatsFormatter:
         interaction_num_num = [interaction for interaction in interaction_features if ((interaction[0] in numeric_features) & (interaction[1] in numeric_features))]
         interaction_cat_num = [interaction for interaction in interaction_features if ((interaction not in interaction_cat_cat) & (interaction not in interaction_num_num))]
         
+        variable_stats_interactions = []
         if interaction_cat_cat:
-            variable_stats = self._process_interaction_features_cat_cat(variable_stats, relativities_interaction, coef_table, interaction_cat_cat)
+            variable_stats_interactions.append(self._process_interaction_features_cat_cat(variable_stats, relativities_interaction, coef_table, interaction_cat_cat))
         
         if interaction_num_num:
-            variable_stats = self._process_interaction_features_num_num(variable_stats, relativities_interaction, coef_table, interaction_num_num)
+            variable_stats_interactions.append(self._process_interaction_features_num_num(variable_stats, relativities_interaction, coef_table, interaction_num_num))
         
         if interaction_cat_num:
-            variable_stats = self._process_interaction_features_cat_num(variable_stats, relativities_interaction, coef_table, interaction_cat_num, numeric_features)
+            variable_stats_interactions.append(self._process_interaction_features_cat_num(variable_stats, relativities_interaction, coef_table, interaction_cat_num, numeric_features))
         
-        return variable_stats
+        return variable_stats_interactions
 
     def _process_interaction_features_cat_cat(self, variable_stats, relativities_interaction, coef_table, interaction_features):
         coef_table_interactions = coef_table[(coef_table['index'].str.startswith('interaction:'))]
@@ -200,14 +210,15 @@ class VariableLevelStatsFormatter:
         
         variable_stats_interaction['relativity'] = variable_stats_interaction['relativity'] / variable_stats_interaction['relativity_1'] / variable_stats_interaction['relativity_2']
         
-        groupings = pd.DataFrame()
+        groupings = ColumnarAccumulator(['feature_1', 'feature_2', 'value_1', 'value_2', 'exposure', 'interaction'])
         for i, interaction in enumerate(interaction_features):
-            interaction_grouped = self.relativities_calculator.train_set.groupby([interaction[0], interaction[1]])['weight'].sum().reset_index()
+            interaction_grouped = self.relativities_calculator.train_set.groupby([interaction[0], interaction[1]], observed=True)['weight'].sum().reset_index()
             interaction_grouped.columns = ['value_1', 'value_2', 'exposure']
             interaction_grouped['feature_1'] = interaction[0]
             interaction_grouped['feature_2'] = interaction[1]
             interaction_grouped['interaction'] = i
-            groupings = groupings.append(interaction_grouped)
+            groupings.add_frame(interaction_grouped)
+        groupings = groupings.to_frame()
         
         groupings['exposure_sum'] = groupings['exposure'].groupby(groupings['interaction']).transform('sum')
         groupings['exposure_pct'] = groupings['exposure'] / groupings['exposure_sum'] * 100
@@ -225,7 +236,7 @@ class VariableLevelStatsFormatter:
         
         variable_stats_interaction['relativity'] = [1 if np.isnan(coef) else rel for coef, rel in zip(variable_stats_interaction['coef'], variable_stats_interaction['relativity'])]
         
-        return variable_stats.append(variable_stats_interaction)
+        return variable_stats_interaction
     
     def _process_interaction_features_cat_num(self, variable_stats, relativities_interaction, coef_table, interactions_cat_num, numeric_features):
         coef_table_interactions = coef_table[(coef_table['index'].str.startswith('interaction:'))]
@@ -265,17 +276,18 @@ class VariableLevelStatsFormatter:
         
         variable_stats_interaction['relativity'] = variable_stats_interaction['relativity'] / variable_stats_interaction['relativity_1'] / variable_stats_interaction['relativity_2']
         
-        groupings = pd.DataFrame()
+        groupings = ColumnarAccumulator(['feature_1', 'feature_2', 'value_1', 'value_2', 'exposure', 'interaction'])
         for i, interaction in enumerate(interactions_cat_num):
             interaction_num = 0 if (interaction[0] in numeric_features) else 1
             interaction_cat = np.abs(interaction_num - 1)
-            interaction_grouped = self.relativities_calculator.train_set.groupby([interaction[interaction_cat]])['weight'].sum().reset_index()
+            interaction_grouped = self.relativities_calculator.train_set.groupby([interaction[interaction_cat]], observed=True)['weight'].sum().reset_index()
             interaction_grouped.columns = ['value_' + str(interaction_cat+1), 'exposure']
             interaction_grouped['value_' + str(interaction_num+1)] = self.base_values[interaction[interaction_num]]
             interaction_grouped['feature_' + str(interaction_cat+1)] = interaction[interaction_cat]
             interaction_grouped['feature_' + str(interaction_num+1)] = interaction[interaction_num]
             interaction_grouped['interaction'] = i
-            groupings = groupings.append(interaction_grouped)
+            groupings.add_frame(interaction_grouped)
+        groupings = groupings.to_frame()
         
         groupings['exposure_sum'] = groupings['exposure'].groupby(groupings['interaction']).transform('sum')
         groupings['exposure_pct'] = groupings['exposure'] / groupings['exposure_sum'] * 100
@@ -293,7 +305,7 @@ class VariableLevelStatsFormatter:
         
         variable_stats_interaction['relativity'] = [1 if np.isnan(coef) else rel for coef, rel in zip(variable_stats_interaction['coef'], variable_stats_interaction['relativity'])]
         
-        return variable_stats.append(variable_stats_interaction)
+        return variable_stats_interaction
 
     def _process_interaction_features_num_num(self, variable_stats, relativities_interaction, coef_table, interactions_num_num):
         coef_table_interactions = coef_table[(coef_table['index'].str.startswith('interaction:'))]
@@ -324,7 +336,7 @@ class VariableLevelStatsFormatter:
         
         variable_stats_interaction['relativity'] = [1 if np.isnan(coef) else rel for coef, rel in zip(variable_stats_interaction['coef'], variable_stats_interaction['relativity'])]
         
-        return variable_stats.append(variable_stats_interaction)
+        return variable_stats_interaction
 
     def _finalize_stats(self, variable_stats):
         logger.debug("Finalizing stats.")
@@ -139,6 +139,13 @@ def check_params(params):
         )
 
     dku_config.penalty = [dku_config.get("penalty_" + str(i)) for i in range(len(params.get('penalty')))]
+    if params.get('regularization_path') or params.get('cv_folds'):
+        # the penalties are fitted as one warm-started path for each l1_ratio
+        # (on each fold when cross-validating), so the grid search only runs
+        # over a single penalty value
+        params['penalty_path'] = dku_config.penalty
+        params['penalty'] = [min(dku_config.penalty)]
+        dku_config.penalty = params['penalty']
 
     if not isinstance(params.get('l1_ratio'), list):
         params['l1_ratio'] = [params.get('l1_ratio')]
@@ -2,6 +2,8 @@ import dataikuapi
 from logging_assist.logging import logger
 import re
 from dku_visual_ml.dku_base import DataikuClientProject
+from model_cache.model_conformity_checker import ModelConformityChecker
+from model_cache.object_pool import ObjectPool
 from dataiku.doctor.posttraining.model_information_handler import PredictionModelInformationHandler
 from typing import List, Dict, Any, Optional
 
@@ -23,6 +25,7 @@ class VisualMLModelRetriver(DataikuClientProject):
             self.project.project_key
         )
         self.model_details = self.task.get_trained_model_details(full_model_id) 
+        ModelConformityChecker.remember_model_details(full_model_id, self.model_details)
         self.algo_settings = self.model_details.get_modeling_settings().get('plugin_python_grid')
         self.model_info_handler = PredictionModelInformationHandler.from_full_model_id(self.full_model_id)
         self.offset_columns = self.get_offset_columns()
@@ -271,6 +274,7 @@ class VisualMLModelRetriver(DataikuClientProject):
             "theta": self.get_theta(),
             "power": self.get_power(),
             "var_power": self.get_var_power(),
+            "defer_metrics": self.algo_settings['params'].get('defer_metrics', False),
             "params": features_dict,
             "interactions":[
                 {'first': first, 'second': second}
@@ -284,7 +288,17 @@ class VisualMLModelRetriver(DataikuClientProject):
 
     def delete_model(self, model_id):
         
-        self.task.delete_trained_model(model_id=model_id)        
+        self.task.delete_trained_model(model_id=model_id)
 
-        
-    
+
+# retrievers hold the deserialised predictor of their model, only a few are kept
+MAX_POOLED_RETRIEVERS = 8
+RETRIEVER_TTL_SECONDS = 15 * 60
+model_retriever_pool = ObjectPool(VisualMLModelRetriver, max_size=MAX_POOLED_RETRIEVERS, ttl=RETRIEVER_TTL_SECONDS)
+
+
+def get_model_retriever(full_model_id):
+    """
+    pooled retriever of a model, constructed on the first request for the model only
+    """
+    return model_retriever_pool.get(full_model_id)
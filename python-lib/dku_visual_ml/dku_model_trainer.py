@@ -346,7 +346,11 @@ class VisualMLModelTrainer(DataikuClientProject):
                 "interaction_columns_second":second_columns,
                 "alpha": self.visual_ml_config.theta,
                 "power": self.visual_ml_config.power,
-                "var_power": self.visual_ml_config.variance_power
+                "var_power": self.visual_ml_config.variance_power,
+                # coefficients of the model to warm start from, empty for a cold start
+                "start_params": self.visual_ml_config.start_params,
+                # if deferred, goodness-of-fit metrics are computed when the webapp first displays them
+                "defer_metrics": self.visual_ml_config.defer_metrics
             })
         else: # for init
             algo_settings = settings.get_algorithm_settings(
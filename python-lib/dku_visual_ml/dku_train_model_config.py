@@ -95,6 +95,10 @@ class DKUVisualMLConfig:
             self.theta = request_json.get('model_parameters', {}).get('theta', None)
             self.power = request_json.get('model_parameters', {}).get('power', None)
             self.variance_power = request_json.get('model_parameters', {}).get('variance_power', None)
+            self.warm_start_model_id = request_json.get('model_parameters', {}).get('warm_start_model_id', None)
+            # goodness-of-fit metrics are computed at training time unless deferred
+            self.defer_metrics = bool(request_json.get('model_parameters', {}).get('defer_metrics', False))
+            self.start_params = {}
 
         self.variables = dict(request_json.get('variables', {}))
         self.variables_list = [{'name': key, **value} for key, value in self.variables.items()]
@@ -0,0 +1,120 @@
+import numpy as np
+from scipy import linalg
+from generalized_linear_models.covariance import as_tabmat
+from generalized_linear_models.glum_compat import sandwich_dot
+from generalized_linear_models.interactions import CHUNK_ELEMENTS
+
+# share of the squared norm of a column left after projecting it on the
+# previous columns below which it is considered aliased
+ALIASING_TOLERANCE = 1e-9
+
+
+def accumulate_gram(design_chunks):
+    """
+    accumulates the weighted Gram matrix [1 X]' W [1 X] (intercept first)
+    over (design chunk, sample_weight) pairs, sample_weight being optional
+    """
+    gram = None
+    for X_design, sample_weight in design_chunks:
+        X_design = as_tabmat(X_design)
+        if sample_weight is None:
+            sample_weight = np.ones(X_design.shape[0])
+        chunk_gram = sandwich_dot(X_design, np.asarray(sample_weight, dtype=np.float64), intercept=True)
+        gram = chunk_gram if gram is None else gram + chunk_gram
+    return gram
+
+
+def compute_gram(X, design_plan, sample_weight=None):
+    """
+    weighted Gram matrix of the design described by a design plan, built by
+    chunks of rows so that the design of the whole matrix is never materialised
+    """
+    chunk_size = max(1, CHUNK_ELEMENTS // max(len(design_plan.labels), 1))
+
+    def get_design_chunks():
+        for start in range(0, X.shape[0], chunk_size):
+            chunk_weight = None if sample_weight is None else sample_weight[start:start + chunk_size]
+            yield design_plan.transform(X[start:start + chunk_size]), chunk_weight
+
+    return accumulate_gram(get_design_chunks())
+
+
+def find_aliased_columns(gram, labels, tolerance=ALIASING_TOLERANCE):
+    """
+    finds the columns of a design that are linear combinations of the
+    intercept and of the columns before them
+
+    The R factor of the QR decomposition of the design is the Cholesky factor
+    of its Gram matrix, which is built here column by column, moving the
+    columns that add no rank to the end as R does with limited pivoting
+    (dqrdc2). The aliased columns are thus the last ones of each dependency,
+    in the order of the design, and their coefficients on the kept columns
+    are recovered from the factor.
+
+    Parameters
+    ----------
+    gram : numpy.ndarray, shape (n_features + 1, n_features + 1)
+        Weighted Gram matrix of the design, intercept first.
+    labels : list of str
+        Labels of the design columns.
+    tolerance : float, optional
+        Relative tolerance on the squared norm of the projection residual.
+
+    Returns
+    -------
+    list of dict
+        For each aliased column, its label and the combination of kept
+        columns it equals, keyed by label ('intercept' for the intercept).
+    """
+    all_labels = ['intercept'] + list(labels)
+    diagonal = gram.diagonal()
+    # the columns are scaled to unit norm so that the tolerance is relative
+    scale = np.where(diagonal > 0, np.sqrt(np.where(diagonal > 0, diagonal, 1)), 1)
+    scaled_gram = gram / np.outer(scale, scale)
+
+    n_columns = len(all_labels)
+    # lower triangular factor of the Gram matrix of the kept columns
+    factor = np.zeros((n_columns, n_columns))
+    kept = []
+    aliased = []
+    for column in range(n_columns):
+        size = len(kept)
+        if size == 0:
+            projection = np.zeros(0)
+        else:
+            projection = linalg.solve_triangular(factor[:size, :size], scaled_gram[kept, column], lower=True)
+        residual = scaled_gram[column, column] - projection @ projection
+        if diagonal[column] > 0 and residual > tolerance:
+            factor[size, :size] = projection
+            factor[size, size] = np.sqrt(residual)
+            kept.append(column)
+            continue
+        if size > 0:
+            coefficients = linalg.solve_triangular(factor[:size, :size].T, projection, lower=False)
+            coefficients = coefficients * scale[column] / scale[kept]
+        else:
+            coefficients = projection
+        aliased.append({
+            'column': all_labels[column],
+            'aliased_with': {all_labels[kept_column]: float(coefficient)
+                             for kept_column, coefficient in zip(kept, coefficients)
+                             if abs(coefficient) > 1e-8}
+        })
+    return aliased
+
+
+def format_aliasing(aliased):
+    """
+    describes aliased columns as equations, e.g. dummy:area:c = intercept - dummy:area:a - dummy:area:b
+    """
+    equations = []
+    for column in aliased:
+        terms = []
+        for label, coefficient in column['aliased_with'].items():
+            term = label if np.isclose(abs(coefficient), 1) else f'{abs(coefficient):.4g} * {label}'
+            if len(terms) == 0:
+                terms.append(f'-{term}' if coefficient < 0 else term)
+            else:
+                terms.append(f"{'-' if coefficient < 0 else '+'} {term}")
+        equations.append(f"{column['column']} = {' '.join(terms) if terms else '0'}")
+    return '; '.join(equations)
@@ -0,0 +1,96 @@
+import numpy as np
+from generalized_linear_models.covariance import compute_covariance_matrix
+
+
+class CompressedDesign:
+    """
+    Sufficient-statistic compression of a GLM training design
+
+    Rows sharing the same design values and offset are grouped into one
+    cell carrying the summed weight and the weighted mean target. For any
+    exponential dispersion family the score equations only depend on these
+    two quantities, so fitting on the cells gives the row-level coefficients.
+    The within-cell moments are kept so that the dispersion and the robust
+    covariance matrix can be reproduced exactly without the row-level design.
+
+    Parameters
+    ----------
+    X : numpy.ndarray, shape (n_samples, n_features)
+        Matrix whose rows define the cells, either the design matrix or the
+        preprocessed matrix the design is built from.
+    y : numpy.ndarray, shape (n_samples,)
+        Target values.
+    sample_weight : numpy.ndarray, shape (n_samples,), optional
+        Row weights, defaults to ones.
+    offset : numpy.ndarray, shape (n_samples,), optional
+        Aggregated offset of each row.
+    """
+    def __init__(self, X, y, sample_weight=None, offset=None):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        n_samples = X.shape[0]
+        if sample_weight is None:
+            sample_weight = np.ones(n_samples)
+        else:
+            sample_weight = np.asarray(sample_weight, dtype=np.float64)
+
+        keys = X if offset is None else np.column_stack((X, offset))
+        keys = np.ascontiguousarray(keys)
+        row_view = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1])))
+        _, first_rows, self.inverse = np.unique(row_view.ravel(), return_index=True, return_inverse=True)
+        self.inverse = self.inverse.ravel()
+        n_cells = len(first_rows)
+
+        self.n_samples = n_samples
+        self.X = X[first_rows]
+        self.offset = None if offset is None else np.asarray(offset, dtype=np.float64)[first_rows]
+        self.counts = np.bincount(self.inverse, minlength=n_cells).astype(np.float64)
+        self.sample_weight = np.bincount(self.inverse, weights=sample_weight, minlength=n_cells)
+
+        weighted_target = np.bincount(self.inverse, weights=sample_weight * y, minlength=n_cells)
+        # cells with no weight do not contribute to the fit, their target is
+        # only set to a value inside the family domain
+        unweighted_mean = np.bincount(self.inverse, weights=y, minlength=n_cells) / self.counts
+        has_weight = self.sample_weight > 0
+        self.y = np.where(has_weight, weighted_target / np.where(has_weight, self.sample_weight, 1), unweighted_mean)
+
+        centered = y - self.y[self.inverse]
+        squared_weight = sample_weight ** 2
+        self.sum_squared_deviations = np.bincount(self.inverse, weights=sample_weight * centered ** 2, minlength=n_cells)
+        self.sum_squared_weights = np.bincount(self.inverse, weights=squared_weight, minlength=n_cells)
+        self.sum_squared_weight_deviations = np.bincount(self.inverse, weights=squared_weight * centered, minlength=n_cells)
+        self.sum_squared_weight_squared_deviations = np.bincount(self.inverse, weights=squared_weight * centered ** 2, minlength=n_cells)
+
+    @property
+    def n_cells(self):
+        return self.X.shape[0]
+
+    def expand(self, cell_values):
+        """
+        broadcasts values computed per cell back to the original rows
+        """
+        return np.asarray(cell_values)[self.inverse]
+
+    def dispersion(self, family, mu, ddof):
+        """
+        Pearson dispersion of the row-level data, as estimated by glum
+        """
+        residuals = self.sum_squared_deviations + self.sample_weight * (self.y - mu) ** 2
+        numerator = np.sum(residuals / family.unit_variance(mu))
+        return numerator / (self.sample_weight.sum() - ddof)
+
+    def covariance_matrix(self, fitted_model, X, mu):
+        """
+        Covariance matrix of the coefficients (intercept first) of a glum model
+        fitted on the cells, identical to the one glum computes on the rows.
+        X is the design matrix of the cells the model was fitted on.
+        """
+        n_params = X.shape[1] + int(fitted_model.fit_intercept)
+        dispersion = self.dispersion(fitted_model.family_instance, mu, ddof=n_params)
+        # sum over the rows of a cell of w^2 (y - mu)^2, from the moments around the cell mean
+        gap = self.y - mu
+        squared_residuals = (self.sum_squared_weight_squared_deviations
+                             + 2 * gap * self.sum_squared_weight_deviations
+                             + gap ** 2 * self.sum_squared_weights)
+        return compute_covariance_matrix(fitted_model, X, self.y, mu, self.sample_weight, dispersion,
+                                         squared_residuals, counts=self.counts)
@@ -0,0 +1,73 @@
+import sys
+
+import numpy as np
+import tabmat as tm
+from scipy import linalg
+from generalized_linear_models.glum_compat import (fisher_information, observed_information, one_over_variance,
+                                                   sandwich_dot)
+
+
+def as_tabmat(X):
+    if isinstance(X, tm.MatrixBase):
+        return X
+    return tm.DenseMatrix(np.asarray(X, dtype=np.float64))
+
+
+def compute_covariance_matrix(fitted_model, X, y, mu, sample_weight, dispersion, squared_residuals, counts=None):
+    """
+    Covariance matrix of the coefficients (intercept first) of a fitted glum
+    model, as computed by GeneralizedLinearRegressor.covariance_matrix, but
+    with the outer product of the scores written as a sandwich product so
+    that the n x p score matrix is never materialised.
+
+    Parameters
+    ----------
+    fitted_model : glum.GeneralizedLinearRegressor
+        Fitted model.
+    X : numpy.ndarray or tabmat.MatrixBase, shape (n_rows, n_features)
+        Design matrix the model was fitted on.
+    y : numpy.ndarray, shape (n_rows,)
+        Target values, or weighted mean targets when rows are cells.
+    mu : numpy.ndarray, shape (n_rows,)
+        Predicted means.
+    sample_weight : numpy.ndarray, shape (n_rows,)
+        Weights, or summed weights when rows are cells.
+    dispersion : float
+        Pearson dispersion estimate.
+    squared_residuals : numpy.ndarray, shape (n_rows,)
+        Sum of w^2 (y - mu)^2 over the observations of each row.
+    counts : numpy.ndarray, shape (n_rows,), optional
+        Number of observations of each row, defaults to ones.
+
+    Returns
+    -------
+    numpy.ndarray, shape (n_features + 1, n_features + 1)
+    """
+    family = fitted_model.family_instance
+    link = fitted_model.link_instance
+    X = as_tabmat(X)
+    if counts is None:
+        counts = np.ones(X.shape[0])
+    n_params = X.shape[1] + int(fitted_model.fit_intercept)
+    sum_weights = sample_weight.sum()
+
+    if np.linalg.cond(sandwich_dot(X, counts)) > 1 / sys.float_info.epsilon ** 2:
+        raise np.linalg.LinAlgError("Matrix is singular. Cannot estimate standard errors.")
+
+    correction = sum_weights / (sum_weights - n_params)
+    if not fitted_model.robust:
+        fisher = fisher_information(family, link, X, y, mu, sample_weight, dispersion, fitted_model.fit_intercept)
+        return linalg.inv(fisher) * correction
+
+    if fitted_model.expected_information:
+        information = fisher_information
+    else:
+        information = observed_information
+    oim = information(family, link, X, y, mu, sample_weight, dispersion, fitted_model.fit_intercept)
+
+    # the score of an observation is c * w * (y - mu) * x, with c only depending on mu
+    eta = link.link(mu)
+    score_factor = one_over_variance(family, link, mu, eta, dispersion, np.ones_like(mu)) * link.inverse_derivative(eta)
+    inner_part = sandwich_dot(X, score_factor ** 2 * squared_residuals, intercept=fitted_model.fit_intercept)
+    vcov = linalg.solve(oim, linalg.solve(oim, inner_part).T)
+    return vcov * correction
@@ -0,0 +1,155 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from glum import GeneralizedLinearRegressor
+from generalized_linear_models.compression import CompressedDesign
+from generalized_linear_models.covariance import as_tabmat
+
+
+def get_fold_ids(n_samples, n_folds, seed):
+    """
+    assigns every row to a fold, the same way for a given seed
+    """
+    if n_folds < 2 or n_folds > n_samples:
+        raise ValueError(f'The number of folds should be between 2 and the number of rows, got {n_folds}')
+    permutation = np.random.default_rng(seed).permutation(n_samples)
+    fold_ids = np.empty(n_samples, dtype=np.int32)
+    fold_ids[permutation] = np.arange(n_samples) % n_folds
+    return fold_ids
+
+
+def get_n_workers(n_jobs, n_folds):
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    return max(1, min(n_jobs, n_folds))
+
+
+class SharedArrays:
+    """
+    Copies of arrays in shared memory blocks, created once by the parent
+    process and mapped by the worker processes without being pickled.
+    The blocks are released when leaving the context.
+    """
+    def __init__(self, **arrays):
+        self.blocks = []
+        self.specs = {}
+        for name, array in arrays.items():
+            if array is None:
+                continue
+            array = np.asarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def fit_shared_fold(estimator, specs, fold, penalties):
+    """
+    worker entry point: maps the shared arrays and fits the penalty path on one fold
+    """
+    blocks = {}
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        blocks[name] = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+    try:
+        return fit_fold(estimator, arrays['X'], arrays['y'], arrays.get('sample_weight'), arrays.get('offset'),
+                        arrays['fold_ids'] == fold, penalties)
+    finally:
+        # views on the blocks must be released before closing them
+        arrays.clear()
+        for block in blocks.values():
+            block.close()
+
+
+def fit_fold(estimator, X, y, sample_weight, offset, validation, penalties):
+    """
+    fits the penalty path on the rows outside of the validation fold and
+    returns the deviance of each penalty on the validation rows
+
+    Parameters
+    ----------
+    estimator : BaseGLM
+        Estimator whose design plan is compiled.
+    X : numpy.ndarray, shape (n_samples, n_columns)
+        Preprocessed matrix provided by DSS.
+    y : numpy.ndarray, shape (n_samples,)
+        Target values.
+    sample_weight : numpy.ndarray, shape (n_samples,) or None
+        Row weights.
+    offset : numpy.ndarray, shape (n_samples,) or None
+        Aggregated offset and log exposure of each row.
+    validation : numpy.ndarray of bool, shape (n_samples,)
+        Rows of the validation fold.
+    penalties : list of float
+        Penalties in decreasing order.
+
+    Returns
+    -------
+    numpy.ndarray, shape (n_penalties,)
+    """
+    def split(array):
+        if array is None:
+            return None, None
+        return array[~validation], array[validation]
+
+    X_train, X_validation = split(X)
+    y_train, y_validation = split(y)
+    weight_train, weight_validation = split(sample_weight)
+    offset_train, offset_validation = split(offset)
+
+    path_model = GeneralizedLinearRegressor(alpha=penalties, alpha_search=True, l1_ratio=estimator.l1_ratio,
+                                            fit_intercept=True, family=estimator.family, link=estimator.link,
+                                            copy_X=False)
+    if estimator.compress_design:
+        design = CompressedDesign(X_train, y_train, weight_train, offset_train)
+        path_model.fit(estimator.get_design(design.X), design.y, sample_weight=design.sample_weight,
+                       offset=design.offset)
+    else:
+        path_model.fit(estimator.get_design(X_train), y_train, sample_weight=weight_train, offset=offset_train)
+
+    X_validation = as_tabmat(estimator.get_design(X_validation))
+    family = estimator.family_glum_class
+    deviances = np.empty(len(penalties))
+    for alpha_index, (coefs, intercept) in enumerate(zip(path_model.coef_path_, path_model.intercept_path_)):
+        linear_predictor = X_validation.matvec(coefs) + intercept
+        if offset_validation is not None:
+            linear_predictor += offset_validation
+        predictions = path_model.link_instance.inverse(linear_predictor)
+        deviances[alpha_index] = family.deviance(y_validation, predictions, sample_weight=weight_validation)
+    return deviances
+
+
+def cross_validate_penalties(estimator, X, y, sample_weight, offset, penalties, n_folds, seed, n_jobs=None):
+    """
+    computes the out-of-fold deviance of every penalty, fitting the folds in
+    parallel worker processes which share the training arrays
+
+    Returns
+    -------
+    numpy.ndarray, shape (n_folds, n_penalties)
+        Deviance of each penalty on each validation fold.
+    """
+    fold_ids = get_fold_ids(len(y), n_folds, seed)
+    n_workers = get_n_workers(n_jobs, n_folds)
+    if n_workers == 1:
+        return np.array([fit_fold(estimator, X, y, sample_weight, offset, fold_ids == fold, penalties)
+                         for fold in range(n_folds)])
+
+    with SharedArrays(X=X, y=y, sample_weight=sample_weight, offset=offset, fold_ids=fold_ids) as shared:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(fit_shared_fold, estimator, shared.specs, fold, penalties)
+                       for fold in range(n_folds)]
+            # results are gathered in fold order so that they do not depend on scheduling
+            return np.array([future.result() for future in futures])
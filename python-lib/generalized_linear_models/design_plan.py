@@ -0,0 +1,86 @@
+import numpy as np
+from generalized_linear_models.interactions import CHUNK_ELEMENTS, build_interaction_columns
+
+
+def read_only_indices(indices):
+    indices = np.array(indices, dtype=np.intp)
+    indices.flags.writeable = False
+    return indices
+
+
+class DesignPlan():
+    """
+    Immutable description of how the preprocessed DSS matrix is turned into
+    the GLM design, compiled once from the column labels at fit time and
+    replayed as pure index operations at predict time
+
+    Parameters
+    ----------
+    offset_indices : list of int
+        Indices of the offset columns in the preprocessed matrix.
+    exposure_indices : list of int
+        Indices of the exposure columns in the preprocessed matrix.
+    kept_indices : list of int
+        Indices of the columns used as GLM variables, in design order.
+    interaction_first : list of int
+        For each interaction column, index of its first factor in the kept columns.
+    interaction_second : list of int
+        For each interaction column, index of its second factor in the kept columns.
+    labels : list of str
+        Labels of the design columns, kept columns then interaction columns.
+    n_columns : int
+        Number of columns of the preprocessed matrix.
+    """
+    __slots__ = ('offset_indices', 'exposure_indices', 'kept_indices', 'removed_indices',
+                 'interaction_first', 'interaction_second', 'labels', 'n_columns')
+
+    def __init__(self, offset_indices, exposure_indices, kept_indices, interaction_first,
+                 interaction_second, labels, n_columns):
+        set_attribute = super().__setattr__
+        set_attribute('offset_indices', read_only_indices(offset_indices))
+        set_attribute('exposure_indices', read_only_indices(exposure_indices))
+        set_attribute('kept_indices', read_only_indices(kept_indices))
+        set_attribute('removed_indices', read_only_indices(np.setdiff1d(np.arange(n_columns), kept_indices)))
+        set_attribute('interaction_first', read_only_indices(interaction_first))
+        set_attribute('interaction_second', read_only_indices(interaction_second))
+        set_attribute('labels', tuple(labels))
+        set_attribute('n_columns', n_columns)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('DesignPlan is immutable')
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            if isinstance(value, np.ndarray):
+                value = value.copy()
+                value.flags.writeable = False
+            super().__setattr__(name, value)
+
+    @property
+    def n_interactions(self):
+        return len(self.interaction_first)
+
+    def get_offsets_and_exposures(self, X):
+        offsets = X[:, self.offset_indices] if len(self.offset_indices) > 0 else []
+        exposures = X[:, self.exposure_indices] if len(self.exposure_indices) > 0 else []
+        return offsets, exposures
+
+    def transform(self, X, out=None):
+        """
+        returns the GLM design matrix: kept columns followed by interactions,
+        written into a single Fortran-ordered buffer (or into out if provided)
+        """
+        if X.shape[1] != self.n_columns:
+            raise ValueError(f'Expected {self.n_columns} columns, got {X.shape[1]}')
+        n_kept = len(self.kept_indices)
+        if out is None:
+            out = np.empty((X.shape[0], n_kept + self.n_interactions), dtype=np.float64, order='F')
+        # copies by chunks of rows so that no temporary of the size of the design is created
+        chunk_size = max(1, CHUNK_ELEMENTS // max(n_kept, 1))
+        for start in range(0, X.shape[0], chunk_size):
+            out[start:start + chunk_size, :n_kept] = X[start:start + chunk_size][:, self.kept_indices]
+        build_interaction_columns(out, self.interaction_first, self.interaction_second, out=out[:, n_kept:])
+        return out
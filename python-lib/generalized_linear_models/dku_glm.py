@@ -10,8 +10,14 @@ from glum import NegativeBinomialDistribution
 import numpy as np
 from sklearn.base import BaseEstimator, ClassifierMixin
 import generalized_linear_models.link as link
-import pandas as pd
 from generalized_linear_models.interactions import Interactions
+from generalized_linear_models.compression import CompressedDesign
+from generalized_linear_models.design_plan import DesignPlan
+from generalized_linear_models.split_design import build_split_matrix
+from generalized_linear_models.covariance import as_tabmat, compute_covariance_matrix
+from generalized_linear_models.cross_validation import cross_validate_penalties
+from generalized_linear_models.streaming import StreamingIRLS
+from generalized_linear_models.aliasing import accumulate_gram, compute_gram, find_aliased_columns, format_aliasing
 
 class BaseGLM(BaseEstimator, ClassifierMixin):
     """
@@ -22,7 +28,9 @@ class BaseGLM(BaseEstimator, ClassifierMixin):
                  poisson_link="log", negative_binomial_link="log", tweedie_link="log", alpha=1, power=1, penalty=0.0, l1_ratio=0.5,
                  var_power=1, offset_mode="BASIC", training_dataset=None, offset_columns=None, exposure_columns=None,
                  interaction_columns_first=None, interaction_columns_second=None,
-                 column_labels=None):
+                 column_labels=None, compress_design=False, sparse_design=False, defer_metrics=False,
+                 regularization_path=False, penalty_path=None, cv_folds=0, cv_seed=1337, n_jobs=-1,
+                 start_params=None, drop_aliased=False):
         
         self.family_name = family_name
         self.binomial_link = binomial_link
@@ -52,6 +60,21 @@ class BaseGLM(BaseEstimator, ClassifierMixin):
             if penalty < 0:
                 raise ValueError('penalty should be positive')
         self.penalty = penalty
+        if penalty_path is not None:
+            for p in penalty_path:
+                if p < 0:
+                    raise ValueError('penalty should be positive')
+        self.penalty_path = penalty_path
+        self.regularization_path = regularization_path
+        if cv_folds is None:
+            cv_folds = 0
+        if cv_folds == 1 or cv_folds < 0:
+            raise ValueError('cv_folds should be 0 (no cross-validation) or at least 2')
+        self.cv_folds = cv_folds
+        self.cv_seed = cv_seed
+        self.n_jobs = n_jobs
+        self.start_params = start_params
+        self.drop_aliased = drop_aliased
         if family_name == 'tweedie':
             if not isinstance(var_power, (int, float)):
                 raise ValueError('var_power should be defined with a numeric value, current value of ' + str(
@@ -80,12 +103,22 @@ class BaseGLM(BaseEstimator, ClassifierMixin):
         self.interaction_columns_second = interaction_columns_second
         self.column_labels = column_labels
         self.training_dataset = training_dataset
+        self.compress_design = compress_design
+        self.sparse_design = sparse_design
+        self.defer_metrics = defer_metrics
         self.removed_indices = None
+        self.design_plan = None
         self.assign_family()
         self.assign_family_glum_class()
         self.aic_value = None
         self.bic_value = None
         self.deviance_value = None
+        self.log_likelihood_value = None
+        self.pearson_chi2_value = None
+        self.path_statistics = None
+        self.cv_statistics = None
+        self.selected_penalty = None
+        self.aliased_columns = None
 
     def get_link_function(self):
         """
@@ -227,36 +260,378 @@ class BaseGLM(BaseEstimator, ClassifierMixin):
     def set_interactions(self):
         self.interactions = Interactions(self.interaction_columns_first, self.interaction_columns_second)
 
+    def compile_design_plan(self, X, excluded_labels=()):
+        """
+        resolves offsets, exposures, removed columns and interactions
+        from the column labels into index arrays, once at fit time
+        excluded_labels are design columns left out of the design, the
+        interactions built on an excluded column being left out with it
+        """
+        self.get_offsets_and_exposures(X)
+        self.set_interactions()
+        removed_indices = set(self.offset_indices) | set(self.exposure_indices)
+        removed_indices.update(i for i, label in enumerate(self.column_labels)
+                               if self.is_NA_column(label) or label in excluded_labels)
+        kept_indices = [i for i in range(len(self.column_labels)) if i not in removed_indices]
+        kept_labels = [self.column_labels[i] for i in kept_indices]
+        interaction_first, interaction_second, interaction_labels = [], [], []
+        for first, second, label in zip(*self.interactions.get_index_pairs(kept_labels)):
+            if label not in excluded_labels:
+                interaction_first.append(first)
+                interaction_second.append(second)
+                interaction_labels.append(label)
+        return DesignPlan(self.offset_indices, self.exposure_indices, kept_indices, interaction_first,
+                          interaction_second, kept_labels + interaction_labels, len(self.column_labels))
+
+    def set_design_plan(self, design_plan):
+        self.design_plan = design_plan
+        self.removed_indices = design_plan.removed_indices.tolist()
+        self.final_labels = list(design_plan.labels)
+
+    def check_aliasing(self, gram):
+        """
+        finds the design columns that are linear combinations of the intercept
+        and of the previous columns from the Gram matrix of the design, before
+        any fit. Fails listing them, or if drop_aliased is set, recompiles the
+        design plan without them so that their coefficients are set to 0
+        """
+        self.aliased_columns = find_aliased_columns(gram, self.final_labels)
+        if len(self.aliased_columns) == 0:
+            return
+        if not self.drop_aliased:
+            raise ValueError(f'The design matrix is rank deficient, the following columns are aliased: '
+                             f'{format_aliasing(self.aliased_columns)}. Please remove these variables or '
+                             f'enable the option to drop aliased columns.')
+        aliased_labels = {column['column'] for column in self.aliased_columns}
+        # the design plan only depends on the column labels
+        self.set_design_plan(self.compile_design_plan(np.zeros((1, len(self.column_labels))), aliased_labels))
+
+    def get_aliasing(self):
+        """
+        the aliased columns found by the last fit, with the equation giving
+        each one from the kept columns, empty when the design has full rank
+        """
+        aliased_columns = getattr(self, 'aliased_columns', None) or []
+        return [{'column': column['column'], 'equation': format_aliasing([column])} for column in aliased_columns]
+
     def fit_model(self, X, y, sample_weight=None, prediction_is_classification=False):
         """
         fits a GLM model
         """
         self.classes_ = list(set(y))
-        offsets, exposures = self.get_offsets_and_exposures(X)
-        self.set_interactions()
-        
-        X = self.process_fixed_columns(X)
-        
-        X = self.interactions.transform(X, self.final_labels)
-        
+        self.set_design_plan(self.compile_design_plan(X))
+
+        offsets, exposures = self.design_plan.get_offsets_and_exposures(X)
         offset_output = self.compute_aggregate_offset(offsets, exposures)
+
+        # the aliasing check works on the structure the fit uses, so that the
+        # dense row-level design is only built on the dense path
+        compressed_design = None
+        X_design = None
+        if self.compress_design:
+            # interactions are functions of the kept columns, so the cells can be
+            # found on the preprocessed matrix before the design is built
+            compressed_design = CompressedDesign(X, y, sample_weight, offset_output)
+            # the Gram matrix of the cells weighted by their summed weights is the one of the rows
+            self.check_aliasing(accumulate_gram([(self.get_design(compressed_design.X),
+                                                  compressed_design.sample_weight)]))
+        elif self.sparse_design:
+            X_design = self.get_design(X)
+            design_plan = self.design_plan
+            self.check_aliasing(accumulate_gram([(X_design, sample_weight)]))
+            if self.design_plan is not design_plan:
+                # rebuilt without the aliased columns
+                X_design = self.get_design(X)
+        else:
+            self.check_aliasing(compute_gram(X, self.design_plan, sample_weight))
         
+        penalty = self.penalty
+        if self.cv_folds:
+            penalty = self.select_cv_penalty(X, y, sample_weight, offset_output)
+
         #  fits and stores glum glm
-        self.fitted_model = GeneralizedLinearRegressor(alpha=self.penalty, l1_ratio=self.l1_ratio, fit_intercept=True,
-                                            family=self.family, link=self.link)
-        X_df = pd.DataFrame(X, columns=self.final_labels)
-        self.fitted_model.fit(X_df, y, sample_weight=sample_weight, offset=offset_output, store_covariance_matrix=True)
-        
-        self.aic_value = np.round(self.fitted_model.aic(X_df, y), 2)
-        self.bic_value = np.round(self.fitted_model.bic(X_df, y), 2)
-        
-        predictions = self.fitted_model.predict(X_df)
-        self.deviance_value = np.round(self.family_glum_class.deviance(y ,predictions), 2)
+        # the design buffer is built for glum, which can then use it without copying it
+        if self.uses_regularization_path():
+            # the whole penalty sequence is fitted in one call, each fit warm started from the previous one
+            self.fitted_model = GeneralizedLinearRegressor(alpha=self.get_penalty_path(), alpha_search=True,
+                                                l1_ratio=self.l1_ratio, fit_intercept=True,
+                                                family=self.family, link=self.link, copy_X=False,
+                                                start_params=self.get_start_params())
+        else:
+            self.fitted_model = GeneralizedLinearRegressor(alpha=penalty, l1_ratio=self.l1_ratio, fit_intercept=True,
+                                                family=self.family, link=self.link, copy_X=False,
+                                                start_params=self.get_start_params())
+        if self.compress_design:
+            predictions = self.fit_compressed(compressed_design, y, sample_weight)
+        else:
+            if X_design is None:
+                X_design = self.get_design(X)
+            predictions = self.fit_design(X_design, y, sample_weight, offset_output)
+
+        if not self.defer_metrics:
+            self.compute_fit_statistics(y, predictions, sample_weight)
         
         self.coef_table = self.fitted_model.coef_table()
         
         self.compute_coefs(prediction_is_classification)
         
+    def get_start_params(self):
+        """
+        returns the starting coefficients (intercept first) in design order
+        from the coefficients of a previous model keyed by label: columns
+        new to this model start at zero, columns it no longer has are dropped
+        """
+        if not self.start_params:
+            return None
+        start_params = {label: float(value) for label, value in self.start_params.items()}
+        if 'intercept' not in start_params:
+            raise ValueError('start_params should contain the intercept of the previous model')
+        return np.array([start_params['intercept']] + [start_params.get(label, 0.0) for label in self.final_labels])
+
+    def fit_model_chunks(self, get_chunks, prediction_is_classification=False):
+        """
+        fits a GLM on a training set read by chunks, with a ridge penalty only
+        get_chunks is called once per pass over the data and returns an
+        iterable of (X, y) or (X, y, sample_weight) chunks of the preprocessed matrix
+
+        This is library-only: DSS visual ML trains the plugin algorithm with
+        fit on the preprocessed matrix in memory, so no DSS dataset iterator
+        reaches this method from the plugin.
+        """
+        if self.penalty > 0 and self.l1_ratio > 0:
+            raise ValueError('The chunked fit only supports a ridge penalty, l1_ratio should be 0')
+        # the design plan only depends on the column labels, a placeholder row avoids reading a chunk
+        self.set_design_plan(self.compile_design_plan(np.zeros((1, len(self.column_labels)))))
+        classes = set()
+
+        def get_design_chunks():
+            for chunk in get_chunks():
+                X, y = chunk[0], chunk[1]
+                sample_weight = chunk[2] if len(chunk) > 2 else None
+                if prediction_is_classification:
+                    classes.update(np.unique(y))
+                offsets, exposures = self.design_plan.get_offsets_and_exposures(X)
+                yield self.get_design(X), y, sample_weight, self.compute_aggregate_offset(offsets, exposures)
+
+        # the unfitted glum glm carries the family, the link and the results
+        self.fitted_model = GeneralizedLinearRegressor(alpha=self.penalty, l1_ratio=self.l1_ratio, fit_intercept=True,
+                                                       family=self.family, link=self.link)
+        self.check_aliasing(accumulate_gram((X_design, sample_weight)
+                                            for X_design, _, sample_weight, _ in get_design_chunks()))
+        fitter = StreamingIRLS(self.fitted_model.family_instance, self.fitted_model.link_instance,
+                               penalty=self.penalty * (1 - self.l1_ratio))
+        fitter.fit(get_design_chunks, self.get_start_params())
+        fitter.summarize(get_design_chunks, self.fitted_model.expected_information)
+        self.classes_ = sorted(classes)
+
+        self.fitted_model.coef_ = fitter.coef_
+        self.fitted_model.intercept_ = fitter.intercept_
+        self.fitted_model.feature_names_ = self.final_labels
+        self.fitted_model.covariance_matrix_ = fitter.covariance_matrix(self.fitted_model.robust)
+        if not self.defer_metrics:
+            self.set_fit_statistics(self.format_fit_statistics(fitter.log_likelihood_, fitter.deviance_,
+                                                               fitter.pearson_chi2_, fitter.coef_, fitter.n_samples_))
+        self.coef_table = self.fitted_model.coef_table()
+        self.compute_coefs(prediction_is_classification)
+
+    def get_design(self, X):
+        """
+        builds the design matrix fed to glum from the preprocessed matrix:
+        a tabmat SplitMatrix with categorical and sparse blocks if sparse_design
+        is set, a single Fortran-ordered array otherwise
+        """
+        if self.sparse_design:
+            return build_split_matrix(X, self.design_plan)
+        return self.design_plan.transform(X)
+
+    def fit_design(self, X_design, y, sample_weight, offset):
+        """
+        fits the glum glm on the design matrix and computes its covariance
+        matrix, reusing the design buffer for every step
+        returns the predictions on the training rows
+        """
+        self.fitted_model.fit(X_design, y, sample_weight=sample_weight, offset=offset)
+        self.fitted_model.feature_names_ = self.final_labels
+        if self.uses_regularization_path():
+            self.select_path_penalty(X_design, offset, y, sample_weight)
+        predictions = self.predict_design(X_design, offset)
+        if sample_weight is None:
+            sample_weight = np.ones_like(predictions)
+        n_params = X_design.shape[1] + 1
+        dispersion = self.fitted_model.family_instance.dispersion(y, predictions, sample_weight, ddof=n_params)
+        squared_residuals = (sample_weight * (y - predictions)) ** 2
+        self.fitted_model.covariance_matrix_ = compute_covariance_matrix(
+            self.fitted_model, X_design, y, predictions, sample_weight, dispersion, squared_residuals)
+        return predictions
+
+    def fit_compressed(self, design, y, sample_weight):
+        """
+        fits the glum glm on the distinct (design row, offset) cells of a CompressedDesign
+        returns the predictions on the original rows
+        """
+        X_cells = self.get_design(design.X)
+        self.fitted_model.fit(X_cells, design.y, sample_weight=design.sample_weight, offset=design.offset)
+        self.fitted_model.feature_names_ = self.final_labels
+        if self.uses_regularization_path():
+            self.select_path_penalty(X_cells, design.offset, y, sample_weight, design.expand)
+        cell_predictions = self.predict_design(X_cells, design.offset)
+        self.fitted_model.covariance_matrix_ = design.covariance_matrix(self.fitted_model, X_cells, cell_predictions)
+        return design.expand(cell_predictions)
+
+    def get_penalty_path(self):
+        """
+        returns the penalties of the regularization path in decreasing order,
+        the order in which glum warm starts each fit from the previous one
+        """
+        penalties = self.penalty_path if self.penalty_path is not None else self.penalty
+        if not isinstance(penalties, list):
+            penalties = [penalties]
+        return sorted(set(penalties), reverse=True)
+
+    def uses_regularization_path(self):
+        # with cross-validation the path is only fitted on the folds
+        return self.regularization_path and not self.cv_folds
+
+    def select_cv_penalty(self, X, y, sample_weight, offset):
+        """
+        fits the penalty path on each of the cv_folds folds in parallel and
+        returns the penalty with the lowest out-of-fold deviance
+        """
+        penalties = self.get_penalty_path()
+        fold_deviances = cross_validate_penalties(self, X, y, sample_weight, offset, penalties,
+                                                  self.cv_folds, self.cv_seed, self.n_jobs)
+        deviances = fold_deviances.sum(axis=0)
+        self.cv_statistics = {
+            'penalty': [float(penalty) for penalty in penalties],
+            'deviance': deviances.tolist(),
+            'fold_deviance': fold_deviances.tolist()
+        }
+        self.selected_penalty = float(penalties[int(np.argmin(deviances))])
+        return self.selected_penalty
+
+    def select_path_penalty(self, X_design, offset, y, sample_weight, expand=None):
+        """
+        computes the deviance and AIC of every penalty of the regularization path
+        and keeps the penalty with the lowest AIC, or the lowest penalty when
+        the family has no log-likelihood
+        X_design and offset are the ones the path was fitted on, expand maps
+        their rows back to the rows of y when the design is compressed
+        """
+        fitted_model = self.fitted_model
+        penalties = [float(penalty) for penalty in fitted_model._alphas]
+        deviances = []
+        aics = []
+        for alpha_index in range(len(penalties)):
+            predictions = self.predict_design(X_design, offset, alpha_index)
+            if expand is not None:
+                predictions = expand(predictions)
+            statistics = self.get_fit_statistics(y, predictions, fitted_model.coef_path_[alpha_index], sample_weight)
+            deviances.append(float(statistics['deviance']))
+            aics.append(None if statistics['aic'] is None else float(statistics['aic']))
+
+        if any(aic is None for aic in aics):
+            selected_index = len(penalties) - 1
+        else:
+            selected_index = int(np.argmin(aics))
+        self.path_statistics = {
+            'penalty': penalties,
+            'intercept': fitted_model.intercept_path_.tolist(),
+            'coefficients': dict(zip(self.final_labels, fitted_model.coef_path_.T.tolist())),
+            'deviance': deviances,
+            'aic': aics
+        }
+        self.selected_penalty = penalties[selected_index]
+        fitted_model.intercept_ = fitted_model.intercept_path_[selected_index]
+        fitted_model.coef_ = fitted_model.coef_path_[selected_index]
+
+    def linear_predictor_design(self, X_design, offset=None, alpha_index=None):
+        """
+        computes the linear predictor from a design matrix without the input
+        copy made by glum predict
+        alpha_index selects a penalty of the regularization path instead of the fitted one
+        """
+        if alpha_index is None:
+            coefs, intercept = self.fitted_model.coef_, self.fitted_model.intercept_
+        else:
+            coefs, intercept = self.fitted_model.coef_path_[alpha_index], self.fitted_model.intercept_path_[alpha_index]
+        linear_predictor = as_tabmat(X_design).matvec(coefs) + intercept
+        if offset is not None:
+            linear_predictor += offset
+        return linear_predictor
+
+    def predict_design(self, X_design, offset=None, alpha_index=None):
+        return self.fitted_model.link_instance.inverse(self.linear_predictor_design(X_design, offset, alpha_index))
+
+    def compute_fit_statistics(self, y, predictions, sample_weight=None):
+        """
+        computes log-likelihood, AIC, BIC, deviance and Pearson chi-square
+        from the predictions on the training rows, in a single pass over them
+        the predictions are derived once from the linear predictor at fit time,
+        or read from the scored train set when the metrics are deferred
+        """
+        self.set_fit_statistics(self.get_fit_statistics(y, predictions, self.fitted_model.coef_, sample_weight))
+
+    def set_fit_statistics(self, statistics):
+        self.log_likelihood_value = statistics['log_likelihood']
+        self.aic_value = statistics['aic']
+        self.bic_value = statistics['bic']
+        self.deviance_value = statistics['deviance']
+        self.pearson_chi2_value = statistics['pearson_chi2']
+
+    def get_coefficients_by_label(self):
+        """
+        returns the fitted coefficients keyed by label, to warm start another model
+        """
+        coefficients = {'intercept': float(self.fitted_model.intercept_)}
+        coefficients.update(zip(self.final_labels, self.fitted_model.coef_.tolist()))
+        return coefficients
+
+    def get_fit_statistics(self, y, predictions, coefs, sample_weight=None):
+        """
+        returns the rounded fit statistics of the predictions, the number of
+        parameters being the non-zero coefficients plus the intercept
+        """
+        y = np.asarray(y, dtype=np.float64)
+        predictions = np.asarray(predictions, dtype=np.float64)
+        family = self.family_glum_class
+        if sample_weight is None:
+            sample_weight = np.ones_like(y)
+        pearson_chi2 = np.dot(sample_weight, (y - predictions) ** 2 / family.unit_variance(predictions))
+        deviance = family.deviance(y, predictions, sample_weight=sample_weight)
+
+        if isinstance(family, TweedieDistribution) and family.power != 1:
+            # same Pearson estimate glum would compute, without another pass over the rows
+            log_likelihood_params = {'dispersion': pearson_chi2 / (sample_weight.sum() - 1)}
+        else:
+            log_likelihood_params = {}
+        try:
+            log_likelihood = family.log_likelihood(y, predictions, sample_weight=sample_weight, **log_likelihood_params)
+        except NotImplementedError:
+            # glum has no log-likelihood for some families, e.g. inverse gaussian
+            log_likelihood = None
+        return self.format_fit_statistics(log_likelihood, deviance, pearson_chi2, coefs, len(y))
+
+    def format_fit_statistics(self, log_likelihood, deviance, pearson_chi2, coefs, n_samples):
+        """
+        rounds the statistics and derives AIC and BIC from the log-likelihood
+        """
+        k_params = np.sum(np.abs(coefs) > np.finfo(coefs.dtype).eps) + 1
+        statistics = {
+            'pearson_chi2': np.round(pearson_chi2, 2),
+            'deviance': np.round(deviance, 2),
+            'log_likelihood': None,
+            'aic': None,
+            'bic': None
+        }
+        if log_likelihood is not None:
+            statistics.update(log_likelihood=np.round(log_likelihood, 2),
+                              aic=np.round(-2 * log_likelihood + 2 * k_params, 2),
+                              bic=np.round(-2 * log_likelihood + k_params * np.log(n_samples), 2))
+        return statistics
+
+    def has_fit_statistics(self):
+        return getattr(self, 'deviance_value', None) is not None
+
     def compute_coefs(self, prediction_is_classification):
         """
         adds attributes for explainability
@@ -336,14 +711,21 @@ class BaseGLM(BaseEstimator, ClassifierMixin):
 
     def predict_target(self, X):
         
-        offsets, exposures = self.get_offsets_and_exposures(X)
-        self.set_interactions()
-        X = self.process_fixed_columns(X)
-        X = self.interactions.transform(X, self.final_labels)
+        if getattr(self, 'design_plan', None) is None:
+            # models trained before the design plan was introduced
+            offsets, exposures = self.get_offsets_and_exposures(X)
+            self.set_interactions()
+            X = self.process_fixed_columns(X)
+            X = self.interactions.transform(X, self.final_labels)
+            offset_output = self.compute_aggregate_offset(offsets, exposures)
+            return np.array(self.fitted_model.predict(X, offset=offset_output))
+
+        offsets, exposures = self.design_plan.get_offsets_and_exposures(X)
         offset_output = self.compute_aggregate_offset(offsets, exposures)
+        X_design = self.get_design(X)
         
         # makes predictions and converts to DSS accepted format
-        y_pred = np.array(self.fitted_model.predict(X, offset=offset_output))
+        y_pred = np.array(self.predict_design(X_design, offset_output))
         
         return y_pred
 
@@ -356,6 +738,13 @@ class BinaryClassificationGLM(BaseGLM):
         """
         self.fit_model(X, y, sample_weight, True)
 
+    def fit_chunks(self, get_chunks):
+        """
+        takes in a training data chunk generator and fits a model,
+        for library use (see fit_model_chunks)
+        """
+        self.fit_model_chunks(get_chunks, True)
+
     def predict(self, X):
         """
         Returns the binary target
@@ -383,6 +772,13 @@ class RegressionGLM(BaseGLM):
         """
         self.fit_model(X, y, sample_weight, False)
 
+    def fit_chunks(self, get_chunks):
+        """
+        takes in a training data chunk generator and fits a model,
+        for library use (see fit_model_chunks)
+        """
+        self.fit_model_chunks(get_chunks, False)
+
     def predict(self, X):
         """
         Returns the target as 1D array
@@ -0,0 +1,189 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import tabmat as tm
+from glum import GeneralizedLinearRegressor
+from scipy import stats
+from generalized_linear_models.compression import CompressedDesign
+from generalized_linear_models.cross_validation import SharedArrays, get_n_workers
+from generalized_linear_models.screening import FIXED_DISPERSION_FAMILIES, get_variable_name
+from generalized_linear_models.split_design import drop_split_columns, get_dummy_groups
+
+FACTOR_TEST_COLUMNS = ['variable', 'df', 'deviance_change', 'lr_statistic', 'p_value', 'aic_change']
+# size above which a dense design is not built for the refits, overridden by max_design_bytes
+MAX_DENSE_DESIGN_BYTES = 2 ** 30
+
+
+def get_factor_groups(design_plan):
+    """
+    groups the design columns by factor: the columns of a variable, and the
+    interaction columns of a pair of variables (first * second)
+    """
+    n_kept = len(design_plan.kept_indices)
+    kept_variables = [get_variable_name(label) for label in design_plan.labels[:n_kept]]
+    groups = {}
+    for position, variable in enumerate(kept_variables):
+        groups.setdefault(variable, []).append(position)
+    for position, (first, second) in enumerate(zip(design_plan.interaction_first, design_plan.interaction_second)):
+        factor = f'{kept_variables[first]} * {kept_variables[second]}'
+        groups.setdefault(factor, []).append(n_kept + position)
+    return groups
+
+
+def has_discrete_design(design_plan):
+    """
+    returns True if every kept column is a dummy column, so that the rows
+    of the design fall into few distinct cells
+    """
+    n_kept = len(design_plan.kept_indices)
+    n_dummies = sum(len(positions) for positions in get_dummy_groups(list(design_plan.labels[:n_kept])))
+    return n_dummies == n_kept
+
+
+def refit_without(model_params, X, y, sample_weight, offset, dropped, start_params):
+    """
+    refits the model on the design, an array or a SplitMatrix, without the
+    dropped columns, warm started from the coefficients of the full fit, and
+    returns its deviance
+    """
+    kept = np.setdiff1d(np.arange(X.shape[1]), dropped)
+    model = GeneralizedLinearRegressor(fit_intercept=True, copy_X=False,
+                                       start_params=np.concatenate([[start_params[0]], start_params[1:][kept]]),
+                                       **model_params)
+    if isinstance(X, tm.SplitMatrix):
+        X_reduced = drop_split_columns(X, dropped)
+    else:
+        X_reduced = np.asfortranarray(X[:, kept])
+    model.fit(X_reduced, y, sample_weight=sample_weight, offset=offset)
+    linear_predictor = X_reduced @ model.coef_ + model.intercept_
+    if offset is not None:
+        linear_predictor += offset
+    return model.family_instance.deviance(y, model.link_instance.inverse(linear_predictor), sample_weight=sample_weight)
+
+
+def refit_shared(specs, model_params, dropped, start_params):
+    """
+    worker entry point: maps the shared compressed design and refits it without a factor
+    """
+    blocks = {}
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        blocks[name] = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+    try:
+        return refit_without(model_params, arrays['X'], arrays['y'], arrays['sample_weight'], arrays.get('offset'),
+                             dropped, start_params)
+    finally:
+        # views on the blocks must be released before closing them
+        arrays.clear()
+        for block in blocks.values():
+            block.close()
+
+
+def drop_one_factor(glm, X, y, sample_weight=None, n_jobs=-1, max_design_bytes=MAX_DENSE_DESIGN_BYTES):
+    """
+    likelihood-ratio test of every factor of a fitted model, refitting the
+    model without the factor columns
+
+    The refits are warm started from the full fit and run on the design of
+    the model. A sparse design is refitted as it is, in threads sharing it.
+    A dense design is refitted in worker processes sharing it, compressed
+    into cells when all its columns are dummy columns, in which case the
+    deviances change by a constant that cancels out of the differences.
+    A dense design of the rows larger than max_design_bytes is refused.
+
+    Parameters
+    ----------
+    glm : BaseGLM
+        Fitted model.
+    X : numpy.ndarray, shape (n_samples, n_columns)
+        Preprocessed matrix the model was fitted on.
+    y : numpy.ndarray, shape (n_samples,)
+        Target values.
+    sample_weight : numpy.ndarray, shape (n_samples,), optional
+        Row weights, defaults to ones.
+    n_jobs : int, optional
+        Number of workers, all the cores if not positive.
+    max_design_bytes : int, optional
+        Largest dense design of the rows built for the refits.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per factor with its degrees of freedom, the deviance change
+        and the likelihood-ratio statistic of dropping it, the p-value and
+        the change of AIC, the most significant factor first.
+    """
+    design_plan = glm.design_plan
+    offsets, exposures = design_plan.get_offsets_and_exposures(X)
+    offset = glm.compute_aggregate_offset(offsets, exposures)
+    y = np.asarray(y, dtype=np.float64)
+    sample_weight = np.ones(len(y)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    compressed_design = None
+    if glm.sparse_design:
+        X_design = glm.get_design(X)
+    elif has_discrete_design(design_plan):
+        # the cells are found on the preprocessed columns, only the design of the cells is built
+        compressed_design = CompressedDesign(X, y, sample_weight, offset)
+        X_design = design_plan.transform(compressed_design.X)
+        y, sample_weight, offset = compressed_design.y, compressed_design.sample_weight, compressed_design.offset
+    else:
+        design_bytes = X.shape[0] * len(design_plan.labels) * 8
+        if design_bytes > max_design_bytes:
+            raise ValueError(f'The design of the factor tests would take {design_bytes / 1e6:.0f} MB, more than '
+                             f'{max_design_bytes / 1e6:.0f} MB. Please enable the sparse design of the model.')
+        X_design = design_plan.transform(X)
+
+    fitted_model = glm.fitted_model
+    penalty = glm.selected_penalty if glm.selected_penalty is not None else fitted_model.alpha
+    model_params = {'alpha': penalty, 'l1_ratio': glm.l1_ratio, 'family': glm.family, 'link': glm.link}
+    start_params = np.concatenate([[fitted_model.intercept_], fitted_model.coef_])
+    linear_predictor = X_design @ fitted_model.coef_ + fitted_model.intercept_
+    if offset is not None:
+        linear_predictor += offset
+    mu = fitted_model.link_instance.inverse(linear_predictor)
+    family = fitted_model.family_instance
+    full_deviance = family.deviance(y, mu, sample_weight=sample_weight)
+    if isinstance(family, FIXED_DISPERSION_FAMILIES):
+        dispersion = 1.0
+    elif compressed_design is not None:
+        dispersion = compressed_design.dispersion(family, mu, ddof=X_design.shape[1] + 1)
+    else:
+        dispersion = family.dispersion(y, mu, sample_weight, ddof=X_design.shape[1] + 1)
+
+    groups = get_factor_groups(design_plan)
+    n_workers = get_n_workers(n_jobs, len(groups))
+    if n_workers == 1:
+        deviances = [refit_without(model_params, X_design, y, sample_weight, offset, dropped, start_params)
+                     for dropped in groups.values()]
+    elif isinstance(X_design, tm.SplitMatrix):
+        # threads share the sparse design without copying it
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(refit_without, model_params, X_design, y, sample_weight, offset,
+                                       dropped, start_params)
+                       for dropped in groups.values()]
+            deviances = [future.result() for future in futures]
+    else:
+        with SharedArrays(X=X_design, y=y, sample_weight=sample_weight, offset=offset) as shared:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(refit_shared, shared.specs, model_params, dropped, start_params)
+                           for dropped in groups.values()]
+                deviances = [future.result() for future in futures]
+
+    rows = []
+    for (factor, dropped), deviance in zip(groups.items(), deviances):
+        deviance_change = max(deviance - full_deviance, 0.0)
+        lr_statistic = deviance_change / dispersion
+        rows.append({
+            'variable': factor,
+            'df': len(dropped),
+            'deviance_change': float(deviance_change),
+            'lr_statistic': float(lr_statistic),
+            'p_value': float(stats.chi2.sf(lr_statistic, len(dropped))),
+            # AIC of the model without the factor minus AIC of the full model
+            'aic_change': float(lr_statistic - 2 * len(dropped))
+        })
+    result = pd.DataFrame(rows, columns=FACTOR_TEST_COLUMNS)
+    return result.sort_values(['p_value', 'lr_statistic'], ascending=[True, False]).reset_index(drop=True)
@@ -0,0 +1,131 @@
+"""
+The one place the private helpers of glum are used.
+
+The covariance, streaming and aliasing code need the weighted sandwich
+product and the information matrices glum computes internally, which are
+not part of its public API. Each helper is looked up once here and falls
+back to an equivalent built on the public glum and tabmat API when a glum
+release moves or removes it. The glum releases the plugin is tested
+against are [GLUM_MIN_VERSION, GLUM_MAX_VERSION), as pinned in the code
+environment requirements.
+"""
+import re
+import warnings
+
+import glum
+import numpy as np
+from glum import BinomialDistribution, LogitLink
+from scipy import sparse
+
+try:
+    from glum._util import _safe_sandwich_dot
+except ImportError:
+    _safe_sandwich_dot = None
+
+try:
+    from glum._distribution import get_one_over_variance as _get_one_over_variance
+except ImportError:
+    _get_one_over_variance = None
+
+GLUM_MIN_VERSION = (2, 6, 0)
+GLUM_MAX_VERSION = (2, 7, 0)
+
+
+def parse_version(version):
+    """
+    (major, minor, patch) of a version string, missing parts being 0
+    """
+    parts = [int(part) for part in re.findall(r'\d+', version)[:3]]
+    return tuple(parts + [0] * (3 - len(parts)))
+
+
+def is_supported_glum_version(version=None):
+    """
+    whether a glum version, by default the installed one, is in the tested range
+    """
+    version = parse_version(glum.__version__ if version is None else version)
+    return GLUM_MIN_VERSION <= version < GLUM_MAX_VERSION
+
+
+if not is_supported_glum_version():
+    warnings.warn(f'glum {glum.__version__} is outside of the tested range '
+                  f'[{".".join(map(str, GLUM_MIN_VERSION))}, {".".join(map(str, GLUM_MAX_VERSION))}), '
+                  f'the information matrices are computed with the fallbacks of glum_compat')
+
+
+def _fallback_sandwich_dot(X, d, intercept=False):
+    result = X.sandwich(d)
+    if sparse.issparse(result):
+        result = result.toarray()
+    result = np.asarray(result)
+    if not intercept:
+        return result
+    cross_product = X.transpose_matvec(d)
+    gram = np.empty((result.shape[0] + 1, result.shape[0] + 1), dtype=result.dtype)
+    gram[0, 0] = d.sum()
+    gram[1:, 0] = cross_product
+    gram[0, 1:] = cross_product
+    gram[1:, 1:] = result
+    return gram
+
+
+def _fallback_one_over_variance(family, link, mu, eta, dispersion, sample_weight):
+    if isinstance(family, BinomialDistribution) and isinstance(link, LogitLink):
+        # 1 / (mu (1 - mu)) written in eta, which does not lose precision when mu nears 0 or 1
+        max_eta = np.log(np.finfo(eta.dtype).max / 10)
+        eta = np.clip(eta, -max_eta, max_eta)
+        return sample_weight * (np.exp(eta) + 2 + np.exp(-eta)) / dispersion
+    return 1.0 / family.variance(mu, dispersion=dispersion, sample_weight=sample_weight)
+
+
+def _fallback_fisher_information(family, link, X, y, mu, sample_weight, dispersion, fit_intercept):
+    eta = link.link(mu)
+    weights = link.inverse_derivative(eta) ** 2 * one_over_variance(family, link, mu, eta, dispersion, sample_weight)
+    return sandwich_dot(X, weights, intercept=fit_intercept)
+
+
+def _fallback_observed_information(family, link, X, y, mu, sample_weight, dispersion, fit_intercept):
+    eta = link.link(mu)
+    weights = ((-link.inverse_derivative2(eta) * (y - mu)
+                + link.inverse_derivative(eta) ** 2
+                * (1 + (y - mu) * family.unit_variance_derivative(mu) / family.unit_variance(mu)))
+               * one_over_variance(family, link, mu, eta, dispersion, sample_weight))
+    return sandwich_dot(X, weights, intercept=fit_intercept)
+
+
+def sandwich_dot(X, d, intercept=False):
+    """
+    X' diag(d) X of a tabmat matrix as a dense array, with a leading column
+    of ones added to X when intercept is set
+    """
+    if _safe_sandwich_dot is None:
+        return _fallback_sandwich_dot(X, d, intercept)
+    return _safe_sandwich_dot(X, d, intercept=intercept)
+
+
+def one_over_variance(family, link, mu, eta, dispersion, sample_weight):
+    """
+    sample_weight / (dispersion * unit_variance(mu)), computed from eta for
+    the binomial family with a logit link
+    """
+    if _get_one_over_variance is None:
+        return _fallback_one_over_variance(family, link, mu, eta, dispersion, sample_weight)
+    return _get_one_over_variance(family, link, mu, eta, dispersion, sample_weight)
+
+
+def fisher_information(family, link, X, y, mu, sample_weight, dispersion, fit_intercept):
+    """
+    expected information matrix of a glum family and link at mu
+    """
+    if not hasattr(family, '_fisher_information'):
+        return _fallback_fisher_information(family, link, X, y, mu, sample_weight, dispersion, fit_intercept)
+    return family._fisher_information(link, X, y, mu, sample_weight, dispersion, fit_intercept)
+
+
+def observed_information(family, link, X, y, mu, sample_weight, dispersion, fit_intercept):
+    """
+    observed information matrix of a glum family and link at mu
+    """
+    if not hasattr(family, '_observed_information'):
+        return _fallback_observed_information(family, link, X, y, mu, sample_weight, dispersion, fit_intercept)
+    return family._observed_information(link, X, y, mu, sample_weight, dispersion, fit_intercept)
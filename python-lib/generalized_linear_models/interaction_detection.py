@@ -0,0 +1,237 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from generalized_linear_models.cross_validation import SharedArrays, get_n_workers
+from generalized_linear_models.screening import get_variable_name, get_working_quantities
+from generalized_linear_models.split_design import get_dummy_groups, get_one_hot_codes
+
+PAIR_COLUMNS = ['first', 'second', 'df', 'score_statistic', 'p_value', 'deviance_reduction',
+                'min_cell_exposure', 'empty_cells']
+CELL_COLUMNS = ['first', 'second', 'first_level', 'second_level', 'exposure']
+
+
+def get_factor_codes(glm, X, n_bins=10):
+    """
+    returns the level codes of every variable of a fitted model: the dummy
+    groups give one level per column plus the base level (code 0), the
+    numerical columns are cut at their quantiles
+
+    Returns
+    -------
+    codes : numpy.ndarray of int32, shape (n_samples, n_factors)
+    factors : list of str
+    levels : list of list of str
+    """
+    design_plan = glm.design_plan
+    n_kept = len(design_plan.kept_indices)
+    kept_labels = list(design_plan.labels[:n_kept])
+    codes = []
+    factors = []
+    levels = []
+    grouped_positions = set()
+    for positions in get_dummy_groups(kept_labels):
+        factor_codes = get_one_hot_codes(X, design_plan.kept_indices[positions])
+        if factor_codes is None:
+            continue
+        codes.append(factor_codes)
+        factors.append(get_variable_name(kept_labels[positions[0]]))
+        levels.append(['base'] + [kept_labels[position].split(':')[2] for position in positions])
+        grouped_positions.update(positions)
+    for position, label in enumerate(kept_labels):
+        if position in grouped_positions:
+            continue
+        values = X[:, design_plan.kept_indices[position]]
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        codes.append(np.searchsorted(edges, values, side='right').astype(np.int32))
+        factors.append(label)
+        bounds = np.concatenate([[values.min()], edges, [values.max()]])
+        levels.append([f'[{bounds[i]:.4g}, {bounds[i + 1]:.4g}]' for i in range(len(bounds) - 1)])
+    if len(codes) == 0:
+        return np.empty((X.shape[0], 0), dtype=np.int32), factors, levels
+    return np.column_stack(codes).astype(np.int32), factors, levels
+
+
+def score_pair(first_codes, second_codes, n_first, n_second, weights, weighted_residuals, exposure):
+    """
+    score test of the cells of two factors against their additive effects
+
+    The working weights and scores are aggregated by cell with bincount over
+    the combined level codes, the statistic U' D^-1 U - (P'U)' (P'DP)^+ P'U
+    being the part of the cell scores that the two main effects do not explain.
+    The information is only adjusted for these two main effects, which keeps
+    every pair down to a few bincounts.
+
+    Returns
+    -------
+    statistic : float
+    degrees_of_freedom : int
+    cell_exposure : numpy.ndarray, shape (n_first, n_second)
+    """
+    n_cells = n_first * n_second
+    cells = first_codes.astype(np.intp) * n_second + second_codes
+    cell_weights = np.bincount(cells, weights=weights, minlength=n_cells)
+    cell_scores = np.bincount(cells, weights=weighted_residuals, minlength=n_cells)
+    cell_exposure = np.bincount(cells, weights=exposure, minlength=n_cells).reshape(n_first, n_second)
+
+    filled = cell_weights > 0
+    statistic = np.sum(cell_scores[filled] ** 2 / cell_weights[filled])
+    weight_table = cell_weights.reshape(n_first, n_second)
+    score_table = cell_scores.reshape(n_first, n_second)
+    margin_scores = np.concatenate([score_table.sum(axis=1), score_table.sum(axis=0)])
+    margin_information = np.block([[np.diag(weight_table.sum(axis=1)), weight_table],
+                                   [weight_table.T, np.diag(weight_table.sum(axis=0))]])
+    tolerance = margin_information.diagonal().max(initial=0) * 1e-10
+    statistic -= margin_scores @ np.linalg.pinv(margin_information, rcond=1e-10, hermitian=True) @ margin_scores
+    # the filled cells minus the dimension of the additive space they span
+    degrees_of_freedom = int(filled.sum()) - np.linalg.matrix_rank(margin_information, tol=tolerance, hermitian=True)
+    return max(statistic, 0.0), degrees_of_freedom, cell_exposure
+
+
+def score_pairs(codes, level_counts, weights, weighted_residuals, exposure, pairs):
+    return [score_pair(codes[:, first], codes[:, second], level_counts[first], level_counts[second],
+                       weights, weighted_residuals, exposure) for first, second in pairs]
+
+
+def score_shared_pairs(specs, level_counts, pairs):
+    """
+    worker entry point: maps the shared arrays and scores a batch of pairs
+    """
+    blocks = {}
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        blocks[name] = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+    try:
+        return score_pairs(arrays['codes'], level_counts, arrays['weights'], arrays['weighted_residuals'],
+                           arrays['exposure'], pairs)
+    finally:
+        # views on the blocks must be released before closing them
+        arrays.clear()
+        for block in blocks.values():
+            block.close()
+
+
+def get_exposure(glm, X, sample_weight=None):
+    """
+    exposure of every row: the product of the exposure columns of the model,
+    the row weights if it has none
+    """
+    if len(glm.design_plan.exposure_indices) > 0:
+        return np.prod(X[:, glm.design_plan.exposure_indices], axis=1)
+    if sample_weight is not None:
+        return np.asarray(sample_weight, dtype=np.float64)
+    return np.ones(X.shape[0])
+
+
+def get_interaction_cells(glm, X, pairs, sample_weight=None, n_bins=10):
+    """
+    exposure of every cell of some pairs of variables of a fitted model,
+    such as the top pairs found by detect_interactions or a selected one
+
+    Parameters
+    ----------
+    glm : BaseGLM
+        Fitted model.
+    X : numpy.ndarray, shape (n_samples, n_columns)
+        Preprocessed matrix the model was fitted on.
+    pairs : list of (str, str)
+        Pairs of variables, as in the first and second columns of the pairs.
+    sample_weight : numpy.ndarray, shape (n_samples,), optional
+        Row weights, the exposure of models without exposure columns.
+    n_bins : int, optional
+        Number of quantile bins of the numerical variables.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per cell of every pair.
+    """
+    codes, factors, levels = get_factor_codes(glm, X, n_bins)
+    exposure = get_exposure(glm, X, sample_weight)
+    tables = [pd.DataFrame(columns=CELL_COLUMNS)]
+    for first_factor, second_factor in pairs:
+        first, second = factors.index(first_factor), factors.index(second_factor)
+        n_first, n_second = len(levels[first]), len(levels[second])
+        cells = codes[:, first].astype(np.intp) * n_second + codes[:, second]
+        tables.append(pd.DataFrame({
+            'first': first_factor,
+            'second': second_factor,
+            'first_level': np.repeat(levels[first], n_second),
+            'second_level': np.tile(levels[second], n_first),
+            'exposure': np.bincount(cells, weights=exposure, minlength=n_first * n_second)
+        }, columns=CELL_COLUMNS))
+    return pd.concat(tables, ignore_index=True)
+
+
+def detect_interactions(glm, X, y, sample_weight=None, n_bins=10, n_jobs=-1):
+    """
+    ranks every pair of variables of a fitted main-effects model by the
+    score test of their interaction, without refitting it
+
+    Parameters
+    ----------
+    glm : BaseGLM
+        Fitted model.
+    X : numpy.ndarray, shape (n_samples, n_columns)
+        Preprocessed matrix the model was fitted on.
+    y : numpy.ndarray, shape (n_samples,)
+        Target values.
+    sample_weight : numpy.ndarray, shape (n_samples,), optional
+        Row weights, defaults to ones.
+    n_bins : int, optional
+        Number of quantile bins of the numerical variables.
+    n_jobs : int, optional
+        Number of worker processes, all the cores if not positive.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per pair, most significant first, with the exposure of its
+        least covered cell and its number of empty cells. The exposure of
+        the cells of a pair is given by get_interaction_cells.
+    """
+    _, working_weights, working_residuals, dispersion = get_working_quantities(glm, X, y, sample_weight)
+    codes, factors, levels = get_factor_codes(glm, X, n_bins)
+    level_counts = [len(factor_levels) for factor_levels in levels]
+    exposure = get_exposure(glm, X, sample_weight)
+    weighted_residuals = working_weights * working_residuals
+
+    fitted_interactions = {frozenset(pair) for pair in zip(glm.interaction_columns_first or [],
+                                                           glm.interaction_columns_second or [])}
+    pairs = [(first, second) for first, second in combinations(range(len(factors)), 2)
+             if frozenset((factors[first], factors[second])) not in fitted_interactions]
+
+    n_workers = get_n_workers(n_jobs, len(pairs))
+    if n_workers == 1:
+        results = score_pairs(codes, level_counts, working_weights, weighted_residuals, exposure, pairs)
+    else:
+        batches = [pairs[worker::n_workers] for worker in range(n_workers)]
+        with SharedArrays(codes=codes, weights=working_weights, weighted_residuals=weighted_residuals,
+                          exposure=exposure) as shared:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(score_shared_pairs, shared.specs, level_counts, batch) for batch in batches]
+                batch_results = [future.result() for future in futures]
+        # restores the order of the pairs from the interleaved batches
+        results = [None] * len(pairs)
+        for worker, batch_result in enumerate(batch_results):
+            results[worker::n_workers] = batch_result
+
+    pair_rows = []
+    for (first, second), (statistic, degrees_of_freedom, cell_exposure) in zip(pairs, results):
+        statistic /= dispersion
+        pair_rows.append({
+            'first': factors[first],
+            'second': factors[second],
+            'df': degrees_of_freedom,
+            'score_statistic': float(statistic),
+            'p_value': float(stats.chi2.sf(statistic, degrees_of_freedom)) if degrees_of_freedom > 0 else 1.0,
+            'deviance_reduction': float(statistic * dispersion),
+            'min_cell_exposure': float(cell_exposure.min()),
+            'empty_cells': int(np.sum(cell_exposure == 0))
+        })
+    pairs_df = pd.DataFrame(pair_rows, columns=PAIR_COLUMNS)
+    return pairs_df.sort_values(['p_value', 'score_statistic'], ascending=[True, False]).reset_index(drop=True)
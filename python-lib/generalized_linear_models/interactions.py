@@ -1,5 +1,8 @@
 import numpy as np
 
+# number of products computed at once, bounds the temporary arrays to a few MB
+CHUNK_ELEMENTS = 2 ** 20
+
 def is_same_variable(value, variable):
     if value == variable:
         return True
@@ -10,32 +13,78 @@ def is_same_variable(value, variable):
                 return True
     return False
 
+def get_label_suffix(label):
+    split_label = label.split(':')
+    if len(split_label) == 3:
+        return '::' + str(split_label[2])
+    return ''
+
+def build_interaction_columns(X, first_indices, second_indices, out=None, chunk_size=None):
+    """
+    writes the products X[:, first_indices] * X[:, second_indices] into a single
+    preallocated block, processing rows by chunks to bound the temporary arrays
+
+    Parameters
+    ----------
+    X : numpy.ndarray, shape (n_samples, n_features)
+        Matrix holding the columns to multiply.
+    first_indices, second_indices : array-like of int, shape (n_interactions,)
+        Column indices of the two factors of each interaction column.
+    out : numpy.ndarray, shape (n_samples, n_interactions), optional
+        Block receiving the interaction columns, allocated if not provided.
+    chunk_size : int, optional
+        Number of rows processed at once, by default sized to CHUNK_ELEMENTS products.
+
+    Returns
+    -------
+    numpy.ndarray, shape (n_samples, n_interactions)
+    """
+    first_indices = np.asarray(first_indices, dtype=np.intp)
+    second_indices = np.asarray(second_indices, dtype=np.intp)
+    n_samples = X.shape[0]
+    if out is None:
+        out = np.empty((n_samples, len(first_indices)), dtype=np.result_type(X.dtype, np.float64))
+    if len(first_indices) == 0:
+        return out
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_ELEMENTS // len(first_indices))
+    for start in range(0, n_samples, chunk_size):
+        rows = X[start:start + chunk_size]
+        np.multiply(rows[:, first_indices], rows[:, second_indices], out=out[start:start + chunk_size])
+    return out
+
 class Interactions():
 
     def __init__(self, interactions_first, interactions_second, complete_marginal=True):
-        self.interactions = zip(interactions_first, interactions_second)
-    
-    def transform(self, X, column_labels):
+        self.interactions = list(zip(interactions_first or [], interactions_second or []))
+
+    def get_index_pairs(self, column_labels):
+        """
+        returns the indices of the columns to multiply for each interaction
+        column, along with the labels of the interaction columns
+        """
+        first_indices = []
+        second_indices = []
+        labels = []
         for first_variable, second_variable in self.interactions:
             first_variable_indices = [i for i, value in enumerate(column_labels) if is_same_variable(value, first_variable)]
             second_variable_indices = [i for i, value in enumerate(column_labels) if is_same_variable(value, second_variable)]
             for fi in first_variable_indices:
-                first_split_label = column_labels[fi].split(':')
-                if len(first_split_label) == 3:
-                    first_column_label_suffix = '::' + str(first_split_label[2])
-                else:
-                    first_column_label_suffix = ''
+                first_column_label_suffix = get_label_suffix(column_labels[fi])
                 for si in second_variable_indices:
-                    second_split_label = column_labels[si].split(':')
-                    if len(second_split_label) == 3:
-                        second_column_label_suffix = '::' + str(second_split_label[2])
-                    else:
-                        second_column_label_suffix = ''
-                    column_labels.append("interaction:" + first_variable + first_column_label_suffix + ":" + second_variable + second_column_label_suffix)
-                    #print(X[:, fi])
-                    #print(X[:, si])
-                    #print(X[:, fi] * X[:, si])
-                    new_column = np.reshape(X[:, fi] * X[:, si], (-1, 1))
-                    #print(new_column)
-                    X = np.append(X, new_column, axis=1)
-        return X
\ No newline at end of file
+                    second_column_label_suffix = get_label_suffix(column_labels[si])
+                    first_indices.append(fi)
+                    second_indices.append(si)
+                    labels.append("interaction:" + first_variable + first_column_label_suffix + ":" + second_variable + second_column_label_suffix)
+        return first_indices, second_indices, labels
+
+    def transform(self, X, column_labels):
+        first_indices, second_indices, labels = self.get_index_pairs(column_labels)
+        column_labels.extend(labels)
+        if len(labels) == 0:
+            return X
+        n_features = X.shape[1]
+        X_out = np.empty((X.shape[0], n_features + len(labels)), dtype=np.result_type(X.dtype, np.float64))
+        X_out[:, :n_features] = X
+        build_interaction_columns(X, first_indices, second_indices, out=X_out[:, n_features:])
+        return X_out
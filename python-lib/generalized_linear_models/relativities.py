@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from glum import LogLink
+
+
+class CoefficientRelativities():
+    """
+    computes the relativities of a fitted model from its coefficients
+
+    A scenario is the baseline row of the preprocessed matrix with some
+    features set to other values: the dummy of a level for a categorical
+    feature, the raw value for a numerical feature (the conformity checks
+    make sure numerical features are not rescaled). The interaction columns
+    follow from the design plan. With a log link the relativity of a
+    scenario is the exponential of the change of the linear predictor, so
+    that only the coefficients of the changed columns contribute to it.
+    With other links it is the ratio of the predictions of the scenario and
+    of the baseline.
+
+    Parameters
+    ----------
+    glm : BaseGLM
+        Fitted model with a design plan.
+    baseline_row : numpy.ndarray, shape (n_columns,)
+        Preprocessed baseline row, every feature at its base value.
+    """
+
+    def __init__(self, glm, baseline_row):
+        self.glm = glm
+        self.baseline_row = np.asarray(baseline_row, dtype=np.float64).reshape(-1)
+        self.is_log_link = isinstance(glm.fitted_model.link_instance, LogLink)
+        offsets, exposures = glm.design_plan.get_offsets_and_exposures(self.baseline_row[np.newaxis, :])
+        offset = glm.compute_aggregate_offset(offsets, exposures)
+        self.offset = None if offset is None else float(offset[0])
+        self.baseline_linear_predictor = self.get_linear_predictor(self.baseline_row[np.newaxis, :])[0]
+        self.feature_columns = {}
+
+    def get_feature_columns(self, feature):
+        """
+        indices of the columns of a feature in the preprocessed matrix, and the
+        level of each of them (None for the column of a numerical feature)
+        """
+        if feature not in self.feature_columns:
+            design_plan = self.glm.design_plan
+            fixed_indices = set(design_plan.offset_indices) | set(design_plan.exposure_indices)
+            indices, levels = [], []
+            for index, label in enumerate(self.glm.column_labels):
+                if index in fixed_indices:
+                    continue
+                split_label = label.split(':', 2)
+                if label == feature:
+                    indices.append(index)
+                    levels.append(None)
+                elif len(split_label) == 3 and split_label[1] == feature:
+                    indices.append(index)
+                    levels.append(None if split_label[2] == '_' else split_label[2])
+            self.feature_columns[feature] = (np.array(indices, dtype=int), levels)
+        return self.feature_columns[feature]
+
+    def set_feature_values(self, rows, feature, values):
+        """
+        writes the values of a feature into preprocessed rows, in place
+        """
+        indices, levels = self.get_feature_columns(feature)
+        if len(indices) == 0:
+            return
+        if levels[0] is None:
+            rows[:, indices[0]] = np.asarray(values, dtype=np.float64)
+            return
+        rows[:, indices] = 0
+        # values out of the dummy levels are base levels
+        positions = pd.Index(levels).get_indexer([str(value) for value in values])
+        matched = positions >= 0
+        rows[np.flatnonzero(matched), indices[positions[matched]]] = 1
+
+    def get_rows(self, scenarios):
+        """
+        builds the preprocessed rows of scenarios given as a dict of
+        feature: array of values, all arrays having the same length
+        """
+        n_rows = len(next(iter(scenarios.values())))
+        rows = np.repeat(self.baseline_row[np.newaxis, :], n_rows, axis=0)
+        for feature, values in scenarios.items():
+            self.set_feature_values(rows, feature, values)
+        return rows
+
+    def get_linear_predictor(self, rows):
+        return np.asarray(self.glm.linear_predictor_design(self.glm.design_plan.transform(rows)))
+
+    def get_relativities(self, scenarios):
+        """
+        relativities of scenarios given as a dict of feature: array of values,
+        relative to the baseline row
+
+        Returns
+        -------
+        numpy.ndarray
+            One relativity per scenario.
+        """
+        linear_predictor = self.get_linear_predictor(self.get_rows(scenarios))
+        if self.is_log_link:
+            return np.exp(linear_predictor - self.baseline_linear_predictor)
+        offset = 0.0 if self.offset is None else self.offset
+        link = self.glm.fitted_model.link_instance
+        return link.inverse(linear_predictor + offset) / link.inverse(self.baseline_linear_predictor + offset)
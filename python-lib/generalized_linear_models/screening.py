@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+import tabmat as tm
+from glum import BinomialDistribution, NegativeBinomialDistribution, PoissonDistribution
+from scipy import linalg, stats
+from generalized_linear_models.covariance import as_tabmat
+
+# families whose dispersion is fixed to 1 rather than estimated
+FIXED_DISPERSION_FAMILIES = (BinomialDistribution, NegativeBinomialDistribution, PoissonDistribution)
+
+
+def get_variable_name(label):
+    """
+    returns the DSS variable a preprocessed column belongs to (dummy:variable:level or variable)
+    """
+    split_label = label.split(':')
+    if len(split_label) == 3 and split_label[0] == 'dummy':
+        return split_label[1]
+    return label
+
+
+def get_working_quantities(glm, X, y, sample_weight=None):
+    """
+    evaluates a fitted model on its training rows and returns the design
+    matrix with the IRLS working weights and working residuals
+
+    Parameters
+    ----------
+    glm : BaseGLM
+        Fitted model, with a design plan.
+    X : numpy.ndarray, shape (n_samples, n_columns)
+        Preprocessed matrix the model was fitted on.
+    y : numpy.ndarray, shape (n_samples,)
+        Target values.
+    sample_weight : numpy.ndarray, shape (n_samples,), optional
+        Row weights, defaults to ones.
+
+    Returns
+    -------
+    X_design : tabmat.MatrixBase
+    working_weights : numpy.ndarray, shape (n_samples,)
+    working_residuals : numpy.ndarray, shape (n_samples,)
+    dispersion : float
+    """
+    y = np.asarray(y, dtype=np.float64)
+    sample_weight = np.ones_like(y) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    offsets, exposures = glm.design_plan.get_offsets_and_exposures(X)
+    offset = glm.compute_aggregate_offset(offsets, exposures)
+    X_design = as_tabmat(glm.get_design(X))
+    linear_predictor = glm.linear_predictor_design(X_design, offset)
+
+    family = glm.fitted_model.family_instance
+    link = glm.fitted_model.link_instance
+    mu = link.inverse(linear_predictor)
+    mu_derivative = link.inverse_derivative(linear_predictor)
+    variance = family.unit_variance(mu)
+    working_weights = sample_weight * mu_derivative ** 2 / variance
+    working_residuals = (y - mu) / mu_derivative
+
+    if isinstance(family, FIXED_DISPERSION_FAMILIES):
+        dispersion = 1.0
+    else:
+        n_params = X_design.shape[1] + 1
+        dispersion = np.dot(sample_weight, (y - mu) ** 2 / variance) / (sample_weight.sum() - n_params)
+    return X_design, working_weights, working_residuals, dispersion
+
+
+def transpose_product(X_design, M):
+    """
+    returns X_design' M, column by column for the tabmat blocks that only
+    multiply vectors (categorical blocks of a split design)
+    """
+    if isinstance(X_design, tm.DenseMatrix):
+        return np.asarray(X_design.transpose_matvec(M)).reshape(X_design.shape[1], M.shape[1])
+    return np.column_stack([X_design.transpose_matvec(column) for column in M.T]).reshape(X_design.shape[1], M.shape[1])
+
+
+def score_test_candidates(glm, X, y, Z, candidate_labels, sample_weight=None):
+    """
+    Rao score test of adding each candidate variable to a fitted model,
+    without refitting it
+
+    The scores and information of all the candidate columns are computed in
+    one pass from the working weights and residuals of the fitted model, the
+    information being adjusted for the columns already in the model. The
+    statistic of a variable is U' I^-1 U / dispersion over its columns, the
+    generalized inverse dropping the directions already spanned by the model.
+
+    Parameters
+    ----------
+    glm : BaseGLM
+        Fitted model.
+    X : numpy.ndarray, shape (n_samples, n_columns)
+        Preprocessed matrix the model was fitted on.
+    y : numpy.ndarray, shape (n_samples,)
+        Target values.
+    Z : numpy.ndarray, shape (n_samples, n_candidate_columns)
+        Candidate columns, encoded as the preprocessed matrix.
+    candidate_labels : list of str
+        Labels of the candidate columns, the dummy columns of a variable
+        (dummy:variable:level) being tested together.
+    sample_weight : numpy.ndarray, shape (n_samples,), optional
+        Row weights, defaults to ones.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per candidate variable with its degrees of freedom, score
+        statistic, p-value and approximate deviance reduction, most significant first.
+    """
+    X_design, working_weights, working_residuals, dispersion = get_working_quantities(glm, X, y, sample_weight)
+    Z = np.asarray(Z, dtype=np.float64)
+    weighted_Z = Z * working_weights[:, None]
+
+    scores = weighted_Z.T @ working_residuals
+    # cross information with the model columns, intercept first
+    cross_information = np.column_stack([weighted_Z.sum(axis=0), transpose_product(X_design, weighted_Z).T])
+    model_information = np.empty((X_design.shape[1] + 1, X_design.shape[1] + 1))
+    model_information[0, 0] = working_weights.sum()
+    model_information[0, 1:] = model_information[1:, 0] = X_design.transpose_matvec(working_weights)
+    model_information[1:, 1:] = X_design.sandwich(working_weights)
+    projection = linalg.lstsq(model_information, cross_information.T)[0]
+    raw_information = Z.T @ weighted_Z
+    information = raw_information - cross_information @ projection
+
+    variables = {}
+    for position, label in enumerate(candidate_labels):
+        variables.setdefault(get_variable_name(label), []).append(position)
+
+    rows = []
+    for variable, positions in variables.items():
+        block = information[np.ix_(positions, positions)]
+        # directions whose information is cancelled by the adjustment are spanned by the model
+        tolerance = raw_information.diagonal()[positions].max(initial=0) * 1e-8
+        degrees_of_freedom = np.linalg.matrix_rank(block, tol=tolerance, hermitian=True)
+        if degrees_of_freedom == 0:
+            # candidate entirely explained by the model columns
+            statistic, p_value = 0.0, 1.0
+        else:
+            block_scores = scores[positions]
+            statistic = block_scores @ linalg.pinvh(block, atol=tolerance) @ block_scores / dispersion
+            p_value = stats.chi2.sf(statistic, degrees_of_freedom)
+        rows.append({
+            'variable': variable,
+            'df': int(degrees_of_freedom),
+            'score_statistic': float(statistic),
+            'p_value': float(p_value),
+            'deviance_reduction': float(statistic * dispersion)
+        })
+    result = pd.DataFrame(rows, columns=['variable', 'df', 'score_statistic', 'p_value', 'deviance_reduction'])
+    return result.sort_values(['p_value', 'score_statistic'], ascending=[True, False]).reset_index(drop=True)
+
+
+def encode_candidates(df, numerical_columns, categorical_columns, sample_weight=None, max_levels=100):
+    """
+    encodes raw candidate columns as the preprocessed matrix would: numerical
+    columns with missing values imputed by their mean, categorical columns as
+    dummies of their most weighted levels, the heaviest level being the base
+    and the rarer levels falling with it
+
+    Returns
+    -------
+    Z : numpy.ndarray, shape (n_samples, n_candidate_columns)
+    labels : list of str
+    """
+    sample_weight = np.ones(len(df)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    columns = []
+    labels = []
+    for column in numerical_columns:
+        values = pd.to_numeric(df[column], errors='coerce')
+        columns.append(values.fillna(values.mean()).fillna(0).to_numpy(dtype=np.float64))
+        labels.append(column)
+    for column in categorical_columns:
+        values = df[column].astype(str).where(df[column].notna(), 'N/A').to_numpy()
+        levels, codes = np.unique(values, return_inverse=True)
+        level_weights = np.bincount(codes, weights=sample_weight, minlength=len(levels))
+        kept_levels = np.argsort(-level_weights, kind='stable')[1:max_levels]
+        for level in kept_levels:
+            columns.append((codes == level).astype(np.float64))
+            labels.append(f'dummy:{column}:{levels[level]}')
+    if len(columns) == 0:
+        return np.empty((len(df), 0)), labels
+    return np.column_stack(columns), labels
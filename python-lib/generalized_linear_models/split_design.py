@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import tabmat as tm
+from scipy import sparse
+from generalized_linear_models.interactions import CHUNK_ELEMENTS, build_interaction_columns
+
+# interaction columns with a share of non-zero values above this threshold
+# are stored dense rather than sparse
+SPARSE_DENSITY_THRESHOLD = 0.1
+
+
+def get_dummy_groups(labels):
+    """
+    groups the positions of the dummy columns created by DSS (dummy:variable:level)
+    by variable, in order of first appearance
+    """
+    groups = {}
+    for position, label in enumerate(labels):
+        split_label = label.split(':')
+        if len(split_label) == 3 and split_label[0] == 'dummy':
+            groups.setdefault(split_label[1], []).append(position)
+    return list(groups.values())
+
+
+def get_one_hot_codes(X, columns):
+    """
+    returns the level codes of a block of dummy columns of X, 0 standing for
+    the dropped base level, or None if the block is not one-hot encoded
+
+    The block is read by chunks of rows into the codes, so that it is never
+    copied as a whole.
+    """
+    n_samples = X.shape[0]
+    codes = np.empty(n_samples, dtype=np.int32)
+    chunk_size = max(1, CHUNK_ELEMENTS // len(columns))
+    for start in range(0, n_samples, chunk_size):
+        X_chunk = X[start:start + chunk_size, columns]
+        if not np.all((X_chunk == 0) | (X_chunk == 1)):
+            return None
+        row_sums = X_chunk.sum(axis=1)
+        if np.any(row_sums > 1):
+            return None
+        # argmax finds the level of the rows with a one, the others being at the base level
+        codes[start:start + chunk_size] = np.where(row_sums > 0, np.argmax(X_chunk, axis=1) + 1, 0)
+    return codes
+
+
+def build_interaction_block(X, first_indices, second_indices):
+    """
+    builds the interaction columns by chunks of rows, only keeping the non-zero products
+    """
+    n_samples = X.shape[0]
+    chunk_size = max(1, CHUNK_ELEMENTS // len(first_indices))
+    chunks = []
+    for start in range(0, n_samples, chunk_size):
+        products = build_interaction_columns(X[start:start + chunk_size], first_indices, second_indices)
+        chunks.append(sparse.csr_matrix(products))
+    return sparse.vstack(chunks, format='csc')
+
+
+def build_split_matrix(X, design_plan):
+    """
+    builds the GLM design described by a design plan as a tabmat SplitMatrix:
+    one-hot dummy groups become CategoricalMatrix blocks, the other kept
+    columns a DenseMatrix, and the interactions sparse (or dense when they
+    are not sparse enough) blocks. The column order is the one of the plan labels.
+
+    Parameters
+    ----------
+    X : numpy.ndarray, shape (n_samples, n_columns)
+        Preprocessed matrix provided by DSS.
+    design_plan : DesignPlan
+        Plan compiled at fit time.
+
+    Returns
+    -------
+    tabmat.SplitMatrix
+    """
+    kept_indices = design_plan.kept_indices
+    n_kept = len(kept_indices)
+    kept_labels = list(design_plan.labels[:n_kept])
+    matrices = []
+    indices = []
+    categorical_positions = set()
+
+    for positions in get_dummy_groups(kept_labels):
+        codes = get_one_hot_codes(X, kept_indices[positions])
+        if codes is None:
+            continue
+        categories = pd.Categorical.from_codes(codes, categories=np.arange(len(positions) + 1))
+        matrices.append(tm.CategoricalMatrix(categories, drop_first=True))
+        indices.append(np.array(positions))
+        categorical_positions.update(positions)
+
+    dense_positions = [position for position in range(n_kept) if position not in categorical_positions]
+    if len(dense_positions) > 0:
+        matrices.append(tm.DenseMatrix(np.asfortranarray(X[:, kept_indices[dense_positions]], dtype=np.float64)))
+        indices.append(np.array(dense_positions))
+
+    if design_plan.n_interactions > 0:
+        interactions = build_interaction_block(X, kept_indices[design_plan.interaction_first],
+                                               kept_indices[design_plan.interaction_second])
+        interaction_positions = np.arange(n_kept, n_kept + design_plan.n_interactions)
+        interaction_matrix = tm.from_csc(interactions, threshold=SPARSE_DENSITY_THRESHOLD)
+        if isinstance(interaction_matrix, tm.SplitMatrix):
+            for matrix, matrix_indices in zip(interaction_matrix.matrices, interaction_matrix.indices):
+                matrices.append(matrix)
+                indices.append(interaction_positions[matrix_indices])
+        else:
+            matrices.append(interaction_matrix)
+            indices.append(interaction_positions)
+
+    return tm.SplitMatrix(matrices, indices=indices)
+
+
+def drop_split_columns(X_split, dropped):
+    """
+    returns a SplitMatrix without the dropped columns, the other columns
+    keeping their order. Categorical blocks are kept or dropped as a whole,
+    as the columns of a variable are dropped together.
+    """
+    is_kept = np.ones(X_split.shape[1], dtype=bool)
+    is_kept[dropped] = False
+    kept_positions = np.cumsum(is_kept) - 1
+    matrices = []
+    indices = []
+    for matrix, matrix_indices in zip(X_split.matrices, X_split.indices):
+        kept = is_kept[matrix_indices]
+        if not kept.any():
+            continue
+        if not kept.all():
+            if isinstance(matrix, tm.CategoricalMatrix):
+                raise ValueError('The columns of a categorical block can only be dropped together')
+            if isinstance(matrix, tm.SparseMatrix):
+                matrix = tm.SparseMatrix(sparse.csc_matrix(matrix)[:, kept])
+            else:
+                matrix = tm.DenseMatrix(np.asfortranarray(np.asarray(matrix)[:, kept]))
+        matrices.append(matrix)
+        indices.append(kept_positions[matrix_indices[kept]])
+    return tm.SplitMatrix(matrices, indices=indices)
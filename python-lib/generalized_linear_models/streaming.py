@@ -0,0 +1,221 @@
+import warnings
+
+import numpy as np
+from glum import TweedieDistribution
+from scipy import linalg
+from sklearn.exceptions import ConvergenceWarning
+from generalized_linear_models.covariance import as_tabmat
+from generalized_linear_models.glum_compat import (fisher_information, observed_information, one_over_variance,
+                                                   sandwich_dot)
+
+
+class StreamingIRLS:
+    """
+    Iteratively reweighted least squares fit of a GLM whose design matrix is
+    read by chunks, for training sets that do not fit in memory
+
+    Every iteration makes one pass over the chunks and only accumulates
+    X'WX and X'Wz, so the memory used is bounded by the size of a chunk and
+    by p^2, whatever the number of rows. The objective is the one of glum
+    with l1_ratio = 0: deviance / (2 * sum of weights) + penalty / 2 * ||coef||^2,
+    the intercept not being penalized.
+
+    A step increasing the objective, or making it non finite, is halved
+    until it decreases, as the Newton steps of non-canonical links (such as
+    gamma or tweedie with a log link) can overshoot and oscillate.
+
+    Parameters
+    ----------
+    family : glum.ExponentialDispersionModel
+        Distribution of the target.
+    link : glum.Link
+        Link function.
+    penalty : float, optional
+        Ridge penalty.
+    max_iter : int, optional
+        Maximum number of passes over the data.
+    tol : float, optional
+        Tolerance on the relative change of the penalized deviance between two iterations.
+    max_step_halving : int, optional
+        Maximum number of halvings of a step.
+    """
+    def __init__(self, family, link, penalty=0.0, max_iter=100, tol=1e-8, max_step_halving=30):
+        self.family = family
+        self.link = link
+        self.penalty = penalty
+        self.max_iter = max_iter
+        self.tol = tol
+        self.max_step_halving = max_step_halving
+        self.coef_ = None
+        self.intercept_ = None
+        self.n_iter_ = 0
+        self.converged_ = False
+
+    def iterate(self, get_chunks):
+        """
+        yields the chunks as (tabmat design, y, sample_weight, offset)
+        """
+        for X, y, sample_weight, offset in get_chunks():
+            y = np.asarray(y, dtype=np.float64)
+            sample_weight = np.ones_like(y) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+            offset = np.zeros_like(y) if offset is None else np.asarray(offset, dtype=np.float64)
+            yield as_tabmat(X), y, sample_weight, offset
+
+    def linear_predictor(self, X, offset, coefs):
+        return X.matvec(coefs[1:]) + coefs[0] + offset
+
+    def accumulate(self, get_chunks, coefs):
+        """
+        one pass over the chunks, returning the IRLS system X'WX, X'Wz at
+        the coefficients along with their deviance
+        """
+        n_params = len(coefs)
+        hessian = np.zeros((n_params, n_params))
+        right_hand_side = np.zeros(n_params)
+        deviance = 0.0
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            for X, y, sample_weight, offset in self.iterate(get_chunks):
+                linear_predictor = self.linear_predictor(X, offset, coefs)
+                mu = self.link.inverse(linear_predictor)
+                mu_derivative = self.link.inverse_derivative(linear_predictor)
+                irls_weights = sample_weight * mu_derivative ** 2 / self.family.unit_variance(mu)
+                working_target = irls_weights * (linear_predictor - offset + (y - mu) / mu_derivative)
+                hessian += sandwich_dot(X, irls_weights, intercept=True)
+                right_hand_side[0] += working_target.sum()
+                right_hand_side[1:] += X.transpose_matvec(working_target)
+                deviance += self.family.deviance(y, mu, sample_weight=sample_weight)
+        return hessian, right_hand_side, deviance
+
+    def fit(self, get_chunks, start_params=None):
+        """
+        fits the GLM
+
+        Parameters
+        ----------
+        get_chunks : callable
+            Called once per pass over the data, returns an iterable of
+            (X, y, sample_weight, offset) chunks, sample_weight and offset
+            being optional (None). A generator function over a dataset
+            iterator is the intended use.
+        start_params : numpy.ndarray, shape (n_features + 1,), optional
+            Starting coefficients, intercept first.
+        """
+        n_samples = 0
+        sum_weights = 0.0
+        weighted_target = 0.0
+        n_features = None
+        for X, y, sample_weight, _ in self.iterate(get_chunks):
+            n_features = X.shape[1]
+            n_samples += len(y)
+            sum_weights += sample_weight.sum()
+            weighted_target += np.dot(sample_weight, y)
+        if n_features is None:
+            raise ValueError('No chunk to fit the model on')
+        self.n_samples_ = n_samples
+        self.sum_weights_ = sum_weights
+
+        if start_params is None:
+            coefs = np.zeros(n_features + 1)
+            coefs[0] = self.link.link(weighted_target / sum_weights)
+        else:
+            coefs = np.array(start_params, dtype=np.float64)
+        ridge = np.full(n_features + 1, sum_weights * self.penalty)
+        ridge[0] = 0
+
+        previous_objective = np.inf
+        previous_coefs = None
+        n_halvings = 0
+        self.converged_ = False
+        for n_iter in range(1, self.max_iter + 1):
+            hessian, right_hand_side, deviance = self.accumulate(get_chunks, coefs)
+            objective = deviance + np.dot(ridge, coefs ** 2)
+            self.n_iter_ = n_iter
+            increase_tolerance = self.tol * (abs(previous_objective) + 0.1)
+            if previous_coefs is not None and not objective <= previous_objective + increase_tolerance:
+                # the step overshot: it is halved, from the previous coefficients
+                if n_halvings == self.max_step_halving:
+                    coefs = previous_coefs
+                    break
+                n_halvings += 1
+                coefs = (previous_coefs + coefs) / 2
+                continue
+            n_halvings = 0
+            self.deviance_ = deviance
+            if abs(objective - previous_objective) / (abs(objective) + 0.1) < self.tol:
+                self.converged_ = True
+                break
+            previous_objective = objective
+            previous_coefs = coefs
+            coefs = linalg.solve(hessian + np.diag(ridge), right_hand_side, assume_a='pos')
+
+        if not self.converged_:
+            warnings.warn(f'The chunked fit did not converge after {self.n_iter_} passes over the data, '
+                          f'the coefficients of the lowest objective found are kept', ConvergenceWarning)
+            if previous_coefs is not None:
+                coefs = previous_coefs
+        self.intercept_ = coefs[0]
+        self.coef_ = coefs[1:]
+        return self
+
+    def summarize(self, get_chunks, expected_information=False):
+        """
+        accumulates, at the fitted coefficients, the Pearson chi-square, the
+        deviance, the information matrix and the outer product of the scores
+        needed by the covariance matrix, and the log-likelihood
+        """
+        coefs = np.concatenate([[self.intercept_], self.coef_])
+        n_params = len(coefs)
+        information = np.zeros((n_params, n_params))
+        fisher = np.zeros((n_params, n_params))
+        inner_part = np.zeros((n_params, n_params))
+        pearson_chi2 = 0.0
+        deviance = 0.0
+        log_likelihood = 0.0
+        for X, y, sample_weight, offset in self.iterate(get_chunks):
+            linear_predictor = self.linear_predictor(X, offset, coefs)
+            mu = self.link.inverse(linear_predictor)
+            pearson_chi2 += np.dot(sample_weight, (y - mu) ** 2 / self.family.unit_variance(mu))
+            deviance += self.family.deviance(y, mu, sample_weight=sample_weight)
+            # the information and the scores are computed for a unit dispersion,
+            # they scale with its inverse
+            fisher += fisher_information(self.family, self.link, X, y, mu, sample_weight, 1, True)
+            if not expected_information:
+                information += observed_information(self.family, self.link, X, y, mu, sample_weight, 1, True)
+            score_factor = (one_over_variance(self.family, self.link, mu, linear_predictor, 1, np.ones_like(mu))
+                            * self.link.inverse_derivative(linear_predictor))
+            inner_part += sandwich_dot(X, (score_factor * sample_weight * (y - mu)) ** 2, intercept=True)
+        self.pearson_chi2_ = pearson_chi2
+        self.deviance_ = deviance
+        self.fisher_information_ = fisher
+        self.information_ = fisher if expected_information else information
+        self.inner_part_ = inner_part
+
+        if isinstance(self.family, TweedieDistribution) and self.family.power != 1:
+            # same Pearson estimate of the dispersion as for in-memory fits
+            log_likelihood_params = {'dispersion': pearson_chi2 / (self.sum_weights_ - 1)}
+        else:
+            log_likelihood_params = {}
+        try:
+            for X, y, sample_weight, offset in self.iterate(get_chunks):
+                mu = self.link.inverse(self.linear_predictor(X, offset, coefs))
+                log_likelihood += self.family.log_likelihood(y, mu, sample_weight=sample_weight, **log_likelihood_params)
+            self.log_likelihood_ = log_likelihood
+        except NotImplementedError:
+            # glum has no log-likelihood for some families, e.g. inverse gaussian
+            self.log_likelihood_ = None
+        return self
+
+    def covariance_matrix(self, robust=True):
+        """
+        covariance matrix of the coefficients (intercept first), computed as
+        glum does from the sums accumulated by summarize
+        """
+        n_params = len(self.coef_) + 1
+        sum_weights = self.sum_weights_
+        correction = sum_weights / (sum_weights - n_params)
+        if not robust:
+            dispersion = self.pearson_chi2_ / (sum_weights - n_params)
+            return linalg.inv(self.fisher_information_) * dispersion * correction
+        # the dispersion cancels out of the sandwich
+        vcov = linalg.solve(self.information_, linalg.solve(self.information_, self.inner_part_).T)
+        return vcov * correction
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# relative error above which a measure is kept in float64
+FLOAT32_TOLERANCE = 1e-6
+
+
+def is_float32_safe(values):
+    """
+    returns True if values can be stored in float32 within FLOAT32_TOLERANCE
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    with np.errstate(over='ignore'):
+        rounded = finite.astype(np.float32).astype(np.float64)
+    return bool(np.all(np.abs(rounded - finite) <= FLOAT32_TOLERANCE * np.abs(finite)))
+
+
+def build_analysis_frame(dataset, features, measures, extra_columns=(), float32_measures=()):
+    """
+    builds the compact frame the analyses of a model read from a train or test set
+
+    Only the columns of the features of the model are kept (inputs and
+    candidates along with the target, exposure and offset columns), plus the
+    measures computed on the dataset. Categorical features are stored as
+    pandas Categorical. Measures are kept in float64, as the analyses sum
+    them over millions of rows, except for the float32_measures which are
+    only plotted or used to order rows and are stored as float32 when it is
+    safe. Features are kept in their original dtype otherwise, as they are
+    fed to the preprocessing of the model, see as_model_input.
+
+    Parameters
+    ----------
+    dataset : pandas.DataFrame
+        Train or test set of the model.
+    features : dict
+        Per-feature handling of the model, with the type of every feature.
+    measures : dict
+        Arrays of the measures, by column name.
+    extra_columns : list of str, optional
+        Columns kept as they are even if they have no feature handling.
+    float32_measures : list of str, optional
+        Measures that are never aggregated, which may be stored in float32.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    columns = {}
+    kept_features = list(features) + [column for column in extra_columns if column not in features]
+    for feature in kept_features:
+        if feature not in dataset.columns or feature in columns:
+            continue
+        config = features.get(feature, {})
+        if config.get('type') == 'CATEGORY' and config.get('role') in ('INPUT', 'REJECT'):
+            columns[feature] = pd.Categorical(dataset[feature])
+        else:
+            columns[feature] = dataset[feature].to_numpy()
+    for measure, values in measures.items():
+        try:
+            values = np.broadcast_to(np.asarray(values, dtype=np.float64), (len(dataset),))
+        except (TypeError, ValueError):
+            # non numerical measures, such as the class labels of a classification
+            columns[measure] = np.broadcast_to(np.asarray(values), (len(dataset),)).copy()
+            continue
+        if measure in float32_measures and is_float32_safe(values):
+            columns[measure] = values.astype(np.float32)
+        else:
+            columns[measure] = values.copy()
+    return pd.DataFrame(columns, index=dataset.index)
+
+
+def as_model_input(frame):
+    """
+    returns the rows of an analysis frame with the categorical columns
+    decoded to their values, as expected by the preprocessing of the model
+    """
+    decoded = {}
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            dtype = frame[column].cat.categories.dtype
+            if dtype.kind in 'iub' and frame[column].isna().any():
+                dtype = np.float64
+            decoded[column] = frame[column].astype(dtype)
+    if len(decoded) == 0:
+        return frame
+    return frame.assign(**decoded)
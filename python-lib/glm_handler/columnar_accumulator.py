@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+def as_column(values, n_rows):
+    """
+    converts values to a column array of n_rows, a scalar being repeated,
+    strings and mixed values being kept as Python objects
+    """
+    if np.ndim(values) == 0:
+        column = np.empty(n_rows, dtype=object)
+        column[:] = [values] * n_rows
+        return column
+    column = np.asarray(values)
+    if column.dtype.kind in 'USO':
+        column = np.empty(len(values), dtype=object)
+        column[:] = list(values)
+    if len(column) != n_rows:
+        raise ValueError(f'Expected a column of {n_rows} values, got {len(column)}')
+    return column
+
+
+def concatenate_column(chunks):
+    """
+    concatenates the chunks of a column, in a numeric dtype if all of them
+    are numeric and as Python objects otherwise
+    """
+    if len(chunks) == 0:
+        return np.empty(0, dtype=object)
+    if all(chunk.dtype.kind in 'biuf' for chunk in chunks):
+        return np.concatenate(chunks)
+    return np.concatenate([chunk.astype(object) for chunk in chunks])
+
+
+class ColumnarAccumulator():
+    """
+    collects the rows of a table as blocks of column arrays and builds the
+    DataFrame once, instead of growing it block by block
+
+    Parameters
+    ----------
+    columns : list of str
+        Columns of the table, in order.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.chunks = {column: [] for column in self.columns}
+        self.n_rows = 0
+
+    def __len__(self):
+        return self.n_rows
+
+    def add_columns(self, **columns):
+        """
+        adds a block of rows given as column: values, scalars being repeated
+        along the block, all the columns of the table being required
+        """
+        missing = set(self.columns) - set(columns)
+        if missing:
+            raise ValueError(f'Missing columns: {sorted(missing)}')
+        lengths = {len(values) for values in columns.values() if np.ndim(values) > 0}
+        if len(lengths) > 1:
+            raise ValueError(f'Columns have different lengths: {sorted(lengths)}')
+        n_rows = lengths.pop() if lengths else 1
+        for column in self.columns:
+            self.chunks[column].append(as_column(columns[column], n_rows))
+        self.n_rows += n_rows
+
+    def add_row(self, **values):
+        self.add_columns(**{column: [value] for column, value in values.items()})
+
+    def add_frame(self, df):
+        """
+        adds the rows of a DataFrame having all the columns of the table
+        """
+        self.add_columns(**{column: df[column].to_numpy() for column in self.columns})
+
+    def to_frame(self):
+        return pd.DataFrame({column: concatenate_column(self.chunks[column]) for column in self.columns},
+                            columns=self.columns)
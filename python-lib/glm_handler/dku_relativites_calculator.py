@@ -3,6 +3,14 @@ import numpy as np
 from logging_assist.logging import logger
 from time import time
 import re
+from generalized_linear_models.relativities import CoefficientRelativities
+from glm_handler.columnar_accumulator import ColumnarAccumulator
+from glm_handler.analysis_frame import build_analysis_frame, as_model_input
+
+# levels with the most exposure kept per feature, the base level being added to them
+MAX_RELATIVITY_LEVELS = 99
+# number of relativities computed at once, bounds the preprocessed and design rows
+RELATIVITY_CHUNK_SIZE = 4096
 
 class RelativitiesCalculator:
     """
@@ -61,7 +69,7 @@ class RelativitiesCalculator:
 
         for feature, config in preprocessing_features.items():
             self.base_values[feature] = self.extract_base_level(config['customHandlingCode'])
-            self.modalities[feature] = self.train_set[feature].unique()
+            self.modalities[feature] = np.asarray(self.train_set[feature].unique())
             self.variable_types[feature] = config['type']
 
         logger.info("Base values computed and modalities extracted.")
@@ -88,7 +96,7 @@ class RelativitiesCalculator:
 
     def initialize_baseline(self):
         logger.info("Starting initialize_baseline method")
-        train_row = self.train_set.head(1).copy()
+        train_row = as_model_input(self.train_set.head(1)).copy()
         used_features = self.model_retriever.get_used_features()
         logger.info(f"Used features: {used_features}")
         
@@ -109,76 +117,90 @@ class RelativitiesCalculator:
         logger.info("Calculating baseline prediction")
         return self._predict_from_df(sample_train_row)[0]
 
+    def get_coefficient_relativities(self, sample_train_row):
+        """
+        returns the engine computing relativities from the coefficients of the
+        model, None for models trained before the design plan was introduced
+        """
+        glm = self.model_retriever.predictor._clf
+        if getattr(glm, 'design_plan', None) is None:
+            return None
+        baseline_row = self.model_retriever.predictor.preprocess(sample_train_row)[0]
+        return CoefficientRelativities(glm, np.asarray(baseline_row)[0])
+
+    def compute_relativities(self, coefficient_relativities, sample_train_row, baseline_prediction, scenarios):
+        """
+        computes the relativities of scenarios given as a dict of feature: list of values,
+        from the coefficients of the model if possible, from the predictions of
+        copies of the baseline row otherwise
+        """
+        if coefficient_relativities is not None:
+            return coefficient_relativities.get_relativities(scenarios)
+        n_rows = len(next(iter(scenarios.values())))
+        logger.info(f"Predicting batch of {n_rows} rows for relativities...")
+        batch_df = sample_train_row.loc[sample_train_row.index.repeat(n_rows)].reset_index(drop=True)
+        for feature, values in scenarios.items():
+            batch_df[feature] = values
+        return self._predict_from_df(batch_df) / baseline_prediction
+
     def construct_relativities_df(self):
         logger.info("constructing relativites DF")
-        rel_df = pd.DataFrame(columns=['feature', 'value', 'relativity'])
+        rel_df = ColumnarAccumulator(['feature', 'value', 'relativity'])
         for feature, values in self.relativities.items():
-            for value, relativity in values.items():
-                rel_df = rel_df.append({'feature': feature, 'value': value, 'relativity': relativity}, ignore_index=True)
-        return rel_df
-    
-    def construct_relativities_interaction_df(self):
-        logger.info("constructing relativites DF")
-        rel_df = pd.DataFrame(columns=['feature_1', 'feature_2', 'value_1', 'value_2', 'relativity'])
-        for feature_1, features in self.relativities_interaction.items():
-            for feature_2, values in features.items():
-                for value_1, relativities in values.items():
-                    for value_2, relativity in relativities.items():
-                        rel_df = rel_df.append({'feature_1': feature_1, 
-                        'feature_2': feature_2,
-                        'value_1': value_1,
-                        'value_2': value_2, 
-                        'relativity': relativity}, ignore_index=True)
-        return rel_df
+            rel_df.add_columns(feature=feature, value=list(values.keys()),
+                               relativity=np.array(list(values.values()), dtype=np.float64))
+        return rel_df.to_frame()
     
+    def get_top_modalities(self, feature):
+        """
+        returns the levels of a feature with the most exposure in the train set, and its base level
+        """
+        exposure_per_modality = self.train_set.groupby(feature, observed=True)[self.model_retriever.exposure_columns].sum()
+        top_modalities = exposure_per_modality.nlargest(MAX_RELATIVITY_LEVELS).index.tolist()
+        if self.base_values[feature] not in top_modalities:
+            top_modalities.append(self.base_values[feature])
+        return top_modalities
+
+    def get_interaction_levels(self, feature):
+        """
+        returns the levels of a feature in the interaction grids: the top levels
+        of a categorical feature, the base value of a numerical one
+        """
+        if self.variable_types.get(feature) == 'CATEGORY':
+            return self.get_top_modalities(feature)
+        return [self.base_values[feature]]
+
     def get_relativities_df(self):
         """
         Computes and returns the relativities DataFrame for the model.
-        (Optimized with batch prediction)
+        (Computed from the coefficients, or with batch prediction for older models)
         Returns:
             pd.DataFrame: The relativities DataFrame.
         """
         logger.info("Computing relativities DataFrame.")
         sample_train_row = self.initialize_baseline()
         baseline_prediction = self.calculate_baseline_prediction(sample_train_row)
+        coefficient_relativities = self.get_coefficient_relativities(sample_train_row)
 
         self.relativities = {'base': {'base': baseline_prediction}}
         used_features = self.model_retriever.get_used_features()
 
-        dfs_to_predict = []
-        features_and_values = [] # To map results back
-
         for feature in used_features:
-            feature_type = self.model_retriever.features[feature]['type']
             base_value = self.base_values[feature]
             self.relativities[feature] = {}
 
-            exposure_col = self.model_retriever.exposure_columns
-            exposure_per_modality = self.train_set.groupby(feature)[exposure_col].sum()
-            top_modalities = exposure_per_modality.nlargest(99).index.tolist()
-            values_to_process = top_modalities
-            if base_value not in values_to_process:
-                values_to_process.append(base_value)
-
+            values_to_process = self.get_top_modalities(feature)
+            values_to_compute = []
             for value in values_to_process:
                 if value == base_value:
                     self.relativities[feature][value] = 1.0
-                    continue
-                
-                train_row_copy = sample_train_row.copy()
-                train_row_copy[feature] = value
-                dfs_to_predict.append(train_row_copy)
-                features_and_values.append((feature, value))
-
-        if dfs_to_predict:
-            logger.info(f"Predicting batch of {len(dfs_to_predict)} rows for relativities...")
-            batch_df = pd.concat(dfs_to_predict, ignore_index=True)
-            batch_predictions = self._predict_from_df(batch_df)
-            
-            for i, (feature, value) in enumerate(features_and_values):
-                prediction = batch_predictions[i]
-                relativity = prediction / baseline_prediction
-                self.relativities[feature][value] = relativity
+                else:
+                    values_to_compute.append(value)
+
+            if values_to_compute:
+                relativities = self.compute_relativities(coefficient_relativities, sample_train_row,
+                                                         baseline_prediction, {feature: values_to_compute})
+                self.relativities[feature].update(zip(values_to_compute, relativities))
 
         relativities_df = self.construct_relativities_df()
         logger.info("Relativities DataFrame computed")
@@ -186,72 +208,53 @@ class RelativitiesCalculator:
 
     def get_relativities_interactions_df(self):
         """
-        Computes and returns the relativities DataFrame for the model.
-        (Optimized with batch prediction)
+        Computes and returns the relativities DataFrame of the interactions of the model.
+        The grid of each interaction is the cross join of the top levels of both
+        features, written into columns allocated once and scored by chunks.
         Returns:
             pd.DataFrame: The relativities DataFrame.
         """
-        logger.info("Computing relativities DataFrame.")
-        sample_train_row = self.initialize_baseline()
-        baseline_prediction = self.calculate_baseline_prediction(sample_train_row)
-
-        self.relativities_interaction = {}
+        logger.info("Computing interaction relativities DataFrame.")
         interactions = self.model_retriever.get_interactions()
-        
-        dfs_to_predict = []
-        features_and_values_list = [] # To map results back
-
-        for interaction in interactions:
-            interaction_first = interaction[0]
-            interaction_second = interaction[1]
-            
-            base_value_first = self.base_values[interaction_first]
-            base_value_second = self.base_values[interaction_second]
-            
-            # Initialize the nested dictionary structure
-            if interaction_first not in self.relativities_interaction:
-                self.relativities_interaction[interaction_first] = {}
-            if interaction_second not in self.relativities_interaction[interaction_first]:
-                self.relativities_interaction[interaction_first][interaction_second] = {}
-            if base_value_first not in self.relativities_interaction[interaction_first][interaction_second]:
-                 self.relativities_interaction[interaction_first][interaction_second][base_value_first] = {}
-            
-            # Set base relativity
-            self.relativities_interaction[interaction_first][interaction_second][base_value_first][base_value_second] = 1.0
-            
-            type_first = self.variable_types.get(interaction_first)
-            type_second = self.variable_types.get(interaction_second)
-
-            values_to_process_first = self.modalities[interaction_first] if type_first == 'CATEGORICAL' else [base_value_first]
-            values_to_process_second = self.modalities[interaction_second] if type_second == 'CATEGORICAL' else [base_value_second]
-            
-            for value_first in values_to_process_first:
-                for value_second in values_to_process_second:
-                    if value_first == base_value_first and value_second == base_value_second:
-                        continue # Skip base case, already set to 1.0
-
-                    train_row_copy = sample_train_row.copy()
-                    train_row_copy[interaction_first] = value_first
-                    train_row_copy[interaction_second] = value_second
-                    dfs_to_predict.append(train_row_copy)
-                    features_and_values_list.append((interaction_first, interaction_second, value_first, value_second))
-
-        # Predict on the entire batch at once
-        if dfs_to_predict:
-            logger.info(f"Predicting batch of {len(dfs_to_predict)} rows for interactions...")
-            batch_df = pd.concat(dfs_to_predict, ignore_index=True)
-            batch_predictions = self._predict_from_df(batch_df)
-            
-            # Map results back
-            for i, (f1, f2, v1, v2) in enumerate(features_and_values_list):
-                prediction = batch_predictions[i]
-                relativity = prediction / baseline_prediction
-                if v1 not in self.relativities_interaction[f1][f2]:
-                    self.relativities_interaction[f1][f2][v1] = {}
-                self.relativities_interaction[f1][f2][v1][v2] = relativity
-
-        relativities_interaction_df = self.construct_relativities_interaction_df()
-        logger.info("Relativities DataFrame computed")
+        grids = []
+        for interaction_first, interaction_second in interactions:
+            levels_first = self.get_interaction_levels(interaction_first)
+            levels_second = self.get_interaction_levels(interaction_second)
+            grids.append((interaction_first, interaction_second, levels_first, levels_second))
+
+        n_cells = sum(len(levels_first) * len(levels_second) for _, _, levels_first, levels_second in grids)
+        features_1 = np.empty(n_cells, dtype=object)
+        features_2 = np.empty(n_cells, dtype=object)
+        values_1 = np.empty(n_cells, dtype=object)
+        values_2 = np.empty(n_cells, dtype=object)
+        relativities = np.empty(n_cells, dtype=np.float64)
+
+        if n_cells > 0:
+            sample_train_row = self.initialize_baseline()
+            baseline_prediction = self.calculate_baseline_prediction(sample_train_row)
+            coefficient_relativities = self.get_coefficient_relativities(sample_train_row)
+
+        start = 0
+        for interaction_first, interaction_second, levels_first, levels_second in grids:
+            end = start + len(levels_first) * len(levels_second)
+            features_1[start:end] = interaction_first
+            features_2[start:end] = interaction_second
+            values_1[start:end] = np.repeat(np.array(levels_first, dtype=object), len(levels_second))
+            values_2[start:end] = np.tile(np.array(levels_second, dtype=object), len(levels_first))
+            for chunk_start in range(start, end, RELATIVITY_CHUNK_SIZE):
+                chunk_end = min(chunk_start + RELATIVITY_CHUNK_SIZE, end)
+                scenarios = {interaction_first: values_1[chunk_start:chunk_end].tolist(),
+                             interaction_second: values_2[chunk_start:chunk_end].tolist()}
+                relativities[chunk_start:chunk_end] = self.compute_relativities(
+                    coefficient_relativities, sample_train_row, baseline_prediction, scenarios)
+            start = end
+
+        relativities_interaction_df = pd.DataFrame({'feature_1': features_1,
+                                                    'feature_2': features_2,
+                                                    'value_1': values_1,
+                                                    'value_2': values_2,
+                                                    'relativity': relativities})
+        logger.info(f"Interaction relativities DataFrame computed ({n_cells} cells)")
         return relativities_interaction_df
 
     def apply_weights_to_data(self, test_set):
@@ -277,101 +280,54 @@ class RelativitiesCalculator:
         logger.info(f"Preparing {dataset_type} dataset.")
 
         if dataset_type == 'train':
-            dataset = self.model_retriever.model_info_handler.get_train_df()[0].copy()
+            dataset = self.model_retriever.model_info_handler.get_train_df()[0]
         elif dataset_type == 'test':
-            dataset = self.model_retriever.model_info_handler.get_test_df()[0].copy()
+            dataset = self.model_retriever.model_info_handler.get_test_df()[0]
         else:
             raise ValueError("dataset_type must be either 'train' or 'test'")
 
         predicted = self._predict_from_df(dataset)
-        dataset['predicted'] = predicted
-        dataset['weight'] = 1 if self.model_retriever.exposure_columns is None else dataset[self.model_retriever.exposure_columns]
-
-        dataset['weighted_target'] = dataset[self.model_retriever.target_column]
-        dataset['weighted_predicted'] = dataset['predicted']
+        measures = {'predicted': predicted,
+                    'weight': 1 if self.model_retriever.exposure_columns is None else dataset[self.model_retriever.exposure_columns],
+                    'weighted_target': dataset[self.model_retriever.target_column],
+                    'weighted_predicted': predicted}
+        extra_columns = [self.model_retriever.target_column, self.model_retriever.exposure_columns] + list(self.model_retriever.offset_columns or [])
+        # the predictions are only binned and plotted by the lift chart, the other measures are summed
+        dataset = build_analysis_frame(dataset, self.model_retriever.features, measures,
+                                       [column for column in extra_columns if column is not None],
+                                       float32_measures=['predicted'])
         
-        logger.info(f"{dataset_type.capitalize()} dataset prepared: {dataset.shape}")
+        logger.info(f"{dataset_type.capitalize()} dataset prepared: {dataset.shape}, {dataset.memory_usage(deep=True).sum() / 1e6:.0f} MB")
         return dataset
     
-    def compute_base_predictions_variable(self, test_set, used_features, feature, max_modalities=100, grouping_info=None):
-        logger.info(f"Starting compute_base_predictions for {feature}")
-        base_data = {}
-        copy_test_df = test_set.copy()
-        copy_test_df[self.model_retriever.exposure_columns] = 1
-
-        feature_type = self.variable_types.get(feature, None)
-        exposure_col = self.model_retriever.exposure_columns
-        if exposure_col is None:
-            copy_test_df['weight'] = 1
-            exposure_col = 'weight'
-
-        bin_map = None
-        if feature_type == 'CATEGORY':
-            exposure_per_modality = copy_test_df.groupby(feature)[exposure_col].sum()
-            top_modalities = exposure_per_modality.nlargest(max_modalities - 1).index
-            copy_test_df[feature] = copy_test_df[feature].where(copy_test_df[feature].isin(top_modalities), other='Other')
-            feature_df = copy_test_df.groupby(feature, as_index=False).first()
-            feature_df[exposure_col] = 1
-        elif feature_type == 'NUMERIC':
-            unique_vals = copy_test_df[feature].nunique(dropna=True)
-            if unique_vals > max_modalities:
-                if grouping_info is None:
-                    copy_test_df['feature_bin'] = pd.qcut(copy_test_df[feature], q=max_modalities, duplicates='drop')
-                    def weighted_mean(x):
-                        return np.average(x[feature], weights=x[exposure_col])
-                    bin_means = copy_test_df.groupby('feature_bin').apply(weighted_mean)
-                    bin_map = dict(zip(bin_means.index, bin_means.values))
-                    # Map the bin containing the base_value to the base_value itself
-                    base_value = self.base_values.get(feature, None)
-                    if base_value is not None:
-                        for bin_label in bin_map:
-                            left = bin_label.left if hasattr(bin_label, 'left') else None
-                            right = bin_label.right if hasattr(bin_label, 'right') else None
-                            if left is not None and right is not None and left < base_value <= right:
-                                bin_map[bin_label] = float(base_value)
-                                break
-                else:
-                    bin_map = grouping_info
-                    copy_test_df['feature_bin'] = pd.qcut(copy_test_df[feature], q=max_modalities, duplicates='drop')
-                copy_test_df[feature] = copy_test_df['feature_bin'].map(bin_map).astype(float)
-                feature_df = copy_test_df.groupby('feature_bin', as_index=False).first()
-                feature_df[feature] = feature_df['feature_bin'].map(bin_map).astype(float)
-                feature_df[exposure_col] = 1
-                feature_df = feature_df.drop(columns=['feature_bin'])
-            else:
-                feature_df = copy_test_df.groupby(feature, as_index=False).first()
-                feature_df[exposure_col] = 1
-        else:
-            feature_df = copy_test_df.groupby(feature, as_index=False).first()
-            feature_df[exposure_col] = 1
-
-        for other_feature in used_features:
-            if other_feature != feature:
-                feature_df[other_feature] = self.base_values[other_feature]
-
-        predictions = self._predict_from_df(feature_df)
-        base_data[feature] = pd.DataFrame({
-            f'base_{feature}': predictions,
-            feature: feature_df[feature]
-        })
+    def get_base_level_predictions(self, variable, levels):
+        """
+        predictions of the levels of a variable, the other features being at their base values
+        """
+        logger.info(f"Computing base level predictions for {variable}")
+        sample_train_row = self.initialize_baseline()
+        baseline_prediction = self.calculate_baseline_prediction(sample_train_row)
+        coefficient_relativities = self.get_coefficient_relativities(sample_train_row)
+        relativities = self.compute_relativities(coefficient_relativities, sample_train_row, baseline_prediction,
+                                                 {variable: list(levels)})
+        return baseline_prediction * np.asarray(relativities)
 
-        logger.info("Finished compute_base_predictions")
-        return base_data, bin_map
-    
-    def get_formated_predicted_base(self):
+    def get_formated_predicted_base_variable(self, variable, one_way_cube):
+        """
+        one-way table of a variable on the train and test sets, sliced from the
+        one-way cube of the model, only the base level predictions being computed
+        """
         logger.info("Getting formatted and predicted base")
-        self.get_predicted_and_base()
-        df = self.predicted_base_df.copy()
-        df.columns = ['definingVariable', 
-                     'Category', 
-                     'observedAverage', 
-                     'fittedAverage', 'Value', 'baseLevelPrediction', 'dataset']
+        base_predictions = None
+        if variable in self.model_retriever.get_used_features():
+            base_predictions = self.get_base_level_predictions(variable, one_way_cube.levels[variable])
+        df = one_way_cube.get_one_way(variable, base_predictions)
         logger.info("Successfully got formatted and predicted base")
         return df
-    
-    def get_formated_predicted_base_variable(self, variable):
+
+    def get_formated_predicted_base(self):
         logger.info("Getting formatted and predicted base")
-        self.get_predicted_and_base_variable(variable)
+        self.get_predicted_and_base()
         df = self.predicted_base_df.copy()
         df.columns = ['definingVariable', 
                      'Category', 
@@ -380,60 +336,14 @@ class RelativitiesCalculator:
         logger.info("Successfully got formatted and predicted base")
         return df
     
-    def merge_predictions(self, test_set, base_data):
-        logger.info("Merging Base predictions")
-        for feature in base_data.keys():
-            test_set = test_set.set_index(feature).join(base_data[feature].set_index(feature), how='left')
-        logger.info("Successfully Merged Base predictions")
-        return test_set
-    
-    def process_dataset_variable(self, dataset, dataset_name, variable, max_modalities=100):
-        logger.info(f"Processing dataset {dataset_name}")
-        used_features = self.model_retriever.get_used_features()
-        # Compute base_data and get grouping info
-        base_data, bin_map = self.compute_base_predictions_variable(dataset, used_features, variable, max_modalities=max_modalities)
-        feature_type = self.variable_types.get(variable, None)
-        exposure_col = self.model_retriever.exposure_columns or 'weight'
-        grouped_dataset = dataset.copy()
-        if feature_type == 'CATEGORY':
-            exposure_per_modality = grouped_dataset.groupby(variable)[exposure_col].sum()
-            top_modalities = exposure_per_modality.nlargest(max_modalities - 1).index
-            grouped_dataset[variable] = grouped_dataset[variable].where(grouped_dataset[variable].isin(top_modalities), other='Other')
-        elif feature_type == 'NUMERIC':
-            unique_vals = grouped_dataset[variable].nunique(dropna=True)
-            if unique_vals > max_modalities and bin_map is not None:
-                grouped_dataset['feature_bin'] = pd.qcut(grouped_dataset[variable], q=max_modalities, duplicates='drop')
-                grouped_dataset[variable] = grouped_dataset['feature_bin'].map(bin_map).astype(float)
-                grouped_dataset = grouped_dataset.drop(columns=['feature_bin'])
-        dataset = self.merge_predictions(grouped_dataset, base_data)
-        predicted_base = self.data_handler.calculate_weighted_aggregations(dataset, [variable], ([variable] if variable in used_features else []))
-        predicted_base_df = self.data_handler.construct_final_dataframe(predicted_base)
-        predicted_base_df['dataset'] = dataset_name
-        logger.info(f"Processed dataset {dataset_name}")
-        return predicted_base_df
-    
     def get_predicted_and_base(self, nb_bins_numerical=100000):
         logger.info("Getting Predicted and base")
         
         test_predictions = self.process_dataset(self.test_set, 'test')
         train_predictions = self.process_dataset(self.train_set, 'train')
         
-        self.predicted_base_df = train_predictions.append(test_predictions)
+        self.predicted_base_df = pd.concat([train_predictions, test_predictions])
         categorical_variables = [variable for variable in self.variable_types.keys() if self.variable_types[variable] == 'CATEGORY']
         self.predicted_base_df['category'] = [str(category) if variable in categorical_variables else category for category, variable in zip(self.predicted_base_df['category'], self.predicted_base_df['feature'])]
         logger.info("Successfully got Predicted and base")
         return self.predicted_base_df.copy()
-    
-    def get_predicted_and_base_variable(self, variable, nb_bins_numerical=100000):
-        logger.info(f"Getting Predicted and base for variable {variable}")
-        
-        test_predictions = self.process_dataset_variable(self.test_set, 'test', variable)
-        train_predictions = self.process_dataset_variable(self.train_set, 'train', variable)
-        
-        self.predicted_base_df = train_predictions.append(test_predictions)
-        categorical_variables = [variable for variable in self.variable_types.keys() if self.variable_types[variable] == 'CATEGORY']
-        self.predicted_base_df['category'] = [str(category) if variable in categorical_variables else category for category, variable in zip(self.predicted_base_df['category'], self.predicted_base_df['feature'])]
-        logger.info("Successfully got Predicted and base")
-        return self.predicted_base_df.copy()
-
-
@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 
 from logging_assist.logging import logger
+from glm_handler.columnar_accumulator import ColumnarAccumulator
 
 
 class GlmDataHandler():
@@ -97,13 +98,13 @@ class GlmDataHandler():
     
     def construct_final_dataframe(self, predicted_base):
         logger.info("Constructing final dataframe")
-        predicted_base_df = pd.DataFrame(columns=['feature', 'category', 'target', 'predicted', 'exposure', 'base'])
+        predicted_base_df = ColumnarAccumulator(['feature', 'category', 'target', 'predicted', 'exposure', 'base'])
         for feature, df in predicted_base.items():
             df.columns = ['category', 'target', 'predicted', 'exposure', 'base']
             df['feature'] = feature
-            predicted_base_df = predicted_base_df.append(df)
+            predicted_base_df.add_frame(df)
         logger.info("Successfully constructed final dataframe")
-        return predicted_base_df
+        return predicted_base_df.to_frame()
     
     def bin_numeric_columns(self, test_set, nb_bins_numerical, features, non_excluded_features):
         for feature in non_excluded_features:
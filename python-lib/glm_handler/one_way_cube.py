@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+from glm_handler.columnar_accumulator import ColumnarAccumulator
+
+DATASETS = ['train', 'test']
+# summed per level, count being the number of rows
+MEASURES = ['count', 'weight', 'weighted_target', 'weighted_predicted']
+ONE_WAY_COLUMNS = ['definingVariable', 'Category', 'observedAverage', 'fittedAverage', 'Value', 'baseLevelPrediction', 'dataset']
+
+
+def sort_levels(levels):
+    try:
+        return sorted(levels)
+    except TypeError:
+        return sorted(levels, key=str)
+
+
+class OneWayCube():
+    """
+    summed exposure, target and prediction of every level of every feature on
+    the train and test sets, computed once per model so that the one-way
+    charts are slices of it
+
+    The levels of a feature are defined on the train set and shared with the
+    test set: the max_modalities - 1 categories with the most exposure and
+    'Other', the distinct values of a numerical feature or, if it has more than
+    max_modalities of them, its quantile bins represented by their exposure
+    weighted mean (the bin of the base value by the base value). Rows are
+    assigned integer level codes and summed with np.bincount.
+
+    Parameters
+    ----------
+    train_set, test_set : pandas.DataFrame
+        Prepared datasets, with weight, weighted_target and weighted_predicted columns.
+    variable_types : dict
+        DSS type of every feature, NUMERIC features being binned.
+    base_values : dict
+        Base value of every feature.
+    max_modalities : int, optional
+        Maximum number of levels per feature.
+    """
+
+    def __init__(self, train_set, test_set, variable_types, base_values, max_modalities=100):
+        self.variable_types = variable_types
+        self.levels = {}
+        self.sums = {}
+        for feature, feature_type in variable_types.items():
+            if feature not in train_set.columns or feature not in test_set.columns:
+                continue
+            if feature_type == 'NUMERIC':
+                levels, get_codes = self.get_numeric_levels(train_set, test_set, feature, base_values.get(feature),
+                                                            max_modalities)
+            else:
+                levels, get_codes = self.get_categorical_levels(train_set, feature, max_modalities)
+            self.levels[feature] = levels
+            # shape (n_datasets, n_measures, n_levels)
+            self.sums[feature] = np.stack([self.sum_by_level(dataset, get_codes(dataset[feature]), len(levels))
+                                           for dataset in (train_set, test_set)])
+
+    @staticmethod
+    def sum_by_level(dataset, codes, n_levels):
+        in_level = codes >= 0
+        sums = [np.bincount(codes[in_level], minlength=n_levels).astype(np.float64)]
+        for measure in MEASURES[1:]:
+            weights = np.broadcast_to(np.asarray(dataset[measure], dtype=np.float64), codes.shape)
+            sums.append(np.bincount(codes[in_level], weights=weights[in_level], minlength=n_levels))
+        return np.stack(sums)
+
+    @staticmethod
+    def get_categorical_levels(train_set, feature, max_modalities):
+        codes, uniques = pd.factorize(train_set[feature])
+        in_level = codes >= 0
+        exposure = np.bincount(codes[in_level], weights=np.broadcast_to(
+            np.asarray(train_set['weight'], dtype=np.float64), codes.shape)[in_level], minlength=len(uniques))
+        # stable sort so that ties keep the order of appearance, as nlargest does
+        top_codes = np.argsort(-exposure, kind='stable')[:max_modalities - 1]
+        levels = sort_levels(list(uniques[top_codes]) + ['Other'])
+        other_code = levels.index('Other')
+
+        def get_codes(values):
+            codes = pd.Index(levels).get_indexer(values)
+            codes[codes < 0] = other_code
+            codes[np.asarray(pd.isna(values))] = -1
+            return codes
+
+        return levels, get_codes
+
+    @staticmethod
+    def get_numeric_levels(train_set, test_set, feature, base_value, max_modalities):
+        values = pd.concat([train_set[feature], test_set[feature]])
+        if values.nunique(dropna=True) <= max_modalities:
+            levels = sort_levels(values.dropna().unique().tolist())
+
+            def get_codes(values):
+                return pd.Index(levels).get_indexer(values)
+
+            return levels, get_codes
+
+        train_values = train_set[feature].to_numpy(dtype=np.float64)
+        _, edges = pd.qcut(train_values, q=max_modalities, duplicates='drop', retbins=True)
+        n_bins = len(edges) - 1
+
+        def get_codes(values):
+            values = np.asarray(values, dtype=np.float64)
+            # bins are closed on the right, values out of the train range go to the first or last bin
+            codes = np.clip(np.searchsorted(edges, values, side='left') - 1, 0, n_bins - 1)
+            codes[np.isnan(values)] = -1
+            return codes
+
+        codes = get_codes(train_values)
+        in_bin = codes >= 0
+        weights = np.broadcast_to(np.asarray(train_set['weight'], dtype=np.float64), codes.shape)[in_bin]
+        exposure = np.bincount(codes[in_bin], weights=weights, minlength=n_bins)
+        weighted_sum = np.bincount(codes[in_bin], weights=weights * train_values[in_bin], minlength=n_bins)
+        midpoints = (edges[:-1] + edges[1:]) / 2
+        levels = np.where(exposure > 0, weighted_sum / np.where(exposure > 0, exposure, 1), midpoints)
+        if base_value is not None:
+            base_bin = get_codes([base_value])[0]
+            if base_bin >= 0:
+                levels[base_bin] = float(base_value)
+        return levels.tolist(), get_codes
+
+    def get_one_way(self, feature, base_predictions=None):
+        """
+        one-way table of a feature on both datasets, one row per level with rows
+
+        Parameters
+        ----------
+        feature : str
+            Feature of the cube.
+        base_predictions : numpy.ndarray, optional
+            Prediction of every level, the other features being at their base
+            values. The fitted averages are used if None (features not in the model).
+
+        Returns
+        -------
+        pandas.DataFrame
+            The ONE_WAY_COLUMNS of every level, train rows first.
+        """
+        levels = np.empty(len(self.levels[feature]), dtype=object)
+        levels[:] = [str(level) for level in self.levels[feature]] if self.variable_types[feature] == 'CATEGORY' \
+            else self.levels[feature]
+        table = ColumnarAccumulator(ONE_WAY_COLUMNS)
+        for dataset_index, dataset in enumerate(DATASETS):
+            count, exposure, target, predicted = self.sums[feature][dataset_index]
+            present = count > 0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                observed_average = target[present] / exposure[present]
+                fitted_average = predicted[present] / exposure[present]
+            base = fitted_average if base_predictions is None else np.asarray(base_predictions, dtype=np.float64)[present]
+            table.add_columns(definingVariable=feature, Category=levels[present], observedAverage=observed_average,
+                              fittedAverage=fitted_average, Value=exposure[present], baseLevelPrediction=base,
+                              dataset=dataset)
+        return table.to_frame()
@@ -0,0 +1,310 @@
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import re
+import secrets
+import shutil
+import stat
+import tempfile
+
+import numpy as np
+import pandas as pd
+from logging_assist.logging import logger
+
+# part of the fingerprint of the entries, to be changed with the layout of the files
+STORE_FORMAT_VERSION = 2
+FRAME_METADATA_FILE = 'frame.json'
+OBJECT_FILE = 'object.signed'
+# key signing the objects of the store, readable by the owner of the store only
+SIGNING_KEY_FILE = '.signing-key'
+PRIVATE_DIRECTORY_MODE = 0o700
+
+
+def get_entry_fingerprint(training_fingerprint):
+    """
+    fingerprint of the entries of a training of a model, on the training
+    and the format of the store
+    """
+    return hashlib.sha1(repr((STORE_FORMAT_VERSION, training_fingerprint)).encode()).hexdigest()[:16]
+
+
+def get_model_directory_name(model_id):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(model_id))
+
+
+def get_directory_size(path):
+    size = 0
+    for directory, _, files in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(directory, file)) for file in files)
+    return size
+
+
+def check_private_directory(path):
+    """
+    raises PermissionError unless path is a directory, not a link, owned by
+    the current user and not writable by its group or by others
+    """
+    status = os.lstat(path)
+    if not stat.S_ISDIR(status.st_mode):
+        raise PermissionError(f'{path} is not a directory')
+    if status.st_uid != os.geteuid():
+        raise PermissionError(f'{path} is not owned by the current user')
+    if status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f'{path} is writable by other users')
+
+
+def to_json_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if value is pd.NaT or value is pd.NA:
+        return None
+    raise TypeError(f'Values of type {type(value).__name__} cannot be stored')
+
+
+def save_values(values, path, name):
+    """
+    saves an array as a .npy file if it is numerical, as a JSON list of
+    strings, numbers and None otherwise, returning its description
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'biufcmM':
+        np.save(os.path.join(path, f'{name}.npy'), values, allow_pickle=False)
+        return {'file': f'{name}.npy'}
+    return {'values': [to_json_value(value) for value in values.tolist()]}
+
+
+def load_values(description, path):
+    if 'file' in description:
+        return np.load(os.path.join(path, description['file']), mmap_mode='c', allow_pickle=False)
+    values = np.empty(len(description['values']), dtype=object)
+    values[:] = description['values']
+    return values
+
+
+def save_frame(frame, path):
+    """
+    saves a DataFrame with its numerical columns and the codes of its
+    categorical columns as .npy files, so that they can be memory-mapped
+    when loading, the other columns and the categories being JSON lists
+    """
+    os.makedirs(path, mode=PRIVATE_DIRECTORY_MODE)
+    columns = []
+    for position, column in enumerate(frame.columns):
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            columns.append({'name': column, 'kind': 'category', 'ordered': bool(values.cat.ordered),
+                            'codes': save_values(values.cat.codes.to_numpy(), path, f'{position}'),
+                            'categories': save_values(values.cat.categories.to_numpy(), path,
+                                                      f'{position}.categories')})
+        else:
+            columns.append({'name': to_json_value(column), 'kind': 'values',
+                            'values': save_values(values.to_numpy(), path, f'{position}')})
+    if isinstance(frame.index, pd.RangeIndex):
+        index = {'range': [frame.index.start, frame.index.stop, frame.index.step]}
+    else:
+        index = {'values': save_values(frame.index.to_numpy(), path, 'index')}
+    index['name'] = to_json_value(frame.index.name)
+    with open(os.path.join(path, FRAME_METADATA_FILE), 'w') as metadata_file:
+        json.dump({'columns': columns, 'index': index}, metadata_file)
+
+
+def load_frame(path):
+    """
+    loads a DataFrame saved by save_frame, its arrays being memory-mapped
+    copy-on-write: pages are read on use, and writes stay in memory
+    """
+    with open(os.path.join(path, FRAME_METADATA_FILE)) as metadata_file:
+        metadata = json.load(metadata_file)
+    columns = {}
+    for column in metadata['columns']:
+        if column['kind'] == 'category':
+            categories = load_values(column['categories'], path)
+            columns[column['name']] = pd.Categorical.from_codes(load_values(column['codes'], path),
+                                                                categories=categories, ordered=column['ordered'])
+        else:
+            columns[column['name']] = load_values(column['values'], path)
+    if 'range' in metadata['index']:
+        index = pd.RangeIndex(*metadata['index']['range'], name=metadata['index']['name'])
+    else:
+        index = pd.Index(load_values(metadata['index']['values'], path), name=metadata['index']['name'])
+    # copy=False keeps the memory-mapped arrays instead of consolidating them
+    return pd.DataFrame(columns, index=index, columns=[column['name'] for column in metadata['columns']], copy=False)
+
+
+class DiskModelStore():
+    """
+    stores the objects cached for models on local disk, so that they
+    survive restarts of the webapp
+
+    Entries live in root/<model id>/<fingerprint>/<key>, the fingerprint
+    changing when the model is retrained. DataFrames are saved as memory-
+    mappable column files with JSON metadata (see save_frame). The other
+    objects are pickled along with an HMAC of the pickle, keyed by a secret
+    of the store, and only unpickled when the HMAC matches. When the store
+    goes over max_bytes, the least recently used entries are deleted,
+    reading an entry marking it as used.
+
+    As the entries hold training data, the root is a private directory:
+    it is created readable by the current user only, and an existing root
+    is refused if another user owns it or can write to it.
+
+    Parameters
+    ----------
+    root : str
+        Directory of the store, created if needed.
+    max_bytes : int, optional
+        Disk budget, unbounded if None.
+    """
+
+    def __init__(self, root, max_bytes=None):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, mode=PRIVATE_DIRECTORY_MODE, exist_ok=True)
+        check_private_directory(self.root)
+        self.signing_key = self.get_signing_key()
+
+    def get_signing_key(self):
+        path = os.path.join(self.root, SIGNING_KEY_FILE)
+        try:
+            key_file = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            status = os.lstat(path)
+            if not stat.S_ISREG(status.st_mode) or status.st_uid != os.geteuid() or status.st_mode & 0o077:
+                raise PermissionError(f'{path} is not a private file of the current user')
+            with open(path, 'rb') as existing_key_file:
+                return existing_key_file.read()
+        key = secrets.token_bytes(32)
+        with os.fdopen(key_file, 'wb') as new_key_file:
+            new_key_file.write(key)
+        return key
+
+    def sign(self, payload):
+        return hmac.new(self.signing_key, payload, hashlib.sha256).digest()
+
+    def save_object(self, value, path):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(path, OBJECT_FILE), 'wb') as object_file:
+            object_file.write(self.sign(payload) + payload)
+
+    def load_object(self, path):
+        with open(os.path.join(path, OBJECT_FILE), 'rb') as object_file:
+            content = object_file.read()
+        signature, payload = content[:hashlib.sha256().digest_size], content[hashlib.sha256().digest_size:]
+        if not hmac.compare_digest(signature, self.sign(payload)):
+            raise ValueError(f'{path} was not written by this store')
+        return pickle.loads(payload)
+
+    def get_entry_path(self, model_id, fingerprint, key):
+        return os.path.join(self.root, get_model_directory_name(model_id), get_entry_fingerprint(fingerprint),
+                            get_model_directory_name(key))
+
+    def load(self, model_id, fingerprint, key):
+        """
+        returns (True, value) if the object is stored, (False, None) otherwise
+        """
+        path = self.get_entry_path(model_id, fingerprint, key)
+        if not os.path.isdir(path):
+            return False, None
+        if os.path.exists(os.path.join(path, FRAME_METADATA_FILE)):
+            value = load_frame(path)
+        else:
+            value = self.load_object(path)
+        os.utime(path)
+        return True, value
+
+    def save(self, model_id, fingerprint, key, value):
+        """
+        saves an object, written to a temporary directory first so that
+        readers never see a partial entry
+        """
+        path = self.get_entry_path(model_id, fingerprint, key)
+        if os.path.isdir(path):
+            return
+        fingerprint_path = os.path.dirname(path)
+        # entries of former trainings of the model are stale
+        self.remove_model(model_id, keep=os.path.basename(fingerprint_path))
+        os.makedirs(fingerprint_path, mode=PRIVATE_DIRECTORY_MODE, exist_ok=True)
+        temporary_path = tempfile.mkdtemp(dir=fingerprint_path, prefix='.tmp-')
+        try:
+            entry_path = os.path.join(temporary_path, 'entry')
+            if isinstance(value, pd.DataFrame):
+                save_frame(value, entry_path)
+            else:
+                os.makedirs(entry_path, mode=PRIVATE_DIRECTORY_MODE)
+                self.save_object(value, entry_path)
+            os.rename(entry_path, path)
+        except OSError:
+            # another request saved the same entry first
+            if not os.path.isdir(path):
+                raise
+        finally:
+            shutil.rmtree(temporary_path, ignore_errors=True)
+        self.cleanup(keep=path)
+
+    def remove_model(self, model_id, keep=None):
+        """
+        removes the entries of a model, but the ones of the keep fingerprint
+        """
+        model_path = os.path.join(self.root, get_model_directory_name(model_id))
+        if not os.path.isdir(model_path):
+            return
+        for fingerprint in os.listdir(model_path):
+            if fingerprint != keep:
+                shutil.rmtree(os.path.join(model_path, fingerprint), ignore_errors=True)
+
+    def list_entries(self):
+        """
+        returns the (path, size, last use) of every entry
+        """
+        entries = []
+        for model in os.listdir(self.root):
+            if model == SIGNING_KEY_FILE:
+                continue
+            model_path = os.path.join(self.root, model)
+            for fingerprint in os.listdir(model_path) if os.path.isdir(model_path) else []:
+                fingerprint_path = os.path.join(model_path, fingerprint)
+                if not os.path.isdir(fingerprint_path):
+                    continue
+                for key in os.listdir(fingerprint_path):
+                    if key.startswith('.tmp-'):
+                        continue
+                    path = os.path.join(fingerprint_path, key)
+                    entries.append((path, get_directory_size(path), os.path.getmtime(path)))
+        return entries
+
+    def cleanup(self, keep=None):
+        """
+        deletes the least recently used entries until the store fits in its budget
+        """
+        if self.max_bytes is None:
+            return
+        entries = self.list_entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            self.remove_empty_parents(path)
+            total_bytes -= size
+            logger.info(f"Deleted cache entry {path} ({total_bytes / 1e6:.0f} MB used on disk "
+                        f"out of {self.max_bytes / 1e6:.0f} MB)")
+
+    def remove_empty_parents(self, path):
+        for parent in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                # not empty
+                return
+
+    def get_stats(self):
+        entries = self.list_entries()
+        return {'items': len(entries),
+                'used_bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes}
@@ -1,10 +1,58 @@
+import os
+
 from logging_assist.logging import logger
+from model_cache.disk_model_store import DiskModelStore
 from model_cache.model_conformity_checker import ModelConformityChecker
+from model_cache.model_object_store import ModelObjectStore
+
+# memory budget of the cache in MB, overridden by the GLM_MODEL_CACHE_MAX_MB environment variable
+DEFAULT_MAX_MB = 2048
+# disk budget of the cache in MB, overridden by the GLM_MODEL_DISK_CACHE_MAX_MB environment variable
+DEFAULT_DISK_MAX_MB = 10240
+# objects also kept on disk, being the ones that take long to build
+PERSISTED_KEYS = ['train_set', 'test_set', 'base_values_modalities_types', 'one_way_cube', 'relativities',
+                  'relativities_interaction', 'variable_level_stats']
+
+
+def get_default_max_bytes():
+    max_mb = float(os.getenv('GLM_MODEL_CACHE_MAX_MB', DEFAULT_MAX_MB))
+    return int(max_mb * 1e6) if max_mb > 0 else None
+
+
+def get_default_disk_store():
+    """
+    disk store of the cache, only used when asked for: in GLM_MODEL_CACHE_DIR
+    if set, or in a private directory of the user running the webapp if
+    GLM_MODEL_DISK_CACHE is set to 1. None otherwise, or if the directory is
+    not private to that user (see DiskModelStore).
+    """
+    root = os.getenv('GLM_MODEL_CACHE_DIR')
+    if not root and os.getenv('GLM_MODEL_DISK_CACHE') == '1':
+        root = os.path.join(os.path.expanduser('~'), '.cache', 'dss-plugin-generalized-linear-models', 'model-cache')
+    if not root:
+        return None
+    max_mb = float(os.getenv('GLM_MODEL_DISK_CACHE_MAX_MB', DEFAULT_DISK_MAX_MB))
+    try:
+        return DiskModelStore(root, int(max_mb * 1e6) if max_mb > 0 else None)
+    except OSError as e:
+        logger.warning(f"Unable to use {root} for the model cache, objects will only be kept in memory: {e}")
+        return None
+
 
 class ModelCache(ModelConformityChecker):
-    def __init__(self):
+    def __init__(self, max_bytes=None, disk_store=None):
+        """
+        Parameters:
+        max_bytes (int): Memory budget of the cache, the least recently used
+        objects being evicted beyond it. Defaults to GLM_MODEL_CACHE_MAX_MB,
+        a value of 0 or less meaning no budget.
+        disk_store (DiskModelStore): Second tier keeping the PERSISTED_KEYS
+        objects across restarts. Defaults to get_default_disk_store(), no
+        disk store unless one is configured.
+        """
         super().__init__()
-        self.cache = {}
+        self.cache = ModelObjectStore(max_bytes if max_bytes is not None else get_default_max_bytes())
+        self.disk_store = disk_store if disk_store is not None else get_default_disk_store()
 
     def add_model_object(self, 
                         model_id: str,
@@ -23,11 +71,8 @@ class ModelCache(ModelConformityChecker):
         is_conform = self.check_model_conformity(model_id)
         
         if is_conform:
-            if model_id in self.cache.keys():
-                self.cache[model_id][model_object_key] = model_object_value
-            else:
-                self.cache[model_id] = {model_object_key: model_object_value}
-            logger.info(f"Model Object '{model_object_key}' for '{model_id}' added to cache.")
+            size = self.cache.put(model_id, model_object_key, model_object_value)
+            logger.info(f"Model Object '{model_object_key}' for '{model_id}' added to cache ({size / 1e6:.1f} MB).")
         else:
             logger.info(f"Model '{model_id}' does not conform, not added to cache")
     
@@ -35,25 +80,61 @@ class ModelCache(ModelConformityChecker):
         """
         Generic function to retrieve an item from the cache or create it if it doesn't exist.
 
+        The created item is returned even if it could not be kept in the cache,
+        so that evictions and non conform models only cost a recomputation.
+        Concurrent requests for the same item wait for a single creation.
+
         :param model_id: The ID of the model.
         :param item_key: The key for the object within the model's cache (e.g., 'train_set').
         :param creation_func: A function to call to create the item if not found.
         """
-
-        if model_id not in self.list_models():
-            logger.info(f"Cache miss for model '{model_id}'. Creating new entry.")
-            model_object_value = creation_func(*args, **kwargs)
-            self.add_model_object(model_id, model_object_key, model_object_value)
-
-        model_data = self.get_model(model_id)
-        if model_object_key not in model_data:
+        def create_item():
+            found, model_object_value = self.load_from_disk(model_id, model_object_key)
+            if found:
+                return model_object_value
             logger.info(f"Cache miss for item '{model_object_key}' in model '{model_id}'. Creating.")
             model_object_value = creation_func(*args, **kwargs)
-            self.add_model_object(model_id, model_object_key, model_object_value)
-        
-        logger.info(f"Cache hit for item '{model_object_key}' in model '{model_id}'.")
-        return model_data.get(model_object_key)
+            self.save_to_disk(model_id, model_object_key, model_object_value)
+            return model_object_value
+
+        return self.cache.get_or_create(model_id, model_object_key, create_item,
+                                        add_func=self.add_model_object)
     
+    def load_from_disk(self, model_id: str, model_object_key: str):
+        """
+        Load a model object from the disk store, for the current training of the model.
+
+        Returns:
+        (True, value) if the object was stored, (False, None) otherwise.
+        """
+        if self.disk_store is None or model_object_key not in PERSISTED_KEYS:
+            return False, None
+        try:
+            fingerprint = self.get_model_fingerprint(model_id)
+            if fingerprint is None:
+                return False, None
+            found, model_object_value = self.disk_store.load(model_id, fingerprint, model_object_key)
+        except Exception as e:
+            logger.warning(f"Unable to load '{model_object_key}' for '{model_id}' from disk: {e}")
+            return False, None
+        if found:
+            logger.info(f"Model Object '{model_object_key}' for '{model_id}' loaded from disk.")
+        return found, model_object_value
+
+    def save_to_disk(self, model_id: str, model_object_key: str, model_object_value):
+        """
+        Save a model object of a conform model to the disk store, failures
+        only being logged as the object is still in memory.
+        """
+        if self.disk_store is None or model_object_key not in PERSISTED_KEYS:
+            return
+        try:
+            fingerprint = self.get_model_fingerprint(model_id)
+            if fingerprint is not None:
+                self.disk_store.save(model_id, fingerprint, model_object_key, model_object_value)
+        except Exception as e:
+            logger.warning(f"Unable to save '{model_object_key}' for '{model_id}' to disk: {e}")
+
     def get_model(self, model_name):
         """
         Retrieve a model from the cache.
@@ -62,14 +143,14 @@ class ModelCache(ModelConformityChecker):
         model_name (str): The name of the model to retrieve.
 
         Returns:
-        The model object if found, None otherwise.
+        The cached objects of the model by key if found, None otherwise.
         """
-        if model_name in self.cache:
+        model_objects = self.cache.get_model(model_name)
+        if model_objects is not None:
             print(f"Model '{model_name}' retrieved from cache.")
-            return self.cache[model_name]
         else:
             print(f"Model '{model_name}' not found in cache.")
-            return None
+        return model_objects
     
     def model_exists(self, model_name):
         """
@@ -81,7 +162,7 @@ class ModelCache(ModelConformityChecker):
         Returns:
         True if the model exists in the cache, False otherwise.
         """
-        return model_name in self.cache
+        return model_name in self.list_models()
 
     def remove_model(self, model_name):
         """
@@ -90,8 +171,11 @@ class ModelCache(ModelConformityChecker):
         Parameters:
         model_name (str): The name of the model to remove.
         """
-        if model_name in self.cache:
-            del self.cache[model_name]
+        self.forget_model_conformity(model_name)
+        if self.disk_store is not None:
+            self.disk_store.remove_model(model_name)
+        if self.model_exists(model_name):
+            self.cache.remove_model(model_name)
             print(f"Model '{model_name}' removed from cache.")
         else:
             print(f"Model '{model_name}' not found in cache.")
@@ -103,5 +187,16 @@ class ModelCache(ModelConformityChecker):
         Returns:
         A list of model names.
         """
-        return list(self.cache.keys())
+        return self.cache.list_models()
+
+    def get_cache_stats(self):
+        """
+        Hits, misses and evictions of the cache, with its memory and disk usage.
+
+        Returns:
+        A dict of counters.
+        """
+        cache_stats = self.cache.get_stats()
+        cache_stats['disk'] = self.disk_store.get_stats() if self.disk_store is not None else None
+        return cache_stats
     
@@ -1,30 +1,113 @@
+import threading
+
 from logging_assist.logging import logger
 from dku_visual_ml.dku_base import DataikuClientProject
 import dataikuapi
 
+
+def get_train_info_fingerprint(train_info):
+    """
+    identifies a training of a model, a retrained model having new training times
+    """
+    return (train_info.get('startTime'), train_info.get('endTime'))
+
+
+def get_training_fingerprint(model_details):
+    return get_train_info_fingerprint(model_details.details.get('trainInfo', {}))
+
+
 class ModelConformityChecker(DataikuClientProject):
+    # shared by all the checkers, full model id -> (training fingerprint, is conform)
+    conformity_by_model = {}
+    # details fetched elsewhere and not checked yet, full model id -> details
+    known_model_details = {}
+    memo_lock = threading.Lock()
+
     def __init__(self):
         super().__init__()
+        # the checks read the details of the model being checked from the instance
+        self.check_lock = threading.Lock()
+
+    @classmethod
+    def remember_model_details(cls, model_id, model_details):
+        """
+        keeps details already fetched for a model so that its first conformity
+        check does not fetch them again
+        """
+        with cls.memo_lock:
+            if model_id not in cls.conformity_by_model:
+                cls.known_model_details[model_id] = model_details
+
+    @classmethod
+    def forget_model_conformity(cls, model_id):
+        """
+        invalidates the conformity of a deleted or retrained model
+        """
+        with cls.memo_lock:
+            cls.conformity_by_model.pop(model_id, None)
+            cls.known_model_details.pop(model_id, None)
+
+    def get_mltask(self, model_id):
+        return dataikuapi.dss.ml.DSSMLTask.from_full_model_id(self.client, model_id, self.project.project_key)
+
+    def fetch_training_fingerprint(self, model_id):
+        """
+        training fingerprint of a model from its snippet, which unlike its
+        details does not carry the whole modeling and preprocessing setup
+        """
+        snippet = self.get_mltask(model_id).get_trained_models_snippets([model_id]).get(model_id, {})
+        return get_train_info_fingerprint(snippet.get('trainInfo', {}))
+
+    def check_model_conformity(self, model_id, model_details=None):
+        """
+        checks a model once per training, the details of the model being
+        fetched only if they are not given or remembered
+
+        The training of a model already checked is compared to the one of its
+        check, from the given details or else from its snippet, so that a
+        retrained model is checked again.
+        """
+        with self.memo_lock:
+            memo = self.conformity_by_model.get(model_id)
+            if model_details is None:
+                model_details = self.known_model_details.pop(model_id, None)
+        if memo is not None:
+            if model_details is None:
+                fingerprint = self.fetch_training_fingerprint(model_id)
+            else:
+                fingerprint = get_training_fingerprint(model_details)
+            if memo[0] == fingerprint:
+                return memo[1]
+
+        with self.check_lock:
+            if model_details is None:
+                self.mltask = self.get_mltask(model_id)
+                model_details = self.mltask.get_trained_model_details(model_id)
+
+            logger.info("Check for Model Conformity")
+            self.model_details = model_details
+            
+            is_glm = self.check_is_glm()
+            no_offset = self.check_no_offset()
+            no_weighting = self.check_no_weighting()
+            train_test_split = self.check_train_test_split()
+            feature_handling = self.check_feature_handling()
+            
+            is_conform = all([is_glm, no_offset, no_weighting, train_test_split, feature_handling])
 
+        with self.memo_lock:
+            self.conformity_by_model[model_id] = (get_training_fingerprint(model_details), is_conform)
+        return is_conform
 
-    def check_model_conformity(self, model_id):
-        
-        self.mltask = dataikuapi.dss.ml.DSSMLTask.from_full_model_id(
-            self.client,
-            model_id, 
-            self.project.project_key)
-        
-        logger.info("Check for Model Conformity")
-        model_details = self.mltask.get_trained_model_details(model_id)
-        self.model_details = model_details
-        
-        is_glm = self.check_is_glm()
-        no_offset = self.check_no_offset()
-        no_weighting = self.check_no_weighting()
-        train_test_split = self.check_train_test_split()
-        feature_handling = self.check_feature_handling()
-        
-        return all([is_glm, no_offset, no_weighting, train_test_split, feature_handling])
+    def get_model_fingerprint(self, model_id):
+        """
+        training fingerprint of a conform model, None if the model does not conform
+        """
+        if not self.check_model_conformity(model_id):
+            return None
+        with self.memo_lock:
+            memo = self.conformity_by_model.get(model_id)
+        return memo[0] if memo is not None else None
 
     def check_is_glm(self):
         logger.info("Model Conformity Check: is GLM?")
@@ -0,0 +1,201 @@
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+from logging_assist.logging import logger
+
+
+def estimate_size(value, seen=None):
+    """
+    estimates the memory used by a cached value in bytes: the deep memory
+    usage of DataFrames and Series, the buffer of arrays, and the sizes of
+    the items of containers and of the attributes of objects, each object
+    being counted once
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return int(pd.Series(value.ravel()).memory_usage(deep=True, index=False))
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(key, seen) + estimate_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in value)
+    elif hasattr(value, '__dict__') and not isinstance(value, type):
+        size += estimate_size(vars(value), seen)
+    return size
+
+
+class ModelObjectStore():
+    """
+    stores the objects cached for models, keyed by model id and object key,
+    within a memory budget
+
+    Every object is stored with its estimated size. When the total goes over
+    the budget, the least recently used objects are evicted, a model leaving
+    the store with its last object. The object just stored is never evicted,
+    even if it is larger than the budget on its own.
+
+    The store is safe to share between the threads of the server, and
+    get_or_create runs a single creation per object for concurrent callers.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Memory budget, unbounded if None.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        # (model_id, key) -> (value, size), least recently used first
+        self.entries = OrderedDict()
+        # (model_id, key) -> Future of the object being created
+        self.in_flight = {}
+        self.lock = threading.RLock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def lookup(self, entry_key):
+        """
+        (True, value) marking the object as used if it is stored, (False, None)
+        otherwise, without counting a hit or a miss; the lock must be held
+        """
+        if entry_key not in self.entries:
+            return False, None
+        self.entries.move_to_end(entry_key)
+        return True, self.entries[entry_key][0]
+
+    def get(self, model_id, key):
+        """
+        returns (True, value) if the object is stored, (False, None) otherwise
+        """
+        with self.lock:
+            found, value = self.lookup((model_id, key))
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found, value
+
+    def contains(self, model_id, key):
+        """
+        returns True if the object is stored, without counting a hit or a miss
+        nor marking it as used
+        """
+        with self.lock:
+            return (model_id, key) in self.entries
+
+    def put(self, model_id, key, value):
+        entry_key = (model_id, key)
+        size = estimate_size(value)
+        with self.lock:
+            self.discard(entry_key)
+            self.entries[entry_key] = (value, size)
+            self.total_bytes += size
+            self.evict(keep=entry_key)
+        return size
+
+    def get_or_create(self, model_id, key, creation_func, add_func=None):
+        """
+        returns the stored object, creating it with creation_func if it is not
+
+        Callers asking for an object being created wait for that creation
+        instead of starting their own, and get its result or its exception.
+        The created object is added with add_func(model_id, key, value), put
+        by default, and returned even if add_func did not keep it.
+        """
+        entry_key = (model_id, key)
+        with self.lock:
+            found, value = self.lookup(entry_key)
+            if found:
+                self.hits += 1
+                logger.info(f"Cache hit for item '{key}' in model '{model_id}'.")
+                return value
+            # a request waiting for another one's creation is counted as coalesced only
+            is_creator = entry_key not in self.in_flight
+            if is_creator:
+                self.misses += 1
+                self.in_flight[entry_key] = Future()
+            else:
+                self.coalesced += 1
+            flight = self.in_flight[entry_key]
+        if not is_creator:
+            logger.info(f"Waiting for '{key}' of model '{model_id}' to be created by another request.")
+            return flight.result()
+        try:
+            value = creation_func()
+            (add_func or self.put)(model_id, key, value)
+        except BaseException as error:
+            flight.set_exception(error)
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            with self.lock:
+                self.in_flight.pop(entry_key, None)
+
+    def discard(self, entry_key):
+        if entry_key in self.entries:
+            _, size = self.entries.pop(entry_key)
+            self.total_bytes -= size
+
+    def evict(self, keep=None):
+        """
+        evicts the least recently used objects until the store fits in its budget
+        """
+        if self.max_bytes is None:
+            return
+        for entry_key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if entry_key == keep:
+                continue
+            self.discard(entry_key)
+            self.evictions += 1
+            logger.info(f"Evicted '{entry_key[1]}' of model '{entry_key[0]}' from the cache "
+                        f"({self.total_bytes / 1e6:.0f} MB used out of {self.max_bytes / 1e6:.0f} MB)")
+
+    def get_model(self, model_id):
+        """
+        returns the objects stored for a model by key, None if there is none
+        """
+        with self.lock:
+            model_objects = {key: value for (entry_model_id, key), (value, _) in self.entries.items()
+                             if entry_model_id == model_id}
+        return model_objects if model_objects else None
+
+    def remove_model(self, model_id):
+        with self.lock:
+            for entry_key in [entry_key for entry_key in self.entries if entry_key[0] == model_id]:
+                self.discard(entry_key)
+
+    def list_models(self):
+        with self.lock:
+            return list(dict.fromkeys(model_id for model_id, _ in self.entries))
+
+    def get_stats(self):
+        with self.lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'coalesced': self.coalesced,
+                    'items': len(self.entries),
+                    'models': len(self.list_models()),
+                    'used_bytes': self.total_bytes,
+                    'max_bytes': self.max_bytes}
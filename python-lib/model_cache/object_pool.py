@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from logging_assist.logging import logger
+
+
+class ObjectPool():
+    """
+    keeps the objects built by a factory per key, so that they are only
+    built on the first request for the key
+
+    Objects are dropped ttl seconds after being built, and the least
+    recently used ones when there are more than max_size of them.
+    Concurrent requests for an object being built wait for it.
+
+    Parameters
+    ----------
+    factory : callable
+        Builds the object of a key, factory(key).
+    max_size : int, optional
+        Maximum number of pooled objects.
+    ttl : float, optional
+        Lifetime of a pooled object in seconds, unbounded if None.
+    clock : callable, optional
+        Current time in seconds.
+    """
+
+    def __init__(self, factory, max_size=8, ttl=None, clock=time.monotonic):
+        self.factory = factory
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        # key -> (object, build time), least recently used first
+        self.objects = OrderedDict()
+        # key -> Future of the object being built
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.objects:
+                value, built_at = self.objects[key]
+                if self.ttl is None or self.clock() - built_at < self.ttl:
+                    self.objects.move_to_end(key)
+                    return value
+                del self.objects[key]
+            is_builder = key not in self.in_flight
+            if is_builder:
+                self.in_flight[key] = Future()
+            flight = self.in_flight[key]
+        if not is_builder:
+            return flight.result()
+        try:
+            value = self.factory(key)
+        except BaseException as error:
+            flight.set_exception(error)
+            raise
+        else:
+            with self.lock:
+                self.objects[key] = (value, self.clock())
+                while len(self.objects) > self.max_size:
+                    evicted_key, _ = self.objects.popitem(last=False)
+                    logger.info(f"Dropped '{evicted_key}' from the pool")
+            flight.set_result(value)
+            return value
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def remove(self, key):
+        with self.lock:
+            self.objects.pop(key, None)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.objects)
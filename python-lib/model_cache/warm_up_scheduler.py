@@ -0,0 +1,132 @@
+import itertools
+import queue
+import threading
+
+from logging_assist.logging import logger
+
+# lower values run first
+USER_PRIORITY = 0
+SPECULATIVE_PRIORITY = 1
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+# done, but the object has since been evicted from the cache
+EVICTED = 'evicted'
+
+
+class WarmUpScheduler():
+    """
+    builds the cached objects of models in background threads, so that
+    the charts of a model come from a warm cache
+
+    Tasks are run by a bounded number of worker threads, sharing the model
+    cache of the server, in order of priority: warm-ups requested for the
+    model a user selected go before speculative ones. Scheduling a task
+    again with a higher priority moves it up the queue. A running task is
+    not interrupted, a request needing its object waiting for it through
+    the cache instead of building it again. A task done is only skipped
+    while its object is in the cache, so that evicted objects are built
+    again by the next warm-up of their model.
+
+    Parameters
+    ----------
+    n_workers : int, optional
+        Number of worker threads, started on the first schedule.
+    is_present : callable, optional
+        Tells whether the object of a task is in the cache,
+        is_present(model_id, key). Tasks done are assumed to stay in the
+        cache if None.
+    """
+
+    def __init__(self, n_workers=1, is_present=None):
+        self.n_workers = n_workers
+        self.is_present = is_present
+        self.tasks = queue.PriorityQueue()
+        # ties run in scheduling order
+        self.sequence = itertools.count()
+        # model_id -> {key: state}, in scheduling order
+        self.status = {}
+        # (model_id, key) -> priority of the queued task
+        self.queued_priorities = {}
+        self.lock = threading.Lock()
+        self.workers = []
+
+    def schedule(self, model_id, tasks, priority=SPECULATIVE_PRIORITY):
+        """
+        schedules the tasks of a model, a list of (key, function) pairs run
+        in order at the same priority, skipping tasks running or done with
+        their object still in the cache
+        """
+        with self.lock:
+            model_status = self.status.setdefault(model_id, {})
+            for key, function in tasks:
+                if model_status.get(key) == RUNNING or self.get_state(model_id, key) == DONE:
+                    continue
+                if self.queued_priorities.get((model_id, key), priority + 1) <= priority:
+                    continue
+                model_status[key] = QUEUED
+                self.queued_priorities[(model_id, key)] = priority
+                self.tasks.put((priority, next(self.sequence), model_id, key, function))
+            self.start_workers()
+
+    def start_workers(self):
+        while len(self.workers) < self.n_workers:
+            worker = threading.Thread(target=self.run_tasks, name=f'warm-up-{len(self.workers)}', daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def run_tasks(self):
+        while True:
+            priority, _, model_id, key, function = self.tasks.get()
+            with self.lock:
+                # superseded by the same task scheduled with a higher priority, or forgotten
+                if self.queued_priorities.get((model_id, key)) != priority:
+                    continue
+                del self.queued_priorities[(model_id, key)]
+                self.status[model_id][key] = RUNNING
+            logger.info(f"Warming up '{key}' for model '{model_id}'")
+            try:
+                function()
+                state = DONE
+            except Exception as e:
+                logger.warning(f"Warm-up of '{key}' for model '{model_id}' failed: {e}")
+                state = FAILED
+            with self.lock:
+                if model_id in self.status:
+                    self.status[model_id][key] = state
+
+    def forget_model(self, model_id):
+        """
+        drops the status and the queued tasks of a model, such as a deleted one
+        """
+        with self.lock:
+            self.status.pop(model_id, None)
+            for entry_key in [entry_key for entry_key in self.queued_priorities if entry_key[0] == model_id]:
+                del self.queued_priorities[entry_key]
+
+    def get_state(self, model_id, key):
+        """
+        state of a task, a task done being reported as evicted once its
+        object is no longer in the cache
+        """
+        state = self.status.get(model_id, {}).get(key)
+        if state == DONE and self.is_present is not None and not self.is_present(model_id, key):
+            return EVICTED
+        return state
+
+    def get_status(self):
+        """
+        progress of the warm-up of every model: the state of its tasks and
+        the number of tasks done, with their object in the cache, out of the
+        scheduled ones
+        """
+        with self.lock:
+            status = {}
+            for model_id, model_status in self.status.items():
+                states = {key: self.get_state(model_id, key) for key in model_status}
+                status[model_id] = {'tasks': states,
+                                    'done': sum(state == DONE for state in states.values()),
+                                    'total': len(states)}
+            return status
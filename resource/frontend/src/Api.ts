@@ -27,6 +27,50 @@ interface ModelMetricsDataPoint {
     Deviance: number;
 }
 
+interface AliasedColumn {
+    column: string;
+    equation: string;
+}
+
+interface CoefficientPath {
+    penalty: number[];
+    selectedPenalty: number | null;
+    aic: (number | null)[];
+    deviance: number[];
+    coefficients: Array<{
+        variable: string;
+        values: number[];
+    }>;
+}
+
+interface CandidateScreeningPoint {
+    variable: string;
+    df: number;
+    score_statistic: number;
+    p_value: number;
+    deviance_reduction: number;
+}
+
+interface InteractionDetectionPoint {
+    first: string;
+    second: string;
+    df: number;
+    score_statistic: number;
+    p_value: number;
+    deviance_reduction: number;
+    min_cell_exposure: number;
+    empty_cells: number;
+}
+
+interface FactorTestPoint {
+    variable: string;
+    df: number;
+    deviance_change: number;
+    lr_statistic: number;
+    p_value: number;
+    aic_change: number;
+}
+
 interface ModelComparisonDataPoint {
     definingVariable: any;
     Category: any;
@@ -203,8 +247,14 @@ export let API = {
     deployModel: (model: ModelInfo) => axios.post<number>("/api/deploy_model", model),
     deleteModel: (model: ModelInfo) => axios.post<number>("/api/delete_model", model),
     getModelMetrics: (data: any) => axios.post<ModelMetricsDataPoint>("/api/get_model_metrics", data),
+    getCoefficientPath: (data: ModelPoint) => axios.post<CoefficientPath>("/api/get_coefficient_path", data),
+    getAliasing: (data: ModelPoint) => axios.post<AliasedColumn[]>("/api/get_aliasing", data),
+    getCandidateScreening: (data: ModelPoint) => axios.post<CandidateScreeningPoint[]>("/api/get_candidate_screening", data),
+    getInteractionDetection: (data: ModelPoint) => axios.post<InteractionDetectionPoint[]>("/api/get_interaction_detection", data),
+    getFactorTests: (data: ModelPoint) => axios.post<FactorTestPoint[]>("/api/get_factor_tests", data),
     exportModel: (model: ModelPoint) => axios.post<Blob>("/api/export_model", model),
     exportVariableLevelStats: (model: ModelPoint) => axios.post<Blob>("/api/export_variable_level_stats", model),
+    exportFactorTests: (model: ModelPoint) => axios.post<Blob>("/api/export_factor_tests", model),
     exportLiftChart: (model: ModelNbBins) => axios.post<Blob>("/api/export_lift_chart", model),
     exportOneWay: (model: ModelVariablePoint) => axios.post<Blob>("/api/export_one_way", model),
     getVariableLevelStats: (data: ModelPoint) => axios.post<VariableLevelStatsPoint[]>("/api/get_variable_level_stats", data),
@@ -100,6 +100,50 @@ export type ModelMetricsDataPoint = {
     Deviance: number;
 }
 
+export type AliasedColumn = {
+    column: string;
+    equation: string;
+}
+
+export type CoefficientPath = {
+    penalty: number[];
+    selectedPenalty: number | null;
+    aic: (number | null)[];
+    deviance: number[];
+    coefficients: Array<{
+        variable: string;
+        values: number[];
+    }>;
+}
+
+export type CandidateScreeningPoint = {
+    variable: string;
+    df: number;
+    score_statistic: number;
+    p_value: number;
+    deviance_reduction: number;
+}
+
+export type InteractionDetectionPoint = {
+    first: string;
+    second: string;
+    df: number;
+    score_statistic: number;
+    p_value: number;
+    deviance_reduction: number;
+    min_cell_exposure: number;
+    empty_cells: number;
+}
+
+export type FactorTestPoint = {
+    variable: string;
+    df: number;
+    deviance_change: number;
+    lr_statistic: number;
+    p_value: number;
+    aic_change: number;
+}
+
 export type ModelMetrics = {
     [models: string]: ModelMetricsDataPoint;
 }
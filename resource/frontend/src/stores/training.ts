@@ -31,6 +31,8 @@ export const useTrainingStore = defineStore("TrainingStore", {
         chartData: [],  
         selectedElasticNetPenalty: 0 as number,
         selectedL1Ratio: 0 as number,
+        loadedModelId: null as string | null,
+        warmStart: false as boolean,
         previousInteractions: [] as Array<{first: string, second: string}>, 
         distributionOptions: [
             'Gamma',
@@ -249,6 +251,7 @@ export const useTrainingStore = defineStore("TrainingStore", {
                     const response = await API.getDatasetColumns({dataset: analysisStore.selectedMlTask.trainSet, exposure: analysisStore.selectedMlTask.exposureColumn});
 
                     const model = store.models.filter((v: ModelPoint) => v.name == model_value)[0];
+                    this.loadedModelId = model.id;
 
                     const paramsResponse = await API.getLatestMLTaskParams(model)  as APIResponse;
 
@@ -365,7 +368,8 @@ export const useTrainingStore = defineStore("TrainingStore", {
             l1_ratio: this.selectedL1Ratio,
             theta: this.selectedTheta,
             power: this.selectedPower,
-            variance_power: this.selectedVariancePower
+            variance_power: this.selectedVariancePower,
+            warm_start_model_id: this.warmStart ? this.loadedModelId : null
         };
 
         // Reduce function to construct Variables object    
@@ -1,7 +1,7 @@
 import { defineStore } from "pinia";
 import { API } from "../Api";
 import { useNotification } from "../composables/use-notification";
-import type { ModelPoint, VariableLevelStatsPoint } from '../models';
+import type { ModelPoint, VariableLevelStatsPoint, CandidateScreeningPoint, InteractionDetectionPoint, FactorTestPoint } from '../models';
 import type { QTableColumn } from 'quasar';
 import { useModelStore } from "./webapp";
 import { WT1iser } from '../utilities/utils';
@@ -18,11 +18,48 @@ const VARIABLE_STATS_COLUMNS: QTableColumn[] = [
     { name: 'weight_pct', align: 'right', label: 'Weight %', field: 'weight_pct', sortable: true, format: (val) => `${val}%`},
 ];
 
+const CANDIDATE_SCREENING_COLUMNS: QTableColumn[] = [
+    { name: 'variable', align: 'left', label: 'Candidate Variable', field: 'variable', sortable: true },
+    { name: 'df', align: 'right', label: 'Degrees of Freedom', field: 'df', sortable: true },
+    { name: 'score_statistic', align: 'right', label: 'Score Statistic', field: 'score_statistic', sortable: true },
+    { name: 'p_value', align: 'right', label: 'P-value', field: 'p_value', sortable: true },
+    { name: 'deviance_reduction', align: 'right', label: 'Approx. Deviance Reduction', field: 'deviance_reduction', sortable: true },
+];
+
+const INTERACTION_DETECTION_COLUMNS: QTableColumn[] = [
+    { name: 'first', align: 'left', label: 'First Variable', field: 'first', sortable: true },
+    { name: 'second', align: 'left', label: 'Second Variable', field: 'second', sortable: true },
+    { name: 'df', align: 'right', label: 'Degrees of Freedom', field: 'df', sortable: true },
+    { name: 'p_value', align: 'right', label: 'P-value', field: 'p_value', sortable: true },
+    { name: 'deviance_reduction', align: 'right', label: 'Approx. Deviance Reduction', field: 'deviance_reduction', sortable: true },
+    { name: 'min_cell_exposure', align: 'right', label: 'Min Cell Exposure', field: 'min_cell_exposure', sortable: true },
+    { name: 'empty_cells', align: 'right', label: 'Empty Cells', field: 'empty_cells', sortable: true },
+];
+
+const FACTOR_TEST_COLUMNS: QTableColumn[] = [
+    { name: 'variable', align: 'left', label: 'Factor', field: 'variable', sortable: true },
+    { name: 'df', align: 'right', label: 'Degrees of Freedom', field: 'df', sortable: true },
+    { name: 'deviance_change', align: 'right', label: 'Deviance Change', field: 'deviance_change', sortable: true },
+    { name: 'lr_statistic', align: 'right', label: 'LR Statistic', field: 'lr_statistic', sortable: true },
+    { name: 'p_value', align: 'right', label: 'P-value', field: 'p_value', sortable: true },
+    { name: 'aic_change', align: 'right', label: 'AIC Change', field: 'aic_change', sortable: true },
+];
+
 export const useVariableLevelStatsStore = defineStore("variableLevelStats", {
     state: () => ({
         modelStats: [] as VariableLevelStatsPoint[],
         columns: VARIABLE_STATS_COLUMNS,
+        candidateScreening: [] as CandidateScreeningPoint[],
+        candidateScreeningColumns: CANDIDATE_SCREENING_COLUMNS,
+        interactionDetection: [] as InteractionDetectionPoint[],
+        interactionDetectionColumns: INTERACTION_DETECTION_COLUMNS,
+        factorTests: [] as FactorTestPoint[],
+        factorTestColumns: FACTOR_TEST_COLUMNS,
         isLoading: false,
+        // the analyses below refit or score the model, so they are only run on demand
+        isCandidateScreeningLoading: false,
+        isInteractionDetectionLoading: false,
+        isFactorTestsLoading: false,
     }),
 
     actions: {
@@ -34,6 +71,9 @@ export const useVariableLevelStatsStore = defineStore("variableLevelStats", {
         },
 
         async fetchStatsForModel(modelName: string) {
+            this.candidateScreening = [];
+            this.interactionDetection = [];
+            this.factorTests = [];
             if (!modelName) {
                 this.modelStats = [];
                 return;
@@ -65,6 +105,69 @@ export const useVariableLevelStatsStore = defineStore("variableLevelStats", {
             }
         },
 
+        _isActiveModel(model: ModelPoint): boolean {
+            return useModelStore().activeModel?.name === model.name;
+        },
+
+        async fetchCandidateScreening(model: ModelPoint) {
+            this.isCandidateScreeningLoading = true;
+            try {
+                const response = await API.getCandidateScreening(model);
+                // another model may have been selected in the meantime
+                if (!this._isActiveModel(model)) return;
+                this.candidateScreening = response.data.map((point: any) => ({
+                    ...point,
+                    score_statistic: this._round(point.score_statistic),
+                    p_value: this._formatPValue(point.p_value),
+                    deviance_reduction: this._round(point.deviance_reduction),
+                }));
+            } catch (err) {
+                this.handleError(err);
+                this.candidateScreening = [];
+            } finally {
+                this.isCandidateScreeningLoading = false;
+            }
+        },
+
+        async fetchInteractionDetection(model: ModelPoint) {
+            this.isInteractionDetectionLoading = true;
+            try {
+                const response = await API.getInteractionDetection(model);
+                if (!this._isActiveModel(model)) return;
+                this.interactionDetection = response.data.map((point: any) => ({
+                    ...point,
+                    p_value: this._formatPValue(point.p_value),
+                    deviance_reduction: this._round(point.deviance_reduction),
+                    min_cell_exposure: this._round(point.min_cell_exposure),
+                }));
+            } catch (err) {
+                this.handleError(err);
+                this.interactionDetection = [];
+            } finally {
+                this.isInteractionDetectionLoading = false;
+            }
+        },
+
+        async fetchFactorTests(model: ModelPoint) {
+            this.isFactorTestsLoading = true;
+            try {
+                const response = await API.getFactorTests(model);
+                if (!this._isActiveModel(model)) return;
+                this.factorTests = response.data.map((point: any) => ({
+                    ...point,
+                    deviance_change: this._round(point.deviance_change),
+                    lr_statistic: this._round(point.lr_statistic),
+                    p_value: this._formatPValue(point.p_value),
+                    aic_change: this._round(point.aic_change),
+                }));
+            } catch (err) {
+                this.handleError(err);
+                this.factorTests = [];
+            } finally {
+                this.isFactorTestsLoading = false;
+            }
+        },
+
         async exportVariableLevelStats() {
             const store = useModelStore();
             if (!store.activeModel) {
@@ -80,6 +183,20 @@ export const useVariableLevelStatsStore = defineStore("variableLevelStats", {
             }
         },
 
+        async exportFactorTests() {
+            const store = useModelStore();
+            if (!store.activeModel) {
+                this.notifyError("No model selected to export.");
+                return;
+            }
+            try {
+                const response = await API.exportFactorTests(store.activeModel);
+                this._triggerDownload(response.data, `factor_tests_${store.activeModel.name}.csv`);
+            } catch (error) {
+                this.handleError(error);
+            }
+        },
+
         _triggerDownload(data: any, filename: string) {
             const url = window.URL.createObjectURL(new Blob([data], { type: 'text/csv' }));
             const link = document.createElement('a');
@@ -1,7 +1,7 @@
 import { defineStore } from "pinia";
 import { API } from "../Api";
 import { useNotification } from "../composables/use-notification";
-import type { ModelPoint, ModelMetricsDataPoint, BaseValue, RelativityPoint, ModelInfo } from '../models';
+import type { ModelPoint, ModelMetricsDataPoint, BaseValue, RelativityPoint, ModelInfo, CoefficientPath, AliasedColumn } from '../models';
 import { useAnalysisStore } from "./analysisStore";
 import { WT1iser } from '../utilities/utils';
 
@@ -16,6 +16,8 @@ export const useModelStore = defineStore("ModelStore", {
 
         modelMetrics1: {} as ModelMetricsDataPoint,
         modelMetrics2: {} as ModelMetricsDataPoint,
+        coefficientPath1: null as CoefficientPath | null,
+        aliasedColumns1: [] as AliasedColumn[],
         baseValues1: [] as BaseValue[],
         baseValues2: [] as BaseValue[],
 
@@ -77,12 +79,16 @@ export const useModelStore = defineStore("ModelStore", {
             this.isLoading = true;
             try {
                 // Fetch only the data directly related to this model.
-                const [baseResponse, metricsResponse] = await Promise.all([
+                const [baseResponse, metricsResponse, pathResponse, aliasingResponse] = await Promise.all([
                     API.getBaseValues(model),
-                    API.getModelMetrics(model)
+                    API.getModelMetrics(model),
+                    API.getCoefficientPath(model),
+                    API.getAliasing(model)
                 ]);
                 this.baseValues1 = baseResponse.data;
                 this.modelMetrics1 = metricsResponse.data;
+                this.coefficientPath1 = pathResponse.data;
+                this.aliasedColumns1 = aliasingResponse.data;
                 const relativityResponse = await API.getRelativities(model);
                 this.relativitiesData = relativityResponse?.data;
             } catch (err) {
@@ -0,0 +1,76 @@
+"""
+Benchmark of the interaction column builder against the previous
+implementation, which appended every product column with np.append
+
+Run from the repository root:
+    PYTHONPATH=python-lib python tests/python/benchmarks/benchmark_interactions.py --rows 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from generalized_linear_models.interactions import Interactions
+
+
+def legacy_transform(X, first_indices, second_indices):
+    for fi, si in zip(first_indices, second_indices):
+        new_column = np.reshape(X[:, fi] * X[:, si], (-1, 1))
+        X = np.append(X, new_column, axis=1)
+    return X
+
+
+def make_design(n_rows, first_levels, second_levels, seed=0):
+    """
+    dummy-encoded design of two factors, as produced by the DSS preprocessing
+    """
+    rng = np.random.default_rng(seed)
+    first_codes = rng.integers(0, first_levels + 1, n_rows)
+    second_codes = rng.integers(0, second_levels + 1, n_rows)
+    X = np.zeros((n_rows, first_levels + second_levels))
+    rows = np.arange(n_rows)
+    has_first = first_codes > 0
+    has_second = second_codes > 0
+    X[rows[has_first], first_codes[has_first] - 1] = 1
+    X[rows[has_second], first_levels + second_codes[has_second] - 1] = 1
+    labels = [f'dummy:first:{level}' for level in range(1, first_levels + 1)]
+    labels += [f'dummy:second:{level}' for level in range(1, second_levels + 1)]
+    return X, labels
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--first-levels', type=int, default=25)
+    parser.add_argument('--second-levels', type=int, default=20)
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    X, labels = make_design(args.rows, args.first_levels, args.second_levels)
+    interactions = Interactions(['first'], ['second'])
+    first_indices, second_indices, _ = interactions.get_index_pairs(labels)
+    print(f'{args.rows} rows, {X.shape[1]} columns, {len(first_indices)} interaction columns, '
+          f'design {X.nbytes / 1e6:.0f} MB')
+
+    result, elapsed, peak = measure(interactions.transform, X, list(labels))
+    print(f'preallocated builder: {elapsed:8.2f} s, peak {peak / 1e6:8.0f} MB')
+
+    if not args.skip_legacy:
+        legacy_result, legacy_elapsed, legacy_peak = measure(legacy_transform, X, first_indices, second_indices)
+        print(f'np.append loop:       {legacy_elapsed:8.2f} s, peak {legacy_peak / 1e6:8.0f} MB')
+        assert np.array_equal(result, legacy_result)
+        print(f'speed-up x{legacy_elapsed / elapsed:.1f}, peak memory x{legacy_peak / peak:.1f}')
+
+
+if __name__ == '__main__':
+    main()
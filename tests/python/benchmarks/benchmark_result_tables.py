@@ -0,0 +1,94 @@
+"""
+Benchmark of the columnar builders of the relativity and one-way tables
+against the previous implementation, which grew the DataFrames row by row
+or frame by frame with DataFrame.append
+
+Run from the repository root:
+    PYTHONPATH=python-lib python tests/python/benchmarks/benchmark_result_tables.py --levels 3000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from glm_handler.dku_relativites_calculator import RelativitiesCalculator
+from glm_handler.glm_data_handler import GlmDataHandler
+
+
+def legacy_relativities_df(relativities):
+    rel_df = pd.DataFrame(columns=['feature', 'value', 'relativity'])
+    for feature, values in relativities.items():
+        for value, relativity in values.items():
+            row = pd.DataFrame([{'feature': feature, 'value': value, 'relativity': relativity}])
+            rel_df = pd.concat([rel_df, row], ignore_index=True)
+    return rel_df
+
+
+def legacy_final_dataframe(predicted_base):
+    predicted_base_df = pd.DataFrame(columns=['feature', 'category', 'target', 'predicted', 'exposure', 'base'])
+    for feature, df in predicted_base.items():
+        df.columns = ['category', 'target', 'predicted', 'exposure', 'base']
+        df['feature'] = feature
+        predicted_base_df = pd.concat([predicted_base_df, df])
+    return predicted_base_df
+
+
+def make_relativities(n_levels, n_features, seed=0):
+    """
+    relativities of a factor with n_levels levels and of small factors
+    """
+    rng = np.random.default_rng(seed)
+    relativities = {'base': {'base': 0.1}}
+    relativities['postcode'] = dict(zip([f'PC{level:05d}' for level in range(n_levels)], rng.lognormal(0, 0.2, n_levels)))
+    for feature in range(n_features):
+        relativities[f'factor_{feature}'] = dict(zip(range(10), rng.lognormal(0, 0.2, 10)))
+    return relativities
+
+
+def make_predicted_base(relativities):
+    """
+    one-way aggregates of every feature, one frame per feature
+    """
+    predicted_base = {}
+    for feature, values in relativities.items():
+        n_levels = len(values)
+        predicted_base[feature] = pd.DataFrame({'level': list(values.keys()), 'target': np.ones(n_levels),
+                                                'predicted': np.ones(n_levels), 'weight': np.ones(n_levels),
+                                                'base': list(values.values())})
+    return predicted_base
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--levels', type=int, default=3000)
+    parser.add_argument('--features', type=int, default=30)
+    args = parser.parse_args()
+
+    relativities = make_relativities(args.levels, args.features)
+    print(f'{sum(len(values) for values in relativities.values())} relativities, '
+          f'largest factor with {args.levels} levels')
+
+    calculator = RelativitiesCalculator.__new__(RelativitiesCalculator)
+    calculator.relativities = relativities
+    result, elapsed = measure(calculator.construct_relativities_df)
+    legacy_result, legacy_elapsed = measure(legacy_relativities_df, relativities)
+    assert np.allclose(result['relativity'], legacy_result['relativity'].astype(float))
+    print(f'relativities     columnar {elapsed:8.3f} s, append loop {legacy_elapsed:8.3f} s, '
+          f'speed-up x{legacy_elapsed / elapsed:.0f}')
+
+    handler = GlmDataHandler()
+    result, elapsed = measure(handler.construct_final_dataframe, make_predicted_base(relativities))
+    legacy_result, legacy_elapsed = measure(legacy_final_dataframe, make_predicted_base(relativities))
+    assert np.allclose(result['base'], legacy_result['base'].astype(float))
+    print(f'one-way tables   columnar {elapsed:8.3f} s, append loop {legacy_elapsed:8.3f} s, '
+          f'speed-up x{legacy_elapsed / elapsed:.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_almost_equal
+from generalized_linear_models import dku_glm
+from generalized_linear_models.aliasing import accumulate_gram, find_aliased_columns, format_aliasing
+from generalized_linear_models.design_plan import DesignPlan
+from testing_utils import get_rating_model
+
+# every level of area has a dummy, so the last one is aliased with the intercept
+LABELS = ['dummy:area:a', 'dummy:area:b', 'dummy:area:c', 'age', 'exposure']
+
+
+def get_data(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    area = rng.integers(0, 3, n)
+    X = np.column_stack([area == 0, area == 1, area == 2, rng.uniform(18, 80, n), rng.uniform(0.1, 1, n)]).astype(float)
+    y = rng.poisson(X[:, 4] * np.exp(-1 + 0.2 * X[:, 1] + 0.01 * X[:, 3])).astype(float)
+    return X, y
+
+
+def test_find_aliased_columns():
+    X, _ = get_data()
+    design = np.column_stack([X[:, :4], 2 * X[:, 3] - X[:, 0], np.zeros(len(X))])
+    aliased = find_aliased_columns(accumulate_gram([(design, None)]), ['a', 'b', 'c', 'age', 'age2', 'zero'])
+    assert [column['column'] for column in aliased] == ['c', 'age2', 'zero']
+    assert format_aliasing(aliased) == 'c = intercept - a - b; age2 = -a + 2 * age; zero = 0'
+
+
+def test_aliased_columns_fail_the_fit():
+    X, y = get_data()
+    with pytest.raises(ValueError, match='dummy:area:c = intercept - dummy:area:a - dummy:area:b'):
+        get_rating_model(LABELS).fit(X, y)
+
+
+def test_drop_aliased_columns():
+    X, y = get_data()
+    model = get_rating_model(LABELS, drop_aliased=True, first=['area'], second=['age'])
+    model.fit(X, y)
+    # the interaction of the aliased dummy is aliased with age and the other interactions
+    assert [column['column'] for column in model.aliased_columns] == ['dummy:area:c', 'interaction:area::c:age']
+    assert model.coef_[2] == 0
+    assert 'dummy:area:c' not in model.final_labels
+    assert 'interaction:area::c:age' not in model.final_labels
+    assert model.get_aliasing()[0] == {'column': 'dummy:area:c',
+                                       'equation': 'dummy:area:c = intercept - dummy:area:a - dummy:area:b'}
+
+    kept = [0, 1, 3, 4]
+    reference = get_rating_model([LABELS[i] for i in kept], first=['area'], second=['age'])
+    reference.fit(X[:, kept], y)
+    assert_almost_equal(model.predict(X), reference.predict(X[:, kept]))
+    assert reference.get_aliasing() == []
+
+
+def test_drop_aliased_columns_chunked():
+    X, y = get_data(seed=1)
+
+    def get_chunks():
+        for start in range(0, len(y), 1000):
+            yield X[start:start + 1000], y[start:start + 1000]
+
+    model = get_rating_model(LABELS, drop_aliased=True)
+    model.fit_chunks(get_chunks)
+    assert model.coef_[2] == 0
+    in_memory = get_rating_model(LABELS, drop_aliased=True)
+    in_memory.fit(X, y)
+    assert_almost_equal(model.predict(X), in_memory.predict(X), decimal=4)
+
+
+@pytest.mark.parametrize('params', [{'compress_design': True}, {'sparse_design': True}])
+def test_aliasing_check_uses_the_fitted_design(params, monkeypatch):
+    X, y = get_data(seed=2)
+    # few distinct rows so that the design compresses
+    X[:, 3] = np.round(X[:, 3] / 10)
+    X[:, 4] = np.round(X[:, 4], 1)
+    transformed_rows = []
+    transform = DesignPlan.transform
+
+    def record_transform(design_plan, X, *args, **kwargs):
+        transformed_rows.append(len(X))
+        return transform(design_plan, X, *args, **kwargs)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('the row-level Gram matrix should not be computed')
+
+    monkeypatch.setattr(DesignPlan, 'transform', record_transform)
+    monkeypatch.setattr(dku_glm, 'compute_gram', fail)
+    model = get_rating_model(LABELS, drop_aliased=True, first=['area'], second=['age'], **params)
+    model.fit(X, y)
+
+    assert [column['column'] for column in model.aliased_columns] == ['dummy:area:c', 'interaction:area::c:age']
+    # the dense design of the rows is never built
+    assert all(n_rows < len(X) for n_rows in transformed_rows)
+
+    monkeypatch.undo()
+    reference = get_rating_model(LABELS, drop_aliased=True, first=['area'], second=['age'])
+    reference.fit(X, y)
+    assert_almost_equal(model.predict(X), reference.predict(X), decimal=5)
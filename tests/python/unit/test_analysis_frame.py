@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from glm_handler.analysis_frame import as_model_input, build_analysis_frame
+from glm_handler.one_way_cube import OneWayCube
+
+FEATURES = {'area': {'type': 'CATEGORY', 'role': 'INPUT'},
+            'postcode': {'type': 'CATEGORY', 'role': 'REJECT'},
+            'age': {'type': 'NUMERIC', 'role': 'INPUT'},
+            'exposure': {'type': 'NUMERIC', 'role': 'INPUT'},
+            'claims': {'type': 'NUMERIC', 'role': 'TARGET'}}
+
+
+def get_dataset(n=10000, seed=0):
+    rng = np.random.default_rng(seed)
+    dataset = pd.DataFrame({'area': rng.choice(['a', 'b', 'c'], n),
+                            'postcode': rng.choice([f'PC{level:03d}' for level in range(300)], n).astype(object),
+                            'age': rng.integers(18, 90, n),
+                            'exposure': rng.uniform(0.1, 1, n),
+                            'claims': rng.poisson(0.1, n),
+                            'comment': ['free text that is not analysed'] * n})
+    dataset.loc[:5, 'postcode'] = np.nan
+    return dataset
+
+
+def get_frame(dataset):
+    predicted = 0.1 * dataset['exposure'].to_numpy()
+    measures = {'predicted': predicted, 'weight': dataset['exposure'], 'weighted_target': dataset['claims'],
+                'weighted_predicted': predicted, 'huge': np.full(len(dataset), 1e300)}
+    return build_analysis_frame(dataset, FEATURES, measures, float32_measures=['predicted', 'huge'])
+
+
+def test_compact_frame():
+    dataset = get_dataset()
+    frame = get_frame(dataset)
+    assert 'comment' not in frame.columns
+    assert isinstance(frame['area'].dtype, pd.CategoricalDtype)
+    assert isinstance(frame['postcode'].dtype, pd.CategoricalDtype)
+    # features fed to the model keep their dtype, as do the summed measures, the
+    # plotted ones being stored in float32 when it is safe
+    assert frame['exposure'].dtype == np.float64
+    assert frame['weight'].dtype == np.float64
+    assert frame['weighted_target'].dtype == np.float64
+    assert frame['predicted'].dtype == np.float32
+    assert frame['huge'].dtype == np.float64
+    assert frame.memory_usage(deep=True).sum() < dataset.memory_usage(deep=True).sum() / 3
+
+    assert_frame_equal(as_model_input(frame)[list(FEATURES)], dataset[list(FEATURES)], check_dtype=False)
+    assert as_model_input(frame)['postcode'].dtype == object
+
+
+def test_one_way_cube_on_analysis_frame():
+    dataset = get_dataset()
+    frame = get_frame(dataset)
+    cube = OneWayCube(frame, frame, {'area': 'CATEGORY', 'postcode': 'CATEGORY'}, {'area': 'a', 'postcode': 'PC000'})
+    one_way = cube.get_one_way('postcode')
+    train_one_way = one_way[one_way['dataset'] == 'train']
+    assert len(train_one_way) == 100
+    np.testing.assert_allclose(train_one_way['Value'].sum(), dataset['exposure'][dataset['postcode'].notna()].sum(),
+                               rtol=1e-12)
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+from glm_handler.columnar_accumulator import ColumnarAccumulator
+
+
+def test_accumulated_frame():
+    accumulator = ColumnarAccumulator(['feature', 'value', 'relativity'])
+    accumulator.add_columns(feature='area', value=['a', 'b'], relativity=np.array([1.0, 1.2]))
+    accumulator.add_row(feature='age', value=40, relativity=1)
+    accumulator.add_frame(pd.DataFrame({'relativity': [0.9], 'value': [2.5], 'feature': ['power'], 'other': [0]}))
+    frame = accumulator.to_frame()
+
+    assert len(accumulator) == 4
+    assert list(frame.columns) == ['feature', 'value', 'relativity']
+    assert list(frame['feature']) == ['area', 'area', 'age', 'power']
+    # mixed values keep their types, numeric columns stay numeric
+    assert list(frame['value']) == ['a', 'b', 40, 2.5]
+    assert isinstance(frame['value'].iloc[2], int)
+    assert frame['relativity'].dtype == np.float64
+
+
+def test_invalid_blocks():
+    accumulator = ColumnarAccumulator(['feature', 'value'])
+    with pytest.raises(ValueError, match='Missing columns'):
+        accumulator.add_columns(feature='area')
+    with pytest.raises(ValueError, match='different lengths'):
+        accumulator.add_columns(feature=['area'], value=['a', 'b'])
+    assert len(accumulator.to_frame()) == 0
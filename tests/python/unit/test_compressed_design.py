@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_almost_equal
+from generalized_linear_models.compression import CompressedDesign
+from testing_utils import RATING_FAMILIES, get_rating_family_data, get_rating_model
+
+
+def test_compressed_design_cells():
+    X = np.array([[1., 0.], [1., 0.], [0., 1.], [1., 0.]])
+    y = np.array([1., 2., 3., 6.])
+    weights = np.array([1., 1., 2., 2.])
+    offset = np.array([0., 0., 0., 1.])
+    design = CompressedDesign(X, y, weights, offset)
+
+    assert design.n_cells == 3
+    assert_almost_equal(design.sample_weight.sum(), weights.sum())
+    assert_almost_equal(np.bincount(design.inverse, weights=weights * y), design.sample_weight * design.y)
+    assert_almost_equal(design.expand(design.X), X)
+    assert_almost_equal(design.expand(design.offset), offset)
+
+
+@pytest.mark.parametrize('family_name', ['poisson', 'gamma', 'binomial'])
+def test_compressed_fit(family_name):
+    X, y, labels = get_rating_family_data(family_name, n=4000, discrete=True)
+    weights = np.random.default_rng(0).uniform(0.5, 2, len(y))
+    full = get_rating_model(labels, **RATING_FAMILIES[family_name])
+    full.fit(X, y, weights)
+    compressed = get_rating_model(labels, compress_design=True, **RATING_FAMILIES[family_name])
+    compressed.fit(X, y, weights)
+
+    assert_almost_equal(compressed.intercept_, full.intercept_, decimal=10)
+    assert_almost_equal(compressed.coef_, full.coef_, decimal=10)
+    assert_almost_equal(compressed.aic_value, full.aic_value)
+    assert_almost_equal(compressed.bic_value, full.bic_value)
+    assert_almost_equal(compressed.deviance_value, full.deviance_value)
+    assert_almost_equal(compressed.coef_table.values, full.coef_table.values, decimal=8)
+    assert_almost_equal(compressed.predict(X), full.predict(X), decimal=10)
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+from testing_utils import RATING_FAMILIES, get_rating_family_data, get_rating_model
+
+
+@pytest.mark.parametrize('family_name, first, second', [('poisson', ['area'], ['age']), ('binomial', [], [])])
+def test_covariance_matches_glum(family_name, first, second):
+    X, y, labels = get_rating_family_data(family_name, n=2000)
+    weights = np.random.default_rng(0).uniform(0.5, 2, len(y))
+    model = get_rating_model(labels, first, second, **RATING_FAMILIES[family_name])
+    model.fit(X, y, weights)
+
+    X_design = model.design_plan.transform(X)
+    offset = np.log(X[:, 4]) if 'exposure' in labels else None
+    expected = model.fitted_model.covariance_matrix(X_design, y, offset=offset, sample_weight=weights)
+    assert_allclose(model.fitted_model.covariance_matrix_, expected, rtol=1e-8)
@@ -0,0 +1,55 @@
+import numpy as np
+from numpy.testing import assert_almost_equal
+from generalized_linear_models.cross_validation import get_fold_ids
+from testing_utils import get_rating_model
+
+
+def get_data(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.round(rng.normal(size=(n, 5)))
+    exposure = rng.choice([0.25, 0.5, 1.0], n)
+    y = rng.poisson(exposure * np.exp(0.3 * X[:, 0] - 0.2 * X[:, 1])).astype(float)
+    X = np.column_stack([X, exposure])
+    labels = ['x' + str(i) for i in range(5)] + ['exposure']
+    return X, y, labels
+
+
+def get_model(labels, **params):
+    return get_rating_model(labels, penalty=[0.0001, 0.001, 0.01, 0.1], l1_ratio=0.5, cv_folds=3, **params)
+
+
+def test_fold_ids():
+    fold_ids = get_fold_ids(1000, 4, seed=3)
+    assert np.array_equal(fold_ids, get_fold_ids(1000, 4, seed=3))
+    assert not np.array_equal(fold_ids, get_fold_ids(1000, 4, seed=4))
+    assert np.bincount(fold_ids).tolist() == [250, 250, 250, 250]
+
+
+def test_cross_validation_parallel_matches_serial():
+    X, y, labels = get_data()
+    serial = get_model(labels, n_jobs=1)
+    serial.fit(X, y)
+    parallel = get_model(labels, n_jobs=2)
+    parallel.fit(X, y)
+
+    assert_almost_equal(parallel.cv_statistics['fold_deviance'], serial.cv_statistics['fold_deviance'])
+    assert parallel.selected_penalty == serial.selected_penalty
+    assert_almost_equal(parallel.coef_, serial.coef_)
+
+
+def test_cross_validation_refit_on_selected_penalty():
+    X, y, labels = get_data()
+    weights = np.random.default_rng(1).uniform(0.5, 2, len(y))
+    model = get_model(labels, n_jobs=1)
+    model.fit(X, y, weights)
+    deviances = model.cv_statistics['deviance']
+    assert model.selected_penalty == model.cv_statistics['penalty'][int(np.argmin(deviances))]
+    assert_almost_equal(deviances, np.sum(model.cv_statistics['fold_deviance'], axis=0))
+
+    refit = get_rating_model(labels, penalty=model.selected_penalty, l1_ratio=0.5)
+    refit.fit(X, y, weights)
+    assert_almost_equal(model.coef_, refit.coef_)
+
+    compressed = get_model(labels, n_jobs=1, compress_design=True)
+    compressed.fit(X, y, weights)
+    assert_almost_equal(compressed.cv_statistics['fold_deviance'], model.cv_statistics['fold_deviance'], decimal=4)
@@ -0,0 +1,63 @@
+import pickle
+import numpy as np
+import pytest
+from numpy.testing import assert_almost_equal
+from generalized_linear_models.interactions import Interactions
+from testing_utils import get_rating_model
+
+
+def get_data(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    area = rng.integers(0, 3, n)
+    X = np.column_stack([area == 1, area == 2, np.zeros(n), rng.uniform(18, 80, n),
+                         rng.uniform(0.1, 1, n), rng.normal(size=n)]).astype(float)
+    labels = ['dummy:area:1', 'dummy:area:2', 'dummy:area:N/A', 'age', 'exposure', 'offset']
+    y = rng.poisson(X[:, 4] * np.exp(0.2 * X[:, 0] + 0.01 * X[:, 3])).astype(float)
+    return X, y, labels
+
+
+def get_model(labels):
+    return get_rating_model(labels, ['area'], ['age'], offset_columns=['offset'])
+
+
+def test_design_plan_matches_label_processing():
+    X, y, labels = get_data()
+    model = get_model(labels)
+    model.fit(X, y)
+    plan = model.design_plan
+
+    assert plan.offset_indices.tolist() == [5]
+    assert plan.exposure_indices.tolist() == [4]
+    assert plan.removed_indices.tolist() == [2, 4, 5]
+    assert list(plan.labels) == ['dummy:area:1', 'dummy:area:2', 'age',
+                                 'interaction:area::1:age', 'interaction:area::2:age']
+
+    legacy_labels = [labels[i] for i in plan.kept_indices]
+    legacy_design = Interactions(['area'], ['age']).transform(X[:, plan.kept_indices], legacy_labels)
+    assert legacy_labels == list(plan.labels)
+    assert_almost_equal(plan.transform(X), legacy_design)
+    assert len(model.coef_) == len(labels) + plan.n_interactions
+
+
+def test_design_plan_predictions():
+    X, y, labels = get_data()
+    model = get_model(labels)
+    model.fit(X, y)
+    predictions = model.predict(X)
+
+    legacy_model = pickle.loads(pickle.dumps(model))
+    legacy_model.design_plan = None
+    assert_almost_equal(legacy_model.predict(X), predictions)
+
+    restored_model = pickle.loads(pickle.dumps(model))
+    assert_almost_equal(restored_model.predict(X), predictions)
+
+
+def test_design_plan_is_immutable():
+    X, y, labels = get_data()
+    model = get_model(labels)
+    model.fit(X, y)
+    with pytest.raises(AttributeError):
+        model.design_plan.labels = ()
+    with pytest.raises(ValueError):
+        model.design_plan.kept_indices[0] = 1
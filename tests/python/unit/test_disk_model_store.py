@@ -0,0 +1,91 @@
+import os
+import pickle
+import stat
+
+import numpy as np
+import pandas as pd
+import pytest
+from model_cache.disk_model_store import DiskModelStore, OBJECT_FILE
+
+
+def make_analysis_frame(n_rows=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'area': pd.Categorical(rng.choice(['A', 'B', 'C'], n_rows)),
+                         'age': rng.integers(18, 80, n_rows),
+                         'vehicle': rng.choice(['car', 'van'], n_rows).astype(object),
+                         'weight': rng.uniform(0, 1, n_rows).astype(np.float32)},
+                        index=pd.RangeIndex(10, 10 + n_rows))
+
+
+def test_frame_round_trip(tmp_path):
+    store = DiskModelStore(str(tmp_path))
+    frame = make_analysis_frame()
+    assert store.load('A-PROJECT-1-2-s1-pp1-m1', ('start', 'end'), 'train_set') == (False, None)
+    store.save('A-PROJECT-1-2-s1-pp1-m1', ('start', 'end'), 'train_set', frame)
+    found, loaded = store.load('A-PROJECT-1-2-s1-pp1-m1', ('start', 'end'), 'train_set')
+
+    assert found
+    pd.testing.assert_frame_equal(loaded, frame)
+    # numerical columns are memory-mapped, and can still be written in memory
+    assert isinstance(loaded['weight'].to_numpy().base, np.memmap)
+    loaded['age'] += 1
+    pd.testing.assert_frame_equal(store.load('A-PROJECT-1-2-s1-pp1-m1', ('start', 'end'), 'train_set')[1], frame)
+
+
+def test_objects_and_retrained_models(tmp_path):
+    store = DiskModelStore(str(tmp_path))
+    relativities = {'relativities': make_analysis_frame(10), 'relativities_dict': {'area': {'A': 1.0, 'B': 1.2}}}
+    store.save('model_1', ('start', 'end'), 'relativities', relativities)
+    found, loaded = store.load('model_1', ('start', 'end'), 'relativities')
+    assert found and loaded['relativities_dict'] == relativities['relativities_dict']
+
+    # entries of the former training are removed when the retrained model saves
+    store.save('model_1', ('start_2', 'end_2'), 'relativities', relativities)
+    assert store.load('model_1', ('start', 'end'), 'relativities') == (False, None)
+    assert store.get_stats()['items'] == 1
+    store.remove_model('model_1')
+    assert store.get_stats()['items'] == 0
+
+
+def test_least_recently_used_cleanup(tmp_path):
+    frame = make_analysis_frame()
+    store = DiskModelStore(str(tmp_path))
+    store.save('model_1', ('start', 'end'), 'train_set', frame)
+    entry_size = store.get_stats()['used_bytes']
+
+    store.max_bytes = int(2.5 * entry_size)
+    store.save('model_1', ('start', 'end'), 'test_set', frame)
+    # marks the train set as used after the test set
+    path = store.get_entry_path('model_1', ('start', 'end'), 'test_set')
+    os.utime(path, (0, 0))
+    store.load('model_1', ('start', 'end'), 'train_set')
+    store.save('model_2', ('start', 'end'), 'train_set', frame)
+
+    assert store.load('model_1', ('start', 'end'), 'test_set') == (False, None)
+    assert store.load('model_1', ('start', 'end'), 'train_set')[0]
+    assert store.load('model_2', ('start', 'end'), 'train_set')[0]
+    assert store.get_stats()['used_bytes'] <= store.max_bytes
+
+
+def test_private_root(tmp_path):
+    store = DiskModelStore(str(tmp_path / 'cache'))
+    assert stat.S_IMODE(os.stat(store.root).st_mode) == 0o700
+
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError, match='writable by other users'):
+        DiskModelStore(str(shared))
+
+
+def test_tampered_objects_are_not_loaded(tmp_path):
+    store = DiskModelStore(str(tmp_path))
+    store.save('model_1', ('start', 'end'), 'relativities', {'area': {'A': 1.0}})
+    path = store.get_entry_path('model_1', ('start', 'end'), 'relativities')
+    with open(os.path.join(path, OBJECT_FILE), 'rb') as object_file:
+        content = object_file.read()
+    # a pickle planted with a signature of another key
+    with open(os.path.join(path, OBJECT_FILE), 'wb') as object_file:
+        object_file.write(content[:32] + pickle.dumps({'area': {'A': 2.0}}))
+    with pytest.raises(ValueError, match='not written by this store'):
+        store.load('model_1', ('start', 'end'), 'relativities')
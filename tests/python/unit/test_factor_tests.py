@@ -0,0 +1,65 @@
+import pytest
+from numpy.testing import assert_allclose
+from generalized_linear_models.factor_tests import drop_one_factor
+from testing_utils import RATING_LABELS, get_rating_data, get_rating_model
+
+def get_deviance(model, X, y):
+    return model.fitted_model.family_instance.deviance(y, model.predict(X))
+
+
+def test_drop_one_factor_matches_refits():
+    X, y = get_rating_data(n=10000, discrete=True)
+    model = get_rating_model(RATING_LABELS, ['area'], ['fuel'])
+    model.fit(X, y)
+    tests = drop_one_factor(model, X, y, n_jobs=1).set_index('variable')
+
+    assert set(tests.index) == {'area', 'fuel', 'age', 'area * fuel'}
+    assert tests.loc['area', 'df'] == 2
+    assert tests.loc['area * fuel', 'df'] == 2
+    assert tests.loc['age', 'p_value'] < 1e-6
+
+    full_deviance = get_deviance(model, X, y)
+    without_age = [0, 1, 2, 4]
+    reduced = get_rating_model([RATING_LABELS[i] for i in without_age], ['area'], ['fuel'])
+    reduced.fit(X[:, without_age], y)
+    deviance_change = get_deviance(reduced, X[:, without_age], y) - full_deviance
+    assert_allclose(tests.loc['age', 'deviance_change'], deviance_change, rtol=1e-3)
+    assert_allclose(tests.loc['age', 'aic_change'], deviance_change - 2, rtol=1e-3)
+
+    without_interaction = get_rating_model(RATING_LABELS)
+    without_interaction.fit(X, y)
+    deviance_change = get_deviance(without_interaction, X, y) - full_deviance
+    assert_allclose(tests.loc['area * fuel', 'deviance_change'], deviance_change, rtol=1e-3, atol=1e-4)
+
+
+def test_drop_one_factor_in_parallel():
+    X, y = get_rating_data(n=3000, seed=1, discrete=True)
+    model = get_rating_model(RATING_LABELS)
+    model.fit(X, y)
+    serial = drop_one_factor(model, X, y, n_jobs=1)
+    parallel = drop_one_factor(model, X, y, n_jobs=2)
+    assert list(serial['variable']) == list(parallel['variable'])
+    assert_allclose(serial['lr_statistic'], parallel['lr_statistic'])
+
+
+@pytest.mark.parametrize('columns', [[0, 1, 2, 3, 4], [0, 1, 2, 4]])
+def test_drop_one_factor_on_the_model_design(columns):
+    # with age, the dense design of the rows is refitted, without it the cells of the dummy columns
+    X, y = get_rating_data(n=3000, seed=2, discrete=True)
+    X = X[:, columns]
+    labels = [RATING_LABELS[i] for i in columns]
+    dense = get_rating_model(labels, ['area'], ['fuel'])
+    dense.fit(X, y)
+    sparse = get_rating_model(labels, ['area'], ['fuel'], sparse_design=True)
+    sparse.fit(X, y)
+    dense_tests = drop_one_factor(dense, X, y, n_jobs=1).set_index('variable')
+    sparse_tests = drop_one_factor(sparse, X, y, n_jobs=2).set_index('variable').loc[dense_tests.index]
+    assert_allclose(sparse_tests['deviance_change'], dense_tests['deviance_change'], rtol=1e-3, atol=1e-4)
+
+
+def test_drop_one_factor_refuses_large_dense_designs():
+    X, y = get_rating_data(n=3000, discrete=True)
+    model = get_rating_model(RATING_LABELS)
+    model.fit(X, y)
+    with pytest.raises(ValueError, match='sparse design'):
+        drop_one_factor(model, X, y, n_jobs=1, max_design_bytes=1000)
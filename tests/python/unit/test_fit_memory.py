@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+resource = pytest.importorskip("resource")
+
+N_ROWS = 400000
+# a high-cardinality factor, stored as one-hot codes in the sparse design
+N_ROWS_SPARSE = 100000
+N_LEVELS_SPARSE = 500
+
+# fits a model in a fresh interpreter and reports the growth of the peak
+# resident set size during the fit, along with the sizes of the design and input matrices
+FIT_SCRIPT = textwrap.dedent("""
+    import json, resource, sys, warnings
+    import numpy as np
+    from generalized_linear_models.dku_glm import RegressionGLM
+
+    warnings.simplefilter('ignore')
+
+    def get_data(n, n_levels):
+        rng = np.random.default_rng(0)
+        area = rng.integers(0, n_levels, n)
+        # filled in place, so that the peak before the fit is the data itself
+        X = np.zeros((n, n_levels + 20))
+        rows = np.nonzero(area)[0]
+        X[rows, area[rows] - 1] = 1
+        X[:, n_levels - 1:-1] = rng.uniform(size=(n, 20))
+        X[:, -1] = rng.uniform(0.1, 1, n)
+        labels = [f'dummy:area:{level}' for level in range(1, n_levels)] + [f'x{i}' for i in range(20)] + ['exposure']
+        y = rng.poisson(X[:, -1]).astype(float)
+        return X, y, labels
+
+    def fit(X, y, labels, sparse_design):
+        model = RegressionGLM(penalty=0.0, l1_ratio=0.0, family_name='poisson', poisson_link='log',
+                              offset_mode='OFFSETS/EXPOSURES', exposure_columns=['exposure'],
+                              interaction_columns_first=['area'], interaction_columns_second=['x0'],
+                              column_labels=labels, sparse_design=sparse_design)
+        model.fit(X, y)
+        return model
+
+    # warm-up fit so that lazily loaded code is not accounted for
+    n_rows, n_levels, sparse_design = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3] == 'sparse'
+    fit(*get_data(2000, 20), sparse_design)
+    X, y, labels = get_data(n_rows, n_levels)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    model = fit(X, y, labels, sparse_design)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    design_bytes = X.shape[0] * len(model.final_labels) * 8
+    print(json.dumps({'peak_increase': (after - before) * 1024, 'design_bytes': design_bytes, 'input_bytes': X.nbytes}))
+""")
+
+
+def get_fit_memory(n_rows, n_levels, design):
+    env = dict(os.environ)
+    python_lib = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'python-lib')
+    env['PYTHONPATH'] = os.pathsep.join([os.path.abspath(python_lib), env.get('PYTHONPATH', '')])
+    output = subprocess.run([sys.executable, '-c', FIT_SCRIPT, str(n_rows), str(n_levels), design], env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="ru_maxrss is reported in kilobytes on Linux only")
+def test_fit_peak_memory():
+    memory = get_fit_memory(N_ROWS, 20, 'dense')
+
+    # one copy of the design, plus room for the O(n) vectors of the fit
+    assert memory['peak_increase'] < 1.25 * memory['design_bytes']
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="ru_maxrss is reported in kilobytes on Linux only")
+def test_sparse_fit_peak_memory():
+    memory = get_fit_memory(N_ROWS_SPARSE, N_LEVELS_SPARSE, 'sparse')
+
+    # the dummy columns of the factor are read as codes, never copied as a whole
+    assert memory['peak_increase'] < 0.25 * memory['input_bytes']
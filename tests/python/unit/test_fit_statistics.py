@@ -0,0 +1,48 @@
+import numpy as np
+import statsmodels.api as sm
+from numpy.testing import assert_almost_equal
+from testing_utils import get_rating_model
+
+
+def get_model(labels, **params):
+    return get_rating_model(labels, family_name='gamma', gamma_link='log', **params)
+
+
+def test_fit_statistics_match_glum():
+    data = sm.datasets.scotland.load()
+    X = data.exog.to_numpy()
+    y = data.endog.to_numpy()
+    model = get_model(list(data.exog_name))
+    model.fit(X, y)
+
+    X_design = model.design_plan.transform(X)
+    predictions = model.fitted_model.predict(X_design)
+    family = model.family_glum_class
+    assert_almost_equal(model.aic_value, model.fitted_model.aic(X_design, y), decimal=2)
+    assert_almost_equal(model.bic_value, model.fitted_model.bic(X_design, y), decimal=2)
+    assert_almost_equal(model.deviance_value, family.deviance(y, predictions), decimal=2)
+    pearson_chi2 = np.sum((y - predictions) ** 2 / family.unit_variance(predictions))
+    assert_almost_equal(model.pearson_chi2_value, pearson_chi2, decimal=2)
+
+
+def test_deferred_fit_statistics():
+    data = sm.datasets.scotland.load()
+    X = data.exog.to_numpy()
+    y = data.endog.to_numpy()
+    model = get_model(list(data.exog_name))
+    model.fit(X, y)
+    deferred_model = get_model(list(data.exog_name), defer_metrics=True)
+    deferred_model.fit(X, y)
+
+    assert model.has_fit_statistics()
+    assert not deferred_model.has_fit_statistics()
+    assert deferred_model.aic_value is None
+
+    statistics = deferred_model.get_fit_statistics(y, deferred_model.predict(X), deferred_model.fitted_model.coef_)
+    assert not deferred_model.has_fit_statistics()
+    for statistic in ['aic', 'bic', 'deviance', 'pearson_chi2', 'log_likelihood']:
+        assert_almost_equal(statistics[statistic], getattr(model, f'{statistic}_value'))
+
+    deferred_model.compute_fit_statistics(y, deferred_model.predict(X))
+    for metric in ['aic_value', 'bic_value', 'deviance_value', 'pearson_chi2_value', 'log_likelihood_value']:
+        assert_almost_equal(getattr(deferred_model, metric), getattr(model, metric))
@@ -0,0 +1,51 @@
+import os
+import re
+import numpy as np
+import pytest
+import tabmat as tm
+from numpy.testing import assert_allclose
+from scipy import sparse
+from generalized_linear_models import glum_compat
+from generalized_linear_models.glum_compat import (GLUM_MAX_VERSION, GLUM_MIN_VERSION, fisher_information,
+                                                   is_supported_glum_version, observed_information,
+                                                   one_over_variance, parse_version, sandwich_dot)
+from testing_utils import RATING_FAMILIES, get_rating_family_data, get_rating_model
+
+REQUIREMENTS = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'code-env', 'python', 'spec',
+                            'requirements.txt')
+
+
+def test_glum_version_range():
+    with open(REQUIREMENTS) as requirements:
+        specifier = next(line for line in requirements if line.startswith('glum'))
+    minimum, maximum = re.match(r'glum>=([\d.]+),<([\d.]+);', specifier).groups()
+    assert parse_version(minimum) == GLUM_MIN_VERSION
+    assert parse_version(maximum) == GLUM_MAX_VERSION
+
+    assert is_supported_glum_version()
+    assert is_supported_glum_version('2.6')
+    assert not is_supported_glum_version('2.5.2')
+    assert not is_supported_glum_version('3.0.0')
+
+
+@pytest.mark.parametrize('family_name', list(RATING_FAMILIES))
+def test_fallbacks_match_glum(family_name):
+    X, y, labels = get_rating_family_data(family_name, n=1000)
+    weights = np.random.default_rng(0).uniform(0.5, 2, len(y))
+    model = get_rating_model(labels, **RATING_FAMILIES[family_name])
+    model.fit(X, y, weights)
+    family = model.fitted_model.family_instance
+    link = model.fitted_model.link_instance
+    X_design = model.design_plan.transform(X)
+    mu = model.fitted_model.predict(X_design, offset=np.log(X[:, 4]) if 'exposure' in labels else None)
+    eta = link.link(mu)
+
+    assert_allclose(glum_compat._fallback_one_over_variance(family, link, mu, eta, 1.3, weights),
+                    one_over_variance(family, link, mu, eta, 1.3, weights), rtol=1e-12)
+    for X_tabmat in [tm.DenseMatrix(X_design), tm.SparseMatrix(sparse.csc_matrix(X_design))]:
+        assert_allclose(glum_compat._fallback_sandwich_dot(X_tabmat, weights, intercept=True),
+                        sandwich_dot(X_tabmat, weights, intercept=True), rtol=1e-12)
+        assert_allclose(glum_compat._fallback_fisher_information(family, link, X_tabmat, y, mu, weights, 1.3, True),
+                        fisher_information(family, link, X_tabmat, y, mu, weights, 1.3, True), rtol=1e-12)
+        assert_allclose(glum_compat._fallback_observed_information(family, link, X_tabmat, y, mu, weights, 1.3, True),
+                        observed_information(family, link, X_tabmat, y, mu, weights, 1.3, True), rtol=1e-12)
@@ -0,0 +1,46 @@
+from numpy.testing import assert_allclose
+from generalized_linear_models.interaction_detection import detect_interactions, get_interaction_cells
+from testing_utils import get_rating_data, get_rating_model
+
+
+def test_detect_interactions():
+    X, y = get_rating_data(n=20000, interaction=0.4)
+    model = get_rating_model()
+    model.fit(X, y)
+    pairs = detect_interactions(model, X, y, n_bins=5, n_jobs=1)
+
+    assert len(pairs) == 3
+    assert (pairs.loc[0, 'first'], pairs.loc[0, 'second']) == ('area', 'fuel')
+    assert pairs.loc[0, 'df'] == 2
+    assert pairs.loc[0, 'p_value'] < 1e-6
+    assert pairs.loc[2, 'p_value'] > 0.001
+    cells = get_interaction_cells(model, X, [('area', 'fuel'), ('area', 'age')], n_bins=5)
+    area_fuel = cells[(cells['first'] == 'area') & (cells['second'] == 'fuel')]
+    assert len(area_fuel) == 6
+    assert list(area_fuel['first_level']) == ['base', 'base', '1', '1', '2', '2']
+    assert list(area_fuel['second_level']) == ['base', 'diesel'] * 3
+    assert_allclose(area_fuel['exposure'].iloc[5], X[(X[:, 1] == 1) & (X[:, 2] == 1), 4].sum())
+    assert len(cells) == 6 + 15
+    assert_allclose(area_fuel['exposure'].sum(), X[:, 4].sum())
+    assert_allclose(pairs.loc[0, 'min_cell_exposure'], area_fuel['exposure'].min())
+
+    refit = get_rating_model(first=['area'], second=['fuel'])
+    refit.fit(X, y)
+    family = model.fitted_model.family_instance
+    deviance_reduction = family.deviance(y, model.predict(X)) - family.deviance(y, refit.predict(X))
+    assert_allclose(pairs.loc[0, 'deviance_reduction'], deviance_reduction, rtol=0.1)
+
+    # fitted interactions are not scored again
+    refit_pairs = detect_interactions(refit, X, y, n_bins=5, n_jobs=1)
+    assert len(refit_pairs) == 2
+
+
+def test_detect_interactions_in_parallel():
+    X, y = get_rating_data(seed=1, interaction=0.4)
+    model = get_rating_model()
+    model.fit(X, y)
+    serial = detect_interactions(model, X, y, n_jobs=1)
+    parallel = detect_interactions(model, X, y, n_jobs=2)
+    assert serial[['first', 'second', 'df']].equals(parallel[['first', 'second', 'df']])
+    assert_allclose(serial['score_statistic'], parallel['score_statistic'])
+    assert_allclose(serial['min_cell_exposure'], parallel['min_cell_exposure'])
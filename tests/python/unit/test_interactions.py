@@ -0,0 +1,27 @@
+import numpy as np
+from numpy.testing import assert_almost_equal
+from generalized_linear_models.interactions import Interactions, build_interaction_columns
+
+
+def test_build_interaction_columns_by_chunks():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(103, 6))
+    first_indices = [0, 0, 1, 2]
+    second_indices = [3, 4, 5, 5]
+    expected = np.column_stack([X[:, f] * X[:, s] for f, s in zip(first_indices, second_indices)])
+
+    assert_almost_equal(build_interaction_columns(X, first_indices, second_indices), expected)
+    assert_almost_equal(build_interaction_columns(X, first_indices, second_indices, chunk_size=10), expected)
+    out = np.empty((103, 4), order='F')
+    build_interaction_columns(X, first_indices, second_indices, out=out, chunk_size=7)
+    assert_almost_equal(out, expected)
+
+
+def test_interactions_transform():
+    X = np.array([[1., 0., 2.], [0., 1., 3.]])
+    labels = ['dummy:area:a', 'dummy:area:b', 'age']
+    X_out = Interactions(['area'], ['age']).transform(X, labels)
+
+    assert labels[3:] == ['interaction:area::a:age', 'interaction:area::b:age']
+    assert_almost_equal(X_out, [[1., 0., 2., 2., 0.], [0., 1., 3., 0., 3.]])
+    assert Interactions(None, None).transform(X, ['a', 'b', 'c']) is X
@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from model_cache.model_object_store import ModelObjectStore, estimate_size
+
+
+def make_frame(n_rows):
+    return pd.DataFrame({'value': np.zeros(n_rows), 'level': ['level'] * n_rows})
+
+
+def test_estimated_sizes():
+    frame = make_frame(1000)
+    frame_size = int(frame.memory_usage(deep=True).sum())
+    assert estimate_size(frame) == frame_size
+    assert estimate_size(np.zeros(100)) == 800
+    # nested dicts are walked, shared objects counted once
+    nested = {'relativities': frame, 'relativities_dict': {'area': frame}}
+    assert frame_size < estimate_size(nested) < 2 * frame_size
+
+
+def test_least_recently_used_eviction():
+    frame_size = estimate_size(make_frame(1000))
+    store = ModelObjectStore(max_bytes=int(2.5 * frame_size))
+    store.put('model_1', 'train_set', make_frame(1000))
+    store.put('model_1', 'test_set', make_frame(1000))
+    assert store.get('model_1', 'train_set')[0]
+    store.put('model_2', 'train_set', make_frame(1000))
+
+    # the test set of model 1 was the least recently used
+    assert store.get('model_1', 'test_set') == (False, None)
+    assert store.get('model_1', 'train_set')[0]
+    assert store.total_bytes <= store.max_bytes
+    assert sorted(store.list_models()) == ['model_1', 'model_2']
+    assert store.get_stats()['evictions'] == 1
+    assert store.get_stats()['hits'] == 2
+    assert store.get_stats()['misses'] == 1
+
+    # an object larger than the budget is kept alone
+    store.put('model_3', 'train_set', make_frame(5000))
+    assert store.list_models() == ['model_3']
+    store.remove_model('model_3')
+    assert store.total_bytes == 0
+    assert store.get_model('model_3') is None
+
+
+def test_single_flight_creation():
+    store = ModelObjectStore()
+    n_callers = 8
+    barrier = threading.Barrier(n_callers)
+    calls = []
+
+    def create_train_set():
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return make_frame(100)
+
+    def get_train_set():
+        barrier.wait()
+        return store.get_or_create('model_1', 'train_set', create_train_set)
+
+    with ThreadPoolExecutor(max_workers=n_callers) as executor:
+        results = list(executor.map(lambda _: get_train_set(), range(n_callers)))
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    # only the creator counts as a miss, the others wait for it or find its object
+    assert store.get_stats()['misses'] == 1
+    assert store.get_stats()['coalesced'] + store.get_stats()['hits'] == n_callers - 1
+    assert store.in_flight == {}
+
+
+def test_failed_creation_is_retried():
+    store = ModelObjectStore()
+
+    def fail():
+        raise ValueError('Model not found')
+
+    with pytest.raises(ValueError, match='Model not found'):
+        store.get_or_create('model_1', 'train_set', fail)
+    assert store.get_or_create('model_1', 'train_set', lambda: 'train_set') == 'train_set'
@@ -0,0 +1,57 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model_cache.object_pool import ObjectPool
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_and_expired_objects():
+    built = []
+    clock = FakeClock()
+    pool = ObjectPool(lambda key: built.append(key) or f'retriever of {key}', max_size=2, ttl=60, clock=clock)
+
+    assert pool.get('model_1') == 'retriever of model_1'
+    pool.get('model_2')
+    pool.get('model_1')
+    pool.get('model_3')
+    assert built == ['model_1', 'model_2', 'model_3']
+    # model_2 was the least recently used
+    pool.get('model_2')
+    assert built[-1] == 'model_2'
+    assert len(pool) == 2
+
+    clock.now = 61
+    pool.get('model_2')
+    assert built[-1] == 'model_2' and len(built) == 5
+    pool.remove('model_2')
+    assert len(pool) == 1
+
+
+def test_concurrent_requests_build_once():
+    n_callers = 8
+    barrier = threading.Barrier(n_callers)
+    built = []
+
+    def build(key):
+        built.append(key)
+        time.sleep(0.2)
+        return object()
+
+    pool = ObjectPool(build)
+
+    def get_retriever(_):
+        barrier.wait()
+        return pool.get('model_1')
+
+    with ThreadPoolExecutor(max_workers=n_callers) as executor:
+        retrievers = list(executor.map(get_retriever, range(n_callers)))
+    assert built == ['model_1']
+    assert all(retriever is retrievers[0] for retriever in retrievers)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+from glm_handler.one_way_cube import OneWayCube
+
+
+def get_dataset(n, seed):
+    rng = np.random.default_rng(seed)
+    weight = rng.uniform(0.1, 1, n)
+    predicted = rng.uniform(0.05, 0.2, n)
+    dataset = pd.DataFrame({'postcode': rng.choice([f'PC{level:03d}' for level in range(150)], n),
+                            'area': rng.choice(['a', 'b', 'c'], n),
+                            'age': rng.integers(18, 90, n).astype(float),
+                            'power': rng.uniform(50, 300, n),
+                            'weight': weight, 'weighted_target': rng.poisson(predicted * weight),
+                            'weighted_predicted': predicted * weight})
+    dataset.loc[:10, 'area'] = np.nan
+    return dataset
+
+
+def get_cube():
+    train_set, test_set = get_dataset(20000, 0), get_dataset(5000, 1)
+    variable_types = {'postcode': 'CATEGORY', 'area': 'CATEGORY', 'age': 'NUMERIC', 'power': 'NUMERIC'}
+    base_values = {'postcode': 'PC000', 'area': 'a', 'age': 40.0, 'power': 100.0}
+    return train_set, test_set, OneWayCube(train_set, test_set, variable_types, base_values)
+
+
+def test_categorical_one_way():
+    train_set, test_set, cube = get_cube()
+    one_way = cube.get_one_way('area')
+    test_one_way = one_way[one_way['dataset'] == 'test'].set_index('Category')
+    grouped = test_set.groupby('area')[['weight', 'weighted_target', 'weighted_predicted']].sum()
+    assert list(test_one_way.index) == ['a', 'b', 'c']
+    assert_allclose(test_one_way['Value'], grouped['weight'])
+    assert_allclose(test_one_way['observedAverage'], grouped['weighted_target'] / grouped['weight'])
+    assert_allclose(test_one_way['baseLevelPrediction'], test_one_way['fittedAverage'])
+
+    # the levels with the most train exposure are kept, the others grouped in Other
+    assert len(cube.levels['postcode']) == 100
+    exposure = train_set.groupby('postcode')['weight'].sum()
+    other_exposure = exposure.drop(exposure.nlargest(99).index).sum()
+    train_one_way = cube.get_one_way('postcode').set_index(['dataset', 'Category'])
+    assert_allclose(train_one_way.loc[('train', 'Other'), 'Value'], other_exposure)
+    assert_allclose(train_one_way.xs('test')['Value'].sum(), test_set['weight'].sum())
+
+
+def test_numeric_one_way():
+    train_set, test_set, cube = get_cube()
+    # 72 distinct ages are kept as they are
+    assert cube.levels['age'] == sorted(train_set['age'].unique())
+    base_predictions = np.arange(len(cube.levels['age']), dtype=float)
+    one_way = cube.get_one_way('age', base_predictions)
+    assert_allclose(one_way.loc[one_way['Category'] == 40.0, 'baseLevelPrediction'], [22, 22])
+
+    # continuous powers are binned on the train set, the bins being shared with the test set
+    levels = cube.levels['power']
+    assert len(levels) == 100
+    assert 100.0 in levels
+    one_way = cube.get_one_way('power')
+    assert_allclose(one_way.groupby('dataset')['Value'].sum().loc[['train', 'test']],
+                    [train_set['weight'].sum(), test_set['weight'].sum()])
@@ -0,0 +1,53 @@
+import numpy as np
+from numpy.testing import assert_almost_equal
+from testing_utils import get_rating_model
+
+
+def get_data(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 6))
+    exposure = rng.uniform(0.2, 1, n)
+    y = rng.poisson(exposure * np.exp(0.3 * X[:, 0] - 0.2 * X[:, 1] + 0.05 * X[:, 2])).astype(float)
+    X = np.column_stack([X, exposure])
+    labels = ['x' + str(i) for i in range(6)] + ['exposure']
+    return X, y, labels
+
+
+def get_model(labels, penalty, compress_design=False, **params):
+    return get_rating_model(labels, penalty=penalty, l1_ratio=0.5, compress_design=compress_design, **params)
+
+
+def test_regularization_path_matches_single_fits():
+    X, y, labels = get_data()
+    penalties = [0.0001, 0.001, 0.01, 0.1]
+    path_model = get_model(labels, 0.01, regularization_path=True, penalty_path=penalties)
+    path_model.fit(X, y)
+    path = path_model.path_statistics
+
+    assert path['penalty'] == sorted(penalties, reverse=True)
+    assert len(path['coefficients']['x0']) == len(penalties)
+    for index, penalty in enumerate(path['penalty']):
+        model = get_model(labels, penalty)
+        model.fit(X, y)
+        assert_almost_equal([path['coefficients'][label][index] for label in labels[:6]], model.coef_[:6], decimal=4)
+        assert_almost_equal(path['deviance'][index], model.deviance_value, decimal=1)
+        assert_almost_equal(path['aic'][index], model.aic_value, decimal=1)
+
+    selected_index = int(np.argmin(path['aic']))
+    assert path_model.selected_penalty == path['penalty'][selected_index]
+    assert_almost_equal(path_model.aic_value, path['aic'][selected_index])
+    assert_almost_equal(path_model.coef_[:6], [path['coefficients'][label][selected_index] for label in labels[:6]])
+
+
+def test_regularization_path_compressed():
+    X, y, labels = get_data()
+    X[:, :6] = np.round(X[:, :6])
+    X[:, 6] = np.round(X[:, 6], 1)
+    penalties = [0.001, 0.01, 0.1]
+    full, compressed = [get_model(labels, penalties, compress_design, regularization_path=True)
+                        for compress_design in [False, True]]
+    full.fit(X, y)
+    compressed.fit(X, y)
+    assert_almost_equal(compressed.path_statistics['deviance'], full.path_statistics['deviance'], decimal=2)
+    assert_almost_equal(compressed.path_statistics['aic'], full.path_statistics['aic'], decimal=2)
+    assert compressed.selected_penalty == full.selected_penalty
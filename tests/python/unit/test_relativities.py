@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+from generalized_linear_models.relativities import CoefficientRelativities
+from glm_handler.dku_relativites_calculator import RelativitiesCalculator
+from testing_utils import get_rating_data, get_rating_model
+
+# area and fuel at their base levels, age at 40
+BASELINE_ROW = np.array([0, 0, 0, 40, 1], dtype=float)
+
+
+def get_predicted_relativities(model, rows):
+    return model.predict(rows) / model.predict(BASELINE_ROW[np.newaxis, :])[0]
+
+
+def test_log_link_relativities():
+    X, y = get_rating_data()
+    model = get_rating_model(first=['area'], second=['age'])
+    model.fit(X, y)
+    relativities = CoefficientRelativities(model, BASELINE_ROW)
+
+    coefficients = model.get_coefficients_by_label()
+    # the interaction with age is taken at the base age
+    expected = [coefficients[f'dummy:area:{level}'] + 40 * coefficients[f'interaction:area::{level}:age']
+                for level in ['1', '2']]
+    assert_allclose(relativities.get_relativities({'area': ['1', '2', 'unseen']}), np.exp(expected + [0]))
+    ages = np.array([18., 40., 65.])
+    rows = np.repeat(BASELINE_ROW[np.newaxis, :], 3, axis=0)
+    rows[:, 3] = ages
+    assert_allclose(relativities.get_relativities({'age': ages}), get_predicted_relativities(model, rows))
+
+    # interaction cells combine the main effects and the interaction coefficients
+    rows[:, 1] = 1
+    assert_allclose(relativities.get_relativities({'area': ['2'] * 3, 'age': ages}),
+                    get_predicted_relativities(model, rows))
+
+
+def test_non_log_link_relativities():
+    X, y = get_rating_data(seed=1)
+    model = get_rating_model(first=['area'], second=['age'], family_name='gaussian', gaussian_link='identity')
+    model.fit(X, y)
+    relativities = CoefficientRelativities(model, BASELINE_ROW)
+
+    rows = np.repeat(BASELINE_ROW[np.newaxis, :], 2, axis=0)
+    rows[0, 2] = 1
+    rows[1, [0, 3]] = [1, 60]
+    assert_allclose(relativities.get_relativities({'fuel': ['diesel']}), get_predicted_relativities(model, rows[:1]))
+    assert_allclose(relativities.get_relativities({'area': ['1'], 'age': [60]}),
+                    get_predicted_relativities(model, rows[1:]))
+
+
+class Predictor():
+    """
+    preprocesses raw rows (area, fuel, age, exposure) like the DSS predictor of the model
+    """
+    def __init__(self, model):
+        self._clf = model
+
+    def preprocess(self, df):
+        area = df['area'].astype(str)
+        return (np.column_stack([area == '1', area == '2', df['fuel'] == 'diesel', df['age'],
+                                 df['exposure']]).astype(float),)
+
+
+def test_interaction_relativity_grid():
+    X, y = get_rating_data()
+    model = get_rating_model(first=['area'], second=['age'])
+    model.interaction_columns_second = ['fuel']
+    model.fit(X, y)
+    train_set = pd.DataFrame({'area': np.where(X[:, 0] == 1, '1', np.where(X[:, 1] == 1, '2', '0')),
+                              'fuel': np.where(X[:, 2] == 1, 'diesel', 'gasoline'),
+                              'age': X[:, 3], 'exposure': X[:, 4]})
+    model_retriever = SimpleNamespace(predictor=Predictor(model), exposure_columns='exposure',
+                                      get_used_features=lambda: ['area', 'fuel', 'age'],
+                                      get_interactions=lambda: [('area', 'fuel'), ('area', 'age')])
+    calculator = RelativitiesCalculator(None, model_retriever, train_set, train_set,
+                                        base_values={'area': '0', 'fuel': 'gasoline', 'age': 40},
+                                        modalities={}, variable_types={'area': 'CATEGORY', 'fuel': 'CATEGORY',
+                                                                       'age': 'NUMERIC'})
+    grid = calculator.get_relativities_interactions_df()
+
+    # numerical features only take their base value in the grids
+    assert len(grid) == 3 * 2 + 3
+    cells = grid[grid['feature_2'] == 'fuel']
+    rows = Predictor(model).preprocess(pd.DataFrame({'area': cells['value_1'], 'fuel': cells['value_2'],
+                                                     'age': 40, 'exposure': 1}))[0]
+    assert_allclose(cells['relativity'], get_predicted_relativities(model, rows))
+    assert_allclose(grid.loc[(grid['value_1'] == '0') & (grid['feature_2'] == 'age'), 'relativity'], 1)
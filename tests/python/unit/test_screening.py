@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose
+from generalized_linear_models.screening import encode_candidates, score_test_candidates
+from testing_utils import get_rating_model
+
+
+def get_data(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    area = rng.integers(0, 3, n)
+    region = rng.integers(0, 4, n)
+    X = np.column_stack([area == 1, area == 2, rng.uniform(1.8, 8, n), rng.uniform(0.1, 1, n)]).astype(float)
+    candidates = pd.DataFrame({'score': rng.normal(size=n), 'noise': rng.normal(size=n),
+                               'region': np.array(['north', 'south', 'east', 'west'])[region]})
+    y = rng.poisson(X[:, 3] * np.exp(0.2 * X[:, 0] + 0.1 * X[:, 2] + 0.1 * candidates['score']
+                                     + 0.15 * (region == 1))).astype(float)
+    return X, y, candidates
+
+
+def test_score_test_approximates_refits():
+    X, y, candidates = get_data()
+    labels = ['dummy:area:1', 'dummy:area:2', 'age', 'exposure']
+    model = get_rating_model(labels)
+    model.fit(X, y)
+    Z, candidate_labels = encode_candidates(candidates, ['score', 'noise'], ['region'])
+    assert len(candidate_labels) == 5
+
+    screening = score_test_candidates(model, X, y, Z, candidate_labels).set_index('variable')
+    assert list(screening.index[:2]) == ['score', 'region']
+    assert screening.loc['region', 'df'] == 3
+    assert screening.loc['noise', 'p_value'] > 0.01
+
+    deviance = model.fitted_model.family_instance.deviance(y, model.predict(X))
+    for variable in ['score', 'region']:
+        positions = [i for i, label in enumerate(candidate_labels) if variable in label]
+        refit = get_rating_model(labels[:3] + [candidate_labels[i] for i in positions] + ['exposure'])
+        X_refit = np.column_stack([X[:, :3], Z[:, positions], X[:, 3]])
+        refit.fit(X_refit, y)
+        deviance_reduction = deviance - refit.fitted_model.family_instance.deviance(y, refit.predict(X_refit))
+        assert_allclose(screening.loc[variable, 'deviance_reduction'], deviance_reduction, rtol=0.05)
+
+
+def test_candidate_spanned_by_model():
+    X, y, _ = get_data(n=2000, seed=1)
+    labels = ['dummy:area:1', 'dummy:area:2', 'age', 'exposure']
+    model = get_rating_model(labels)
+    model.fit(X, y)
+    # rescaled copy of a model column
+    screening = score_test_candidates(model, X, y, 2 * X[:, [2]], ['age_rescaled'])
+    assert screening.loc[0, 'df'] == 0
+    assert screening.loc[0, 'p_value'] == 1.0
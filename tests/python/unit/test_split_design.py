@@ -0,0 +1,54 @@
+import numpy as np
+import tabmat as tm
+from numpy.testing import assert_almost_equal
+from generalized_linear_models.split_design import build_split_matrix, get_dummy_groups
+from testing_utils import get_rating_model
+
+
+def get_data(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    territory = rng.integers(0, 40, n)
+    vehicle = rng.integers(0, 4, n)
+    X = np.column_stack([territory == level for level in range(1, 40)]
+                        + [vehicle == level for level in range(1, 4)]
+                        + [np.zeros(n), rng.uniform(18, 80, n), rng.uniform(0.1, 1, n)]).astype(float)
+    labels = ([f'dummy:territory:{level}' for level in range(1, 40)]
+              + [f'dummy:vehicle:{level}' for level in range(1, 4)]
+              + ['dummy:vehicle:N/A', 'age', 'exposure'])
+    y = rng.poisson(X[:, -1] * np.exp(0.3 * X[:, 40] - 0.01 * X[:, -2] + 0.1 * (territory % 3))).astype(float)
+    return X, y, labels
+
+
+def fit(X, y, labels, **params):
+    model = get_rating_model(labels, ['vehicle'], ['age'], **params)
+    model.fit(X, y)
+    return model
+
+
+def test_get_dummy_groups():
+    labels = ['dummy:a:x', 'age', 'dummy:a:y', 'dummy:b:z']
+    assert get_dummy_groups(labels) == [[0, 2], [3]]
+
+
+def test_split_matrix_matches_dense_design():
+    X, y, labels = get_data()
+    model = fit(X, y, labels)
+    split_matrix = build_split_matrix(X, model.design_plan)
+
+    assert isinstance(split_matrix, tm.SplitMatrix)
+    assert any(isinstance(matrix, tm.CategoricalMatrix) for matrix in split_matrix.matrices)
+    assert_almost_equal(split_matrix.toarray(), model.design_plan.transform(X))
+
+
+def test_sparse_design_fit():
+    X, y, labels = get_data()
+    dense = fit(X, y, labels)
+    split = fit(X, y, labels, sparse_design=True)
+    split_compressed = fit(X, y, labels, sparse_design=True, compress_design=True)
+
+    for model in [split, split_compressed]:
+        assert_almost_equal(model.coef_, dense.coef_, decimal=8)
+        assert_almost_equal(model.aic_value, dense.aic_value)
+        assert list(model.coef_table.index) == list(dense.coef_table.index)
+        assert_almost_equal(model.coef_table.values, dense.coef_table.values, decimal=6)
+        assert_almost_equal(model.predict(X), dense.predict(X), decimal=8)
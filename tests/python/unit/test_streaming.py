@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from glum import GeneralizedLinearRegressor
+from numpy.testing import assert_almost_equal
+from sklearn.exceptions import ConvergenceWarning
+from generalized_linear_models.streaming import StreamingIRLS
+from testing_utils import RATING_FAMILIES, get_rating_family_data, get_rating_model
+
+
+def get_chunk_generator(X, y, weights, chunk_size=700):
+    def get_chunks():
+        for start in range(0, len(y), chunk_size):
+            end = start + chunk_size
+            yield X[start:end], y[start:end], weights[start:end]
+    return get_chunks
+
+
+@pytest.mark.parametrize('family_name, penalty', [('poisson', 0.0), ('gamma', 0.01), ('binomial', 0.0)])
+def test_chunked_fit(family_name, penalty):
+    X, y, labels = get_rating_family_data(family_name, discrete=True)
+    weights = np.random.default_rng(0).uniform(0.5, 2, len(y))
+    full = get_rating_model(labels, penalty=penalty, **RATING_FAMILIES[family_name])
+    full.fit(X, y, weights)
+    chunked = get_rating_model(labels, penalty=penalty, **RATING_FAMILIES[family_name])
+    chunked.fit_chunks(get_chunk_generator(X, y, weights))
+
+    assert_almost_equal(chunked.intercept_, full.intercept_, decimal=4)
+    assert_almost_equal(chunked.coef_, full.coef_, decimal=4)
+    assert_almost_equal(chunked.aic_value, full.aic_value)
+    assert_almost_equal(chunked.bic_value, full.bic_value)
+    assert_almost_equal(chunked.deviance_value, full.deviance_value)
+    assert_almost_equal(chunked.predict(X), full.predict(X), decimal=4)
+    if family_name == 'binomial':
+        assert chunked.classes_ == [0.0, 1.0]
+    else:
+        assert_almost_equal(chunked.coef_table.values, full.coef_table.values, decimal=4)
+        assert_almost_equal(chunked.pearson_chi2_value, full.pearson_chi2_value)
+
+
+def test_step_halving_from_a_distant_start():
+    rng = np.random.default_rng(3)
+    X = np.column_stack([rng.normal(size=2000), rng.uniform(size=2000)])
+    y = rng.gamma(2, np.exp(0.5 + 0.8 * X[:, 0] - X[:, 1]) / 2)
+    full = GeneralizedLinearRegressor(family='gamma', link='log', alpha=0).fit(X, y)
+
+    def get_chunks():
+        for start in range(0, len(y), 500):
+            yield X[start:start + 500], y[start:start + 500], None, None
+
+    # full Newton steps from this start overshoot and the objective increases
+    fitter = StreamingIRLS(full.family_instance, full.link_instance)
+    fitter.fit(get_chunks, start_params=[0.0, 5.0, 0.0])
+    assert fitter.converged_
+    assert_almost_equal(fitter.coef_, full.coef_, decimal=5)
+
+    with pytest.warns(ConvergenceWarning):
+        StreamingIRLS(full.family_instance, full.link_instance, max_iter=3).fit(get_chunks, [0.0, 5.0, 0.0])
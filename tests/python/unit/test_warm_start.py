@@ -0,0 +1,42 @@
+from numpy.testing import assert_almost_equal
+from testing_utils import RATING_LABELS, get_rating_data, get_rating_model
+
+
+def test_warm_start_from_previous_variable_set():
+    X, y = get_rating_data(discrete=True)
+    labels = RATING_LABELS
+    # previous model without fuel but with a variable that has since been dropped
+    previous_columns = [0, 1, 3, 4]
+    previous = get_rating_model([labels[i] for i in previous_columns])
+    previous.fit(X[:, previous_columns], y)
+    start_params = previous.get_coefficients_by_label()
+    start_params['dropped_variable'] = 0.5
+
+    cold = get_rating_model(labels)
+    cold.fit(X, y)
+    warm = get_rating_model(labels, start_params=start_params)
+    warm.fit(X, y)
+
+    assert_almost_equal(warm.get_start_params(), [start_params['intercept'], start_params['dummy:area:1'],
+                                                  start_params['dummy:area:2'], 0.0, start_params['age']])
+    assert_almost_equal(warm.coef_, cold.coef_, decimal=5)
+    assert warm.fitted_model.n_iter_ <= cold.fitted_model.n_iter_
+
+    refit = get_rating_model(labels, start_params=cold.get_coefficients_by_label())
+    refit.fit(X, y)
+    assert refit.fitted_model.n_iter_ < cold.fitted_model.n_iter_
+
+
+def test_warm_start_chunked():
+    X, y = get_rating_data(seed=1)
+    labels = RATING_LABELS
+
+    def get_chunks():
+        for start in range(0, len(y), 1000):
+            yield X[start:start + 1000], y[start:start + 1000]
+
+    cold = get_rating_model(labels)
+    cold.fit_chunks(get_chunks)
+    warm = get_rating_model(labels, start_params=cold.get_coefficients_by_label())
+    warm.fit_chunks(get_chunks)
+    assert_almost_equal(warm.coef_, cold.coef_)
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from model_cache.model_object_store import ModelObjectStore
+from model_cache.warm_up_scheduler import WarmUpScheduler, USER_PRIORITY, SPECULATIVE_PRIORITY, DONE, FAILED, EVICTED
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_user_warm_ups_go_first():
+    scheduler = WarmUpScheduler(n_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def blocking_task():
+        started.set()
+        release.wait()
+
+    def make_task(model_id, key):
+        return key, lambda: order.append((model_id, key))
+
+    scheduler.schedule('model_0', [('train_set', blocking_task)])
+    started.wait()
+    scheduler.schedule('model_1', [make_task('model_1', 'train_set'), make_task('model_1', 'test_set')],
+                       SPECULATIVE_PRIORITY)
+    scheduler.schedule('model_2', [make_task('model_2', 'train_set'), make_task('model_2', 'test_set')],
+                       USER_PRIORITY)
+    release.set()
+
+    wait_for(lambda: len(order) == 4)
+    assert order == [('model_2', 'train_set'), ('model_2', 'test_set'), ('model_1', 'train_set'), ('model_1', 'test_set')]
+    status = scheduler.get_status()
+    assert [model_id for model_id in status] == ['model_0', 'model_1', 'model_2']
+    assert status['model_2'] == {'tasks': {'train_set': DONE, 'test_set': DONE}, 'done': 2, 'total': 2}
+
+
+def test_tasks_run_once():
+    scheduler = WarmUpScheduler(n_workers=2)
+    calls = []
+
+    def failing_task():
+        raise ValueError('Model not found')
+
+    tasks = [('train_set', lambda: calls.append('train_set')), ('relativities', failing_task)]
+    scheduler.schedule('model_1', tasks)
+    wait_for(lambda: scheduler.get_status()['model_1']['tasks']['relativities'] == FAILED)
+    scheduler.schedule('model_1', tasks, USER_PRIORITY)
+    wait_for(lambda: scheduler.get_status()['model_1']['tasks']['relativities'] == FAILED)
+    assert calls == ['train_set']
+
+
+def test_evicted_objects_are_built_again():
+    store = ModelObjectStore()
+    scheduler = WarmUpScheduler(is_present=store.contains)
+    calls = []
+
+    def build_train_set():
+        calls.append('train_set')
+        return [1, 2, 3]
+
+    tasks = [('train_set', lambda: store.get_or_create('model_1', 'train_set', build_train_set))]
+    scheduler.schedule('model_1', tasks)
+    wait_for(lambda: scheduler.get_status()['model_1']['done'] == 1)
+    scheduler.schedule('model_1', tasks)
+
+    store.remove_model('model_1')
+    assert scheduler.get_status()['model_1'] == {'tasks': {'train_set': EVICTED}, 'done': 0, 'total': 1}
+    scheduler.schedule('model_1', tasks)
+    wait_for(lambda: scheduler.get_status()['model_1']['done'] == 1)
+    assert calls == ['train_set', 'train_set']
+    assert store.get_stats()['hits'] == 0
@@ -1,7 +1,78 @@
+import numpy as np
 import pandas as pd
 from io import StringIO
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.preprocessing import OneHotEncoder
+from generalized_linear_models.dku_glm import RegressionGLM, BinaryClassificationGLM
+
+# preprocessed columns of the rating data, as DSS names them
+RATING_LABELS = ['dummy:area:1', 'dummy:area:2', 'dummy:fuel:diesel', 'age', 'exposure']
+
+# model settings of the targets get_rating_family_data draws
+RATING_FAMILIES = {
+    'poisson': {},
+    'gamma': {'family_name': 'gamma', 'gamma_link': 'log'},
+    'binomial': {'model_class': BinaryClassificationGLM, 'family_name': 'binomial', 'binomial_link': 'logit'}
+}
+
+
+def get_rating_data(n=5000, seed=0, discrete=False, interaction=0.0):
+    """
+    synthetic motor claim counts, the preprocessed matrix having the
+    RATING_LABELS columns: an area with 3 levels, a fuel with 2 levels,
+    the driver age and the exposure
+
+    discrete: ages in whole years from 18 to 29 and exposures of a quarter,
+    half or full year, so that the rows fall into few distinct cells
+    interaction: effect of diesel cars in area 2 on top of the main effects
+    """
+    rng = np.random.default_rng(seed)
+    area = rng.integers(0, 3, n)
+    fuel = rng.integers(0, 2, n)
+    if discrete:
+        age = rng.integers(18, 30, n)
+        exposure = rng.choice([0.25, 0.5, 1.0], n)
+    else:
+        age = rng.uniform(18, 80, n)
+        exposure = rng.uniform(0.1, 1, n)
+    X = np.column_stack([area == 1, area == 2, fuel, age, exposure]).astype(float)
+    linear_predictor = (-1 + 0.3 * (area == 1) - 0.2 * (area == 2) + 0.1 * fuel + 0.03 * (age - 18)
+                        + interaction * (area == 2) * fuel)
+    y = rng.poisson(exposure * np.exp(linear_predictor)).astype(float)
+    return X, y
+
+
+def get_rating_family_data(family_name, n=5000, seed=0, discrete=False):
+    """
+    rating data with a target of one of the RATING_FAMILIES, the exposure
+    column being only kept for the Poisson claim counts
+    """
+    X, y = get_rating_data(n, seed, discrete)
+    if family_name == 'poisson':
+        return X, y, RATING_LABELS
+    rng = np.random.default_rng(seed + 1)
+    X = X[:, :4]
+    linear_predictor = 0.3 * X[:, 0] - 0.2 * X[:, 1] + 0.1 * X[:, 2] + 0.01 * (X[:, 3] - 18)
+    if family_name == 'gamma':
+        y = rng.gamma(2, np.exp(linear_predictor))
+    else:
+        y = (rng.uniform(size=n) < 1 / (1 + np.exp(1 - linear_predictor))).astype(float)
+    return X, y, RATING_LABELS[:4]
+
+
+def get_rating_model(labels=RATING_LABELS, first=None, second=None, model_class=RegressionGLM, **params):
+    """
+    unpenalized Poisson GLM with a log link on the labels, the exposure
+    column if any being the exposure, params overriding these settings
+    """
+    model_params = {'penalty': 0.0, 'l1_ratio': 0.0, 'family_name': 'poisson', 'poisson_link': 'log',
+                    'interaction_columns_first': first or [], 'interaction_columns_second': second or [],
+                    'column_labels': labels}
+    if 'exposure' in labels:
+        model_params.update(offset_mode='OFFSETS/EXPOSURES', exposure_columns=['exposure'])
+    model_params.update(params)
+    return model_class(**model_params)
+
 
 testing_dict = {
     'test1': {